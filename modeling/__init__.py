@@ -1,8 +1,9 @@
-from .model_preparation import ModelDataPrepare
+from .model_preparation import ModelDataPrepare, PreparedDataset
+from .model_artifacts import ModelArtifact, project
 from .distance_models import DistanceModeling
 from .statistical_models import StatisticalModeling
 from .machine_learning_models import MLModeling
 from .maxent_model import MaxentModeling
 from .model_evaluation import ModelEvaluator
 
-__all__ = ["DistanceModeling", "StatisticalModeling", "MLModeling", "MaxentModeling", "ModelEvaluator", "ModelDataPrepare"]
+__all__ = ["DistanceModeling", "StatisticalModeling", "MLModeling", "MaxentModeling", "ModelEvaluator", "ModelDataPrepare", "PreparedDataset", "ModelArtifact", "project"]
@@ -1,12 +1,14 @@
 # Funções de modelagem baseadas em distâncias
 import os
-import rasterio
+from functools import partial
 import numpy as np
-from scipy.spatial.distance import mahalanobis, canberra, chebyshev, cosine, minkowski
+import pandas as pd
+from scipy.linalg import solve_triangular
+from scipy.spatial import cKDTree
+from sklearn.covariance import MinCovDet
 
 from EcoDistrib.outputs import MapGenerator
-from EcoDistrib.utils import FileManager
-from EcoDistrib.preprocessing import RasterDataExtract
+from EcoDistrib.utils import FileManager, RasterStack, TileScheduler, ValidPixelStack
 from EcoDistrib.modeling import ModelDataPrepare
 from EcoDistrib.common import msg_logger
 
@@ -24,14 +26,22 @@ class DistanceModeling:
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_bioclim.tif',
+            return_limiting=False,
+            output_limiting=None,
+            percentiles=None
         ):
         """
         Aplica o algoritmo Bioclim para modelagem de distribuição de espécies.
 
+        As camadas são lidas uma a uma (cada arquivo é aberto uma única vez) e acumuladas em um contador inteiro
+        e em uma máscara de bits por pixel, de modo que a memória usada é da ordem de um raster,
+        independentemente do número de camadas. Com uma pilha já carregada (`PreparedDataset`), o envelope
+        é avaliado diretamente sobre os pixels válidos em memória, sem ler os rasters.
+
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou lista de arquivos TIFF contendo as variáveis ambientais.
         - lat_col (str, opcional):
             Nome da coluna com as latitudes no DataFrame (padrão: 'decimalLatitude').
@@ -41,10 +51,20 @@ class DistanceModeling:
             Indica se o mapa resultante deve ser salvo como arquivo TIFF (padrão: False).
         - output_save (str, opcional):
             Caminho para salvar o mapa resultante se `save=True` (padrão: 'mapa_resultante_bioclim.tif').
+        - return_limiting (bool, opcional):
+            Se True, também retorna o mapa da variável limitante: índice (na ordem alfabética dos arquivos)
+            da primeira camada cujo valor está fora do envelope, -1 onde todas estão dentro e NaN sem dados.
+            Disponível para até 64 camadas.
+        - output_limiting (str, opcional):
+            Caminho para salvar o mapa da variável limitante, se `save=True` e `return_limiting=True`.
+        - percentiles (tuple, opcional):
+            Percentis (inferior, superior) que definem o envelope, por exemplo (2.5, 97.5), reduzindo a influência
+            de outliers. Se None (padrão), usa o mínimo e o máximo das ocorrências.
 
         Retorno:
         - np.ndarray:
-            Array normalizado com os resultados do modelo Bioclim.
+            Array float32 normalizado com os resultados do modelo Bioclim.
+        - Se `return_limiting=True`, a tupla (mapa Bioclim, mapa da variável limitante).
 
         Logs:
         - Informações de progresso, como carregamento de dados e sucesso do processamento.
@@ -52,69 +72,224 @@ class DistanceModeling:
         """
         self.model_type = 'Bioclim'
         try:
-            # Validar e carregar os arquivos TIFF
-            tiff_files = FileManager().listfile(tiff_paths)
-            threshold=len(tiff_files)
+            # Pilha já carregada em memória: envelope avaliado sobre os pixels válidos
+            compacta = ValidPixelStack.resolve(tiff_paths)
+            if compacta is not None:
+                return self._bioclim_compact(
+                    compacta, tiff_paths, occurrence_data, lat_col, lon_col, save, formato, output_save,
+                    return_limiting, output_limiting, percentiles
+                )
+
+            # Validar e carregar os arquivos TIFF (na mesma ordem usada para extrair os pontos)
+            tiff_files = sorted(FileManager().listfile(tiff_paths))
+            threshold = len(tiff_files)
             if not tiff_files:
                 raise ValueError("Nenhum arquivo TIFF encontrado no caminho fornecido.")
+            if return_limiting and threshold > 64:
+                raise ValueError("O mapa da variável limitante suporta no máximo 64 camadas.")
 
             self.logger.info(f"{len(tiff_files)} arquivos TIFF encontrados para processamento.")
 
-            # Criar o raster sintético e obter o perfil
-            _, profile = MapGenerator().create_synthetic_raster(formato=formato)
+            # Perfil de saída herdado da pilha de entrada (mesma grade, CRS e nodata)
+            profile = MapGenerator().output_profile(tiff_paths, formato=formato)
+
+            # Coordenadas de ocorrência (longitude, latitude)
+            if isinstance(occurrence_data, pd.DataFrame):
+                lons = occurrence_data[lon_col].to_numpy(dtype=np.float64)
+                lats = occurrence_data[lat_col].to_numpy(dtype=np.float64)
+            else:
+                coords = np.asarray(occurrence_data, dtype=np.float64).reshape(-1, 2)
+                lons, lats = coords[:, 0], coords[:, 1]
+
+            contagem = None      # Número de camadas dentro do envelope, por pixel
+            sem_dados = None     # Pixels com alguma camada não finita
+            bits_fora = None     # Bit i ligado se a camada i está fora do envelope
+            bit_dtype = np.min_scalar_type(2 ** threshold - 1) if return_limiting else None
+
+            # Abrir a pilha uma única vez (ou reaproveitar a já aberta); a grade é comum a todas as camadas
+            with RasterStack.using(tiff_paths) as stack:
+                rows, cols, dentro = stack.index(np.column_stack([lons, lats]))
+                rows, cols = rows[dentro], cols[dentro]
+
+                # Iterar sobre cada camada raster, mantendo apenas uma camada em memória
+                for raster_idx in range(stack.count):
+                    raster_data = stack.read_layer(raster_idx)
+
+                    # Valores de ocorrência para esta camada, amostrados da banda já lida
+                    raster_values = raster_data[rows, cols].astype(np.float64)
+
+                    # Calcular os limites do envelope (min e max, ou percentis)
+                    if percentiles is None:
+                        min_value = np.nanmin(raster_values)
+                        max_value = np.nanmax(raster_values)
+                    else:
+                        min_value, max_value = np.nanpercentile(raster_values, percentiles)
 
-            # Obter valores ambientais para cada coordenada
-            values_per_coordinate = RasterDataExtract().get_values(
-                tiff_files, 
-                occurrence_data, 
-                lat_col=lat_col, 
-                lon_col=lon_col
-            )
-            self.logger.info("Valores ambientais extraídos para as coordenadas de ocorrência.")
+                    if contagem is None:
+                        contagem = np.zeros(raster_data.shape, dtype=np.min_scalar_type(threshold))
+                        sem_dados = np.zeros(raster_data.shape, dtype=bool)
+                        if return_limiting:
+                            bits_fora = np.zeros(raster_data.shape, dtype=bit_dtype)
+
+                    # Acumular os pixels dentro do intervalo min-max
+                    mask_within_range = (raster_data >= min_value) & (raster_data <= max_value)
+                    contagem += mask_within_range
+                    sem_dados |= ~np.isfinite(raster_data)
+
+                    if return_limiting:
+                        bits_fora[~mask_within_range] |= bit_dtype.type(1 << raster_idx)
+
+                    del raster_data, mask_within_range
+
+            # Normalizar para [0, 1], com NaN onde alguma camada não tem dados
+            final_result_array = contagem.astype(np.float32)
+            final_result_array /= threshold
+            final_result_array[sem_dados] = np.nan
+            self.logger.info("Mapa resultante processado com sucesso.")
+
+            # Salvar o resultado se solicitado
+            if save:
+                MapGenerator().save_map(final_result_array, profile, output_save=output_save)
+                self.logger.info(f"Mapa resultante salvo em: {output_save}")
+
+            if not return_limiting:
+                return final_result_array
+
+            # Variável limitante: índice do bit menos significativo ligado
+            limiting_map = np.full(bits_fora.shape, -1, dtype=np.float32)
+            fora = bits_fora != 0
+            menor_bit = bits_fora[fora] & (~bits_fora[fora] + bit_dtype.type(1))
+            limiting_map[fora] = np.log2(menor_bit.astype(np.float64))
+            limiting_map[sem_dados] = np.nan
+            self.logger.info("Mapa da variável limitante processado com sucesso.")
+
+            if save and output_limiting:
+                MapGenerator().save_map(limiting_map, profile, output_save=output_limiting)
+                self.logger.info(f"Mapa da variável limitante salvo em: {output_limiting}")
+
+            return final_result_array, limiting_map
+
+        except ValueError as ve:
+            self.logger.error(f"Erro de validação: {ve}")
+            raise
+
+        except Exception as e:
+            self.logger.error(f"Erro inesperado ao aplicar o algoritmo Bioclim: {e}")
+            raise
+
+    def _bioclim_compact(
+            self, stack, tiff_paths, occurrence_data, lat_col, lon_col, save, formato, output_save,
+            return_limiting, output_limiting, percentiles
+        ):
+        """
+        Bioclim sobre uma pilha compacta já carregada (ver `sdm_bioclim`): os limites do envelope vêm dos valores
+        das ocorrências na pilha e a contagem de camadas dentro do envelope é feita sobre os pixels válidos.
+        """
+        profile = MapGenerator().output_profile(stack, formato=formato)
 
-            result_arrays = []
+        # Limites do envelope por camada (min e max, ou percentis); ocorrências sem dados são ignoradas
+        raster_values = ModelDataPrepare().extract_occurrence_values(tiff_paths, occurrence_data, lat_col, lon_col)
+        raster_values = raster_values[~np.isnan(raster_values).any(axis=1)]
+        if raster_values.shape[0] == 0:
+            raise ValueError("Nenhuma ocorrência possui valores válidos em todas as camadas.")
 
-            # Iterar sobre cada camada raster
-            for raster_idx, raster_file in enumerate(tiff_files):
-                # Obter valores de ocorrência para esta camada
-                raster_values = [coord_values[raster_idx] for coord_values in values_per_coordinate]
+        if percentiles is None:
+            min_values, max_values = raster_values.min(axis=0), raster_values.max(axis=0)
+        else:
+            min_values, max_values = np.percentile(raster_values, percentiles, axis=0)
 
-                # Calcular os limites (min e max)
-                min_value = np.nanmin(raster_values)
-                max_value = np.nanmax(raster_values)
+        dentro = (stack.values >= min_values) & (stack.values <= max_values)
+        final_result_array = stack.scatter(dentro.sum(axis=1, dtype=np.float32) / stack.n_layers)
+        self.logger.info("Mapa resultante processado com sucesso.")
 
-                # Ler os dados do raster
-                with rasterio.open(raster_file) as src:
-                    raster_data = src.read(1)
+        if save:
+            MapGenerator().save_map(final_result_array, profile, output_save=output_save)
+            self.logger.info(f"Mapa resultante salvo em: {output_save}")
+
+        if not return_limiting:
+            return final_result_array
+
+        # Variável limitante: primeira camada (ordem alfabética) fora do envelope, -1 se todas estão dentro
+        limitante = np.where(dentro.all(axis=1), -1, np.argmin(dentro, axis=1))
+        limiting_map = stack.scatter(limitante.astype(np.float32))
+        self.logger.info("Mapa da variável limitante processado com sucesso.")
+
+        if save and output_limiting:
+            MapGenerator().save_map(limiting_map, profile, output_save=output_limiting)
+            self.logger.info(f"Mapa da variável limitante salvo em: {output_limiting}")
+
+        return final_result_array, limiting_map
+
+    def sdm_bioclim_score(
+            self,
+            occurrence_data,
+            tiff_paths,
+            lat_col='decimalLatitude',
+            lon_col='decimalLongitude',
+            combine='min',
+            block_size=512,
+            n_jobs=1,
+            save=False,
+            formato='GTiff',
+            output_save='mapa_resultante_bioclim_score.tif'
+        ):
+        """
+        Aplica o Bioclim contínuo (estilo BIOCLIM clássico) para modelagem de distribuição de espécies.
 
-                # Criar array de resultado com NaN como padrão
-                result_array = np.full_like(raster_data, np.nan, dtype=float)
+        Para cada camada, a posição do pixel na distribuição acumulada (CDF) das ocorrências é obtida com
+        `np.searchsorted` sobre os valores ordenados das ocorrências e convertida em 2 * min(p, 1 - p):
+        1 na mediana das ocorrências e 0 fora do intervalo observado. As pontuações das camadas são combinadas
+        pelo mínimo ou pela média. A pilha é processada bloco a bloco.
 
-                # Máscara para valores dentro e fora do intervalo min-max
-                mask_within_range = (raster_data >= min_value) & (raster_data <= max_value)
-                mask_outside_range = ~mask_within_range & np.isfinite(raster_data)
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list):
+            Dados contendo coordenadas de ocorrência (latitude e longitude).
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
+            Caminho para um diretório ou lista de arquivos TIFF contendo as variáveis ambientais.
+        - lat_col (str, opcional):
+            Nome da coluna com as latitudes no DataFrame (padrão: 'decimalLatitude').
+        - lon_col (str, opcional):
+            Nome da coluna com as longitudes no DataFrame (padrão: 'decimalLongitude').
+        - combine (str, opcional):
+            Forma de combinar as camadas: 'min' (padrão, BIOCLIM clássico) ou 'mean'.
+        - block_size (int, opcional):
+            Tamanho do lado de cada bloco lido da pilha, em pixels (padrão: 512).
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
+        - save (bool, opcional):
+            Indica se o mapa resultante deve ser salvo como arquivo TIFF (padrão: False).
+        - output_save (str, opcional):
+            Caminho para salvar o mapa resultante se `save=True` (padrão: 'mapa_resultante_bioclim_score.tif').
 
-                # Aplicar as máscaras ao array de resultado
-                result_array[mask_within_range] = 1
-                result_array[mask_outside_range] = 0
+        Retorno:
+        - np.ndarray:
+            Array float32 com a pontuação Bioclim em [0, 1] e NaN nos pixels sem dados.
 
-                result_arrays.append(result_array)
+        Logs:
+        - Informações de progresso e erros são registrados usando `self.logger`.
+        """
+        self.model_type = 'BioclimScore'
+        try:
+            if combine not in ('min', 'mean'):
+                raise ValueError("Método de combinação desconhecido. Escolha entre 'min' ou 'mean'.")
 
-            # Somar os arrays resultantes
-            final_result_array = np.sum(result_arrays, axis=0)
+            # Perfil de saída herdado da pilha de entrada (mesma grade, CRS e nodata)
+            profile = MapGenerator().output_profile(tiff_paths, formato=formato)
 
-            # Aplicar a normalização baseada no threshold
-            nan_mask = np.isnan(final_result_array)
+            # Valores ordenados das ocorrências em cada camada (NaN descartados)
+            raster_values = ModelDataPrepare().extract_occurrence_values(tiff_paths, occurrence_data, lat_col, lon_col)
+            ordenados = [np.sort(coluna[~np.isnan(coluna)]) for coluna in raster_values.T]
+            if any(len(valores) == 0 for valores in ordenados):
+                raise ValueError("Há camadas sem nenhum valor válido nas coordenadas de ocorrência.")
 
-            final_result_array_threshold = np.where(final_result_array >= threshold,1,0).astype(float)
-            final_result_array_threshold[nan_mask] = np.nan
+            # Pontuar a pilha bloco a bloco
+            preditor = partial(self._bioclim_score_kernel, ordenados=ordenados, combine=combine)
+            final_result_array = TileScheduler(n_jobs=n_jobs, block_size=block_size).predict_rasters(tiff_paths, preditor)
 
-            final_result_array = (final_result_array) / (threshold)  # Normaliza para [0, 1]
             self.logger.info("Mapa resultante processado com sucesso.")
 
             # Salvar o resultado se solicitado
             if save:
-                # MapGenerator.salvar_mapa(final_result_array_threshold, profile, output_save=output_save)
                 MapGenerator().save_map(final_result_array, profile, output_save=output_save)
                 self.logger.info(f"Mapa resultante salvo em: {output_save}")
 
@@ -125,7 +300,7 @@ class DistanceModeling:
             raise
 
         except Exception as e:
-            self.logger.error(f"Erro inesperado ao aplicar o algoritmo Bioclim: {e}")
+            self.logger.error(f"Erro inesperado ao aplicar o Bioclim contínuo: {e}")
             raise
 
     def sdm_mahalanobis(
@@ -135,6 +310,9 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',
+            covariance_method='empirical',
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_mahalanobis.tif'
@@ -145,7 +323,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -153,6 +331,14 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - covariance_method (str, opcional):
+            Estimador da matriz de covariância: 'empirical' (padrão) ou 'robust' (Minimum Covariance Determinant,
+            indicado para ocorrências com outliers).
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -161,37 +347,34 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias de Mahalanobis para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
         
         Logs:
         - Informações de progresso e possíveis erros durante o processamento.
         """
         self.model_type = 'Mahalanobis'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['mahalanobis'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, covariance_method=covariance_method, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col,formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
-            # Calcular a matriz de covariância e sua inversa
-            cov_matrix = np.cov(raster_values, rowvar=False)
-            VI = np.linalg.inv(cov_matrix)
-            self.logger.info("Matriz de covariância e inversa calculadas.")
+            # Fatorar a matriz de covariância uma única vez (matriz de branqueamento)
+            W = self._mahalanobis_whitening(raster_values, covariance_method)
+            self.logger.info("Matriz de covariância fatorada.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            # Inicializar o array de distâncias
-            n_lat, n_lon, n_layers = matriz.shape
-            distancias_array = np.full((n_lat, n_lon), np.nan, dtype=float)  # Inicializa com NaN
-
-            # Calcular a distância de Mahalanobis para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair valores das camadas para o ponto
-
-                    if not np.any(np.isnan(ponto)):  # Verificar se o ponto contém apenas valores válidos
-                        distancias_array[lat_idx, lon_idx] = mahalanobis(ponto, ponto_central, VI)
-
+            # Calcular a distância de Mahalanobis para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'mahalanobis', W=W, n_jobs=n_jobs)
             self.logger.info("Distâncias de Mahalanobis calculadas para todos os pontos.")
 
             # Salvar o resultado se solicitado
@@ -203,7 +386,7 @@ class DistanceModeling:
             return distancias_array
 
         except np.linalg.LinAlgError as lae:
-            self.logger.error(f"Erro na inversão da matriz de covariância: {lae}")
+            self.logger.error(f"Erro na fatoração da matriz de covariância: {lae}")
             raise
 
         except ValueError as ve:
@@ -221,6 +404,8 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_manhattan.tif'
@@ -231,7 +416,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -239,6 +424,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -247,32 +437,30 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias de Manhattan para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
         
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Manhattan'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['manhattan'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col,formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            # Inicializar o array de distâncias
-            n_lat, n_lon, n_layers = matriz.shape
-            distancias_array = np.full((n_lat, n_lon), np.nan, dtype=float)  # Inicializa com NaN
-
-            # Calcular a distância de Manhattan para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair valores das camadas para o ponto
-
-                    if not np.any(np.isnan(ponto)):  # Verificar se o ponto contém apenas valores válidos
-                        distancias_array[lat_idx, lon_idx] = np.sum(np.abs(ponto - ponto_central))
-
+            # Calcular a distância de Manhattan para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'manhattan', n_jobs=n_jobs)
             self.logger.info("Distâncias de Manhattan calculadas para todos os pontos.")
 
             # Salvar o resultado se solicitado
@@ -298,6 +486,8 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',  # Método para calcular o ponto central
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_euclidean.tif'
@@ -308,7 +498,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -316,6 +506,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -324,39 +519,30 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias euclidianas para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Euclidean'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['euclidean'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            dists_euclidean = []
-
-            # Inicializar o array de distâncias
-            n_lat, n_lon, n_layers = matriz.shape
-            # distancias_array = np.full((n_lat, n_lon), np.nan, dtype=float)  # Inicializa com NaN
-
-            # Calcular a distância euclidiana para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair valores das camadas para o ponto
-
-                    # Verificar se o ponto tem valores NaN
-                    if np.any(np.isnan(ponto)):  # Se qualquer valor do ponto for NaN
-                        dist = np.nan  # Atribuir NaN para a distância
-                    else:
-                        dist = np.linalg.norm(ponto - ponto_central)  # Calcular a distância Euclidiana
-                    dists_euclidean.append(dist)
-
-            distancias_array = np.array(dists_euclidean).reshape(n_lat, n_lon)
+            # Calcular a distância euclidiana para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'euclidean', n_jobs=n_jobs)
             self.logger.info("Distâncias euclidianas calculadas para todos os pontos.")
 
             # Salvar o resultado se solicitado
@@ -382,6 +568,8 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',  # Método para calcular o ponto central
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_canberra.tif'
@@ -392,7 +580,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -400,6 +588,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -408,37 +601,30 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias de Canberra para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Canberra'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['canberra'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
-            # Inicializar lista para armazenar as distâncias de Canberra
-            dists_canberra = []
-            # Inicializar o array de distâncias
-            n_lat, n_lon, n_layers = matriz.shape
-
-            # Calcular a distância de Canberra para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair valores das camadas para o ponto
-
-                    if np.any(np.isnan(ponto)):  # Verificar valores NaN
-                        dist = np.nan
-                    else:
-                        dist = canberra(ponto, ponto_central)  # Calcular distância de Canberra
-
-                    dists_canberra.append(dist)
 
-            distancias_array = np.array(dists_canberra).reshape(n_lat, n_lon)
+            # Calcular a distância de Canberra para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'canberra', n_jobs=n_jobs)
             self.logger.info("Distâncias de Canberra calculadas para todos os pontos.")
 
             # Salvar o resultado se solicitado
@@ -464,6 +650,8 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_chebyshev.tif'
@@ -474,7 +662,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -482,6 +670,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -490,40 +683,30 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias de Chebyshev para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Chebyshev'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['chebyshev'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            # Inicializar lista para armazenar as distâncias de Chebyshev
-            dists_chebyshev = []
-
-            # Obter a forma da matriz 3D (latitude, longitude, camadas)
-            n_lat, n_lon, n_layers = matriz.shape
-
-            # Calcular a distância de Chebyshev para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair os valores das camadas para o ponto
-
-                    if np.any(np.isnan(ponto)):  # Verificar valores NaN
-                        dist = np.nan
-                    else:
-                        dist = chebyshev(ponto, ponto_central)  # Calcular distância de Chebyshev
-
-                    dists_chebyshev.append(dist)
-
-            # Converter a lista de distâncias em um array 2D com a forma correta
-            distancias_array = np.array(dists_chebyshev).reshape(n_lat, n_lon)
+            # Calcular a distância de Chebyshev para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'chebyshev', n_jobs=n_jobs)
 
             # Salvar o resultado se solicitado
             if save:
@@ -548,6 +731,8 @@ class DistanceModeling:
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
             central_point_method='mean',
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_cosseno.tif'
@@ -558,7 +743,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -566,6 +751,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -574,40 +764,30 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias do Cosseno para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Cosseno'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['cosine'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            # Inicializar lista para armazenar as distâncias do Cosseno
-            dists_cosseno = []
-
-            # Obter a forma da matriz 3D (latitude, longitude, camadas)
-            n_lat, n_lon, n_layers = matriz.shape
-
-            # Calcular a distância do Cosseno para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair os valores das camadas para o ponto
-
-                    if np.any(np.isnan(ponto)):  # Verificar valores NaN
-                        dist = np.nan
-                    else:
-                        dist = cosine(ponto, ponto_central)  # Calcular distância do Cosseno
-
-                    dists_cosseno.append(dist)
-
-            # Converter a lista de distâncias em um array 2D com a forma correta
-            distancias_array = np.array(dists_cosseno).reshape(n_lat, n_lon)
+            # Calcular a distância do Cosseno para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'cosine', n_jobs=n_jobs)
 
             # Salvar o resultado se solicitado
             if save:
@@ -633,6 +813,8 @@ class DistanceModeling:
             lon_col='decimalLongitude',
             central_point_method='mean',
             p=3,  # Parâmetro de Minkowski (p=1 é Manhattan, p=2 é Euclidiana, p>2 é generalizado)
+            block_size=None,
+            n_jobs=1,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_minkowski.tif'
@@ -643,7 +825,7 @@ class DistanceModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame ou list):
             Dados contendo coordenadas de ocorrência (latitude e longitude).
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
         - central_point_method (str, opcional):
             Método para calcular o ponto central ('media', 'mediana' ou 'moda').
@@ -653,6 +835,11 @@ class DistanceModeling:
             Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
         - lon_col (str, opcional):
             Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
         - save (bool, opcional):
             Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
         - output_save (str, opcional):
@@ -661,44 +848,139 @@ class DistanceModeling:
         Retorno:
         - np.ndarray:
             Array 2D com as distâncias de Minkowski para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
         Logs:
         - Mensagens de progresso e erros são registrados usando `self.logger`.
         """
         self.model_type = 'Minkowski'
         try:
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                return self._distances_by_blocks(
+                    occurrence_data, tiff_paths, ['minkowski'], [output_save], lat_col, lon_col,
+                    central_point_method, block_size, p=p, n_jobs=n_jobs
+                )[0]
+
             # Preparar os dados dos rasters
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
             self.logger.info("Dados de raster preparados com sucesso.")
 
             # Calcular o ponto central com o método especificado
             ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
             self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
 
-            # Inicializar lista para armazenar as distâncias de Minkowski
-            dists_minkowski = []
+            # Calcular a distância de Minkowski para todos os pixels de uma vez
+            distancias_array = self._distance_map(matriz, ponto_central, 'minkowski', p=p, n_jobs=n_jobs)
+
+            # Salvar o resultado se solicitado
+            if save:
+                # MapGenerator.salvar_mapa(final_result_array_threshold, profile, output_save=output_save)
+                MapGenerator().save_map(distancias_array, profile, output_save=output_save)
+                self.logger.info(f"Mapa resultante salvo em: {output_save}")
 
-            # Obter a forma da matriz 3D (latitude, longitude, camadas)
-            n_lat, n_lon, n_layers = matriz.shape
+            return distancias_array
 
-            # Calcular a distância de Minkowski para cada ponto no raster
-            for lat_idx in range(n_lat):
-                for lon_idx in range(n_lon):
-                    ponto = matriz[lat_idx, lon_idx, :]  # Extrair os valores das camadas para o ponto
+        except ValueError as ve:
+            self.logger.error(f"Erro de validação nos dados: {ve}")
+            raise
 
-                    if np.any(np.isnan(ponto)):  # Verificar valores NaN
-                        dist = np.nan
-                    else:
-                        dist = minkowski(ponto, ponto_central, p)  # Calcular distância de Minkowski
+        except Exception as e:
+            self.logger.error(f"Erro inesperado durante o cálculo de distância de Minkowski: {e}")
+            raise
+
+    def sdm_domain(
+            self,
+            occurrence_data,
+            tiff_paths,
+            lat_col='decimalLatitude',
+            lon_col='decimalLongitude',
+            k=1,
+            similarity=False,
+            block_size=None,
+            n_jobs=1,
+            save=False,
+            formato='GTiff',
+            output_save='mapa_resultante_domain.tif'
+        ):
+        """
+        Calcula a distância de Gower (modelo DOMAIN) de cada pixel até as `k` ocorrências mais próximas
+        no espaço ambiental.
+
+        Cada camada é dividida pela sua amplitude nas ocorrências, e a distância é a média das diferenças
+        absolutas (Manhattan escalonada). A busca usa uma KD-tree construída uma única vez sobre os valores
+        ambientais das ocorrências e é feita bloco a bloco.
+
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list):
+            Dados contendo coordenadas de ocorrência (latitude e longitude).
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
+            Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
+        - lat_col (str, opcional):
+            Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
+        - lon_col (str, opcional):
+            Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - k (int, opcional):
+            Número de ocorrências mais próximas cuja distância média é usada (padrão: 1, DOMAIN clássico).
+        - similarity (bool, opcional):
+            Se True, retorna a similaridade DOMAIN (1 - distância de Gower) em vez da distância (padrão: False).
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels lidos por janela
+            e escreve o resultado diretamente em `output_save`, sem carregar a pilha inteira na memória.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
+        - save (bool, opcional):
+            Indica se o resultado deve ser salvo em arquivo TIFF (padrão: False).
+        - output_save (str, opcional):
+            Caminho para salvar o arquivo de saída, se `save=True` (padrão: 'mapa_resultante_domain.tif').
+
+        Retorno:
+        - np.ndarray:
+            Array 2D float32 com as distâncias de Gower (ou similaridades) para cada ponto do raster.
+            Com `block_size`, retorna o caminho do GeoTIFF escrito.
 
-                    dists_minkowski.append(dist)
+        Logs:
+        - Mensagens de progresso e erros são registrados usando `self.logger`.
+
+        Exceções:
+        - ValueError: Se `k` não for um inteiro positivo ou se nenhuma ocorrência tiver dados válidos.
+        """
+        self.model_type = 'DOMAIN'
+        try:
+            if int(k) != k or k < 1:
+                raise ValueError("O parâmetro 'k' deve ser um inteiro positivo.")
+
+            # Extrair os valores ambientais das ocorrências
+            if block_size:
+                raster_values = ModelDataPrepare().extract_occurrence_values(tiff_paths, occurrence_data, lat_col, lon_col)
+            else:
+                matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
+                self.logger.info("Dados de raster preparados com sucesso.")
+
+            # Construir a KD-tree sobre as ocorrências escalonadas pela amplitude de cada camada
+            raster_values = raster_values[~np.isnan(raster_values).any(axis=1)]
+            if raster_values.shape[0] == 0:
+                raise ValueError("Nenhuma ocorrência possui valores válidos em todas as camadas.")
+
+            amplitude = np.ptp(raster_values, axis=0)
+            amplitude[amplitude == 0] = 1.0  # Camadas constantes nas ocorrências não escalonam
+            tree = cKDTree(raster_values / amplitude)
+            k = min(int(k), raster_values.shape[0])
+            self.logger.info(f"KD-tree construída com {raster_values.shape[0]} ocorrências (k={k}).")
+
+            preditor = partial(self._domain_kernel, tree=tree, amplitude=amplitude, k=k, similarity=similarity)
+
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                TileScheduler(n_jobs=n_jobs, block_size=block_size).write_rasters(tiff_paths, preditor, output_save)
+                self.logger.info(f"Mapa resultante salvo em: {output_save}")
+                return output_save
 
-            # Converter a lista de distâncias em um array 2D com a forma correta
-            distancias_array = np.array(dists_minkowski).reshape(n_lat, n_lon)
+            distancias_array = TileScheduler(n_jobs=n_jobs).predict_matrix(matriz, preditor)
+            self.logger.info("Distâncias de Gower calculadas para todos os pontos.")
 
             # Salvar o resultado se solicitado
             if save:
-                # MapGenerator.salvar_mapa(final_result_array_threshold, profile, output_save=output_save)
                 MapGenerator().save_map(distancias_array, profile, output_save=output_save)
                 self.logger.info(f"Mapa resultante salvo em: {output_save}")
 
@@ -709,5 +991,485 @@ class DistanceModeling:
             raise
 
         except Exception as e:
-            self.logger.error(f"Erro inesperado durante o cálculo de distância de Minkowski: {e}")
+            self.logger.error(f"Erro inesperado durante o cálculo do DOMAIN: {e}")
             raise
+
+    def sdm_distances(
+            self,
+            occurrence_data,
+            tiff_paths,
+            metrics=('euclidean', 'manhattan', 'chebyshev', 'mahalanobis'),
+            lat_col='decimalLatitude',
+            lon_col='decimalLongitude',
+            central_point_method='mean',
+            p=3,
+            covariance_method='empirical',
+            block_size=None,
+            n_jobs=1,
+            save=False,
+            formato='GTiff',
+            output_dir='.'
+        ):
+        """
+        Calcula várias métricas de distância em uma única passada, lendo a pilha de rasters
+        e calculando o ponto central apenas uma vez.
+
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list):
+            Dados contendo coordenadas de ocorrência (latitude e longitude).
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
+            Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
+        - metrics (list, opcional):
+            Métricas a calcular: 'manhattan', 'euclidean', 'canberra', 'chebyshev', 'cosine', 'minkowski'
+            e/ou 'mahalanobis' (padrão: euclidiana, Manhattan, Chebyshev e Mahalanobis).
+        - lat_col (str, opcional):
+            Nome da coluna de latitude no DataFrame (padrão: 'decimalLatitude').
+        - lon_col (str, opcional):
+            Nome da coluna de longitude no DataFrame (padrão: 'decimalLongitude').
+        - central_point_method (str, opcional):
+            Método para calcular o ponto central ('mean', 'median' ou 'mode').
+        - p (float, opcional):
+            Parâmetro da distância de Minkowski.
+        - covariance_method (str, opcional):
+            Estimador da covariância para Mahalanobis: 'empirical' ou 'robust'.
+        - block_size (int, opcional):
+            Se informado, processa os rasters em blocos de `block_size` x `block_size` pixels, lendo cada bloco
+            uma única vez para todas as métricas e escrevendo os mapas diretamente em `output_dir`.
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
+        - save (bool, opcional):
+            Indica se os mapas devem ser salvos em arquivos TIFF (padrão: False).
+        - output_dir (str, opcional):
+            Diretório onde os mapas são salvos como 'mapa_resultante_<métrica>.tif', se `save=True`.
+
+        Retorno:
+        - dict:
+            Dicionário {métrica: np.ndarray} com o mapa de distâncias de cada métrica.
+            Com `block_size`, o dicionário contém o caminho do GeoTIFF escrito para cada métrica.
+
+        Logs:
+        - Mensagens de progresso e erros são registrados usando `self.logger`.
+        """
+        self.model_type = 'MultiDistance'
+        try:
+            metricas_validas = ('manhattan', 'euclidean', 'canberra', 'chebyshev', 'cosine', 'minkowski', 'mahalanobis')
+            desconhecidas = [metric for metric in metrics if metric not in metricas_validas]
+            if desconhecidas:
+                raise ValueError(f"Métricas desconhecidas: {desconhecidas}. Use {list(metricas_validas)}.")
+
+            # Executar fora da memória, bloco a bloco, se solicitado
+            if block_size:
+                output_paths = [os.path.join(output_dir, f"mapa_resultante_{metric}.tif") for metric in metrics]
+                self._distances_by_blocks(
+                    occurrence_data, tiff_paths, list(metrics), output_paths, lat_col, lon_col,
+                    central_point_method, block_size, p=p, covariance_method=covariance_method, n_jobs=n_jobs
+                )
+                return dict(zip(metrics, output_paths))
+
+            # Preparar os dados dos rasters uma única vez para todas as métricas
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
+            self.logger.info("Dados de raster preparados com sucesso.")
+
+            # Calcular o ponto central com o método especificado
+            ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
+            self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
+
+            W = None
+            if 'mahalanobis' in metrics:
+                W = self._mahalanobis_whitening(raster_values, covariance_method)
+                self.logger.info("Matriz de covariância fatorada.")
+
+            mapas = {}
+            for metric in metrics:
+                mapas[metric] = self._distance_map(matriz, ponto_central, metric, p=p, W=W, n_jobs=n_jobs)
+                self.logger.info(f"Distâncias '{metric}' calculadas para todos os pontos.")
+
+                # Salvar o resultado se solicitado
+                if save:
+                    output_save = os.path.join(output_dir, f"mapa_resultante_{metric}.tif")
+                    MapGenerator().save_map(mapas[metric], profile, output_save=output_save)
+                    self.logger.info(f"Mapa resultante salvo em: {output_save}")
+
+            return mapas
+
+        except np.linalg.LinAlgError as lae:
+            self.logger.error(f"Erro na fatoração da matriz de covariância: {lae}")
+            raise
+
+        except ValueError as ve:
+            self.logger.error(f"Erro de validação nos dados: {ve}")
+            raise
+
+        except Exception as e:
+            self.logger.error(f"Erro inesperado durante o cálculo das distâncias: {e}")
+            raise
+
+    def sdm_distances_batch(
+            self,
+            occurrence_sets,
+            tiff_paths,
+            metric='euclidean',
+            lat_col='decimalLatitude',
+            lon_col='decimalLongitude',
+            central_point_method='mean',
+            p=3,
+            covariance_method='empirical',
+            block_size=512,
+            n_jobs=1,
+            output_dir='.'
+        ):
+        """
+        Calcula mapas de distância para várias espécies sobre a mesma pilha de rasters,
+        lendo cada bloco da pilha uma única vez para todo o lote.
+
+        Os pontos centrais (e as matrizes de covariância, para Mahalanobis) de todas as espécies são calculados
+        antes da varredura; cada bloco é então comparado com todas as espécies por operações matriciais
+        e um mapa é escrito por espécie.
+
+        Parâmetros:
+        - occurrence_sets (dict):
+            Dicionário {nome_da_espécie: pd.DataFrame} com as ocorrências de cada espécie.
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
+            Caminho para um diretório ou uma lista de caminhos para arquivos TIFF.
+        - metric (str, opcional):
+            Métrica de distância (ver `sdm_distances`). Padrão: 'euclidean'.
+        - lat_col (str, opcional):
+            Nome da coluna de latitude nos DataFrames (padrão: 'decimalLatitude').
+        - lon_col (str, opcional):
+            Nome da coluna de longitude nos DataFrames (padrão: 'decimalLongitude').
+        - central_point_method (str, opcional):
+            Método para calcular o ponto central ('mean', 'median' ou 'mode').
+        - p (float, opcional):
+            Parâmetro da distância de Minkowski.
+        - covariance_method (str, opcional):
+            Estimador da covariância para Mahalanobis: 'empirical' ou 'robust'.
+        - block_size (int, opcional):
+            Tamanho do lado de cada bloco lido da pilha, em pixels (padrão: 512).
+        - n_jobs (int, opcional):
+            Número de processos usados para calcular os blocos em paralelo (padrão: 1; -1 usa todos os núcleos).
+        - output_dir (str, opcional):
+            Diretório onde os mapas são salvos como 'mapa_resultante_<métrica>_<espécie>.tif'.
+
+        Retorno:
+        - dict:
+            Dicionário {nome_da_espécie: caminho do GeoTIFF escrito}.
+
+        Logs:
+        - Mensagens de progresso e erros são registrados usando `self.logger`.
+        """
+        self.model_type = 'BatchDistance'
+        try:
+            if not occurrence_sets:
+                raise ValueError("Nenhum conjunto de ocorrências foi fornecido.")
+
+            especies = list(occurrence_sets)
+
+            # Extrair os valores de todas as espécies de uma só vez e separá-los por espécie
+            coordenadas = pd.concat(
+                [pd.DataFrame(occurrence_sets[nome])[[lat_col, lon_col]] for nome in especies], ignore_index=True
+            )
+            todos_valores = ModelDataPrepare().extract_occurrence_values(tiff_paths, coordenadas, lat_col, lon_col)
+            limites = np.cumsum([len(occurrence_sets[nome]) for nome in especies])[:-1]
+            valores_por_especie = np.split(todos_valores, limites)
+
+            # Pontos centrais (espécies x camadas) e matrizes de branqueamento
+            centros = np.array([
+                ModelDataPrepare().calculate_central_point(valores, central_point_method)
+                for valores in valores_por_especie
+            ], dtype=np.float64)
+            Ws = None
+            if metric == 'mahalanobis':
+                Ws = [self._mahalanobis_whitening(valores, covariance_method) for valores in valores_por_especie]
+            self.logger.info(f"Pontos centrais calculados para {len(especies)} espécies.")
+
+            output_paths = [os.path.join(output_dir, f"mapa_resultante_{metric}_{nome}.tif") for nome in especies]
+
+            preditor = partial(self._batch_distance_kernel, centros=centros, metric=metric, p=p, Ws=Ws)
+            TileScheduler(n_jobs=n_jobs, block_size=block_size).write_rasters(tiff_paths, preditor, output_paths)
+            self.logger.info(f"Mapas de distância '{metric}' salvos para {len(especies)} espécies em: {output_dir}")
+
+            return dict(zip(especies, output_paths))
+
+        except ValueError as ve:
+            self.logger.error(f"Erro de validação nos dados: {ve}")
+            raise
+
+        except Exception as e:
+            self.logger.error(f"Erro inesperado durante o cálculo das distâncias em lote: {e}")
+            raise
+
+    def _distances_by_blocks(
+            self,
+            occurrence_data,
+            tiff_paths,
+            metrics,
+            output_paths,
+            lat_col,
+            lon_col,
+            central_point_method,
+            block_size,
+            p=3,
+            covariance_method='empirical',
+            n_jobs=1
+        ):
+        """
+        Calcula uma ou mais métricas de distância bloco a bloco, lendo os rasters por janelas
+        e escrevendo cada bloco diretamente nos GeoTIFFs de saída.
+
+        Apenas os valores nas ocorrências são extraídos antecipadamente; o pico de memória é definido por `block_size`.
+
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list): Dados contendo coordenadas de ocorrência.
+        - tiff_paths (str, list, RasterStack ou PreparedDataset): Caminho para um diretório ou lista de arquivos TIFF.
+        - metrics (list): Métricas a calcular (ver `_distance_kernel`).
+        - output_paths (list): Caminhos dos GeoTIFFs de saída, um por métrica.
+        - lat_col (str): Nome da coluna de latitude.
+        - lon_col (str): Nome da coluna de longitude.
+        - central_point_method (str): Método para calcular o ponto central.
+        - block_size (int): Tamanho do lado de cada bloco, em pixels.
+        - p (float, opcional): Parâmetro da distância de Minkowski.
+        - covariance_method (str, opcional): Estimador da covariância para Mahalanobis.
+        - n_jobs (int, opcional): Número de processos usados para calcular os blocos.
+
+        Retorno:
+        - list: Caminhos dos GeoTIFFs escritos.
+        """
+        raster_values = ModelDataPrepare().extract_occurrence_values(tiff_paths, occurrence_data, lat_col, lon_col)
+
+        ponto_central = ModelDataPrepare().calculate_central_point(raster_values, central_point_method)
+        self.logger.info(f"Ponto central calculado usando o método '{central_point_method}'.")
+
+        W = None
+        if 'mahalanobis' in metrics:
+            W = self._mahalanobis_whitening(raster_values, covariance_method)
+            self.logger.info("Matriz de covariância fatorada.")
+
+        preditor = partial(self._multi_distance_kernel, ponto_central=ponto_central, metrics=metrics, p=p, W=W)
+        TileScheduler(n_jobs=n_jobs, block_size=block_size).write_rasters(tiff_paths, preditor, output_paths)
+        for metric, output_save in zip(metrics, output_paths):
+            self.logger.info(f"Mapa resultante ('{metric}') salvo em: {output_save}")
+
+        return output_paths
+
+    def _distance_map(self, matriz, ponto_central, metric, p=3, W=None, n_jobs=1):
+        """
+        Calcula o mapa de distâncias de todos os pixels de uma matriz 3D até o ponto central.
+
+        Os pixels são processados em blocos pelo `TileScheduler`, o que limita a memória temporária
+        e permite o cálculo em paralelo.
+
+        Parâmetros:
+        - matriz (np.ndarray ou ValidPixelStack): Matriz 3D com as camadas ambientais (linhas x colunas x camadas)
+        ou pilha compacta com os pixels válidos.
+        - ponto_central (np.ndarray): Vetor com o ponto central de cada camada.
+        - metric (str): Métrica de distância (ver `_distance_kernel`).
+        - p (float, opcional): Parâmetro da distância de Minkowski.
+        - W (np.ndarray, opcional): Matriz de branqueamento, usada pela distância de Mahalanobis.
+        - n_jobs (int, opcional): Número de processos usados para calcular os blocos.
+
+        Retorno:
+        - np.ndarray: Array 2D float32 com as distâncias e NaN nos pixels sem dados.
+        """
+        preditor = partial(self._distance_kernel, ponto_central=ponto_central, metric=metric, p=p, W=W)
+        return TileScheduler(n_jobs=n_jobs).predict_matrix(matriz, preditor)
+
+    def _multi_distance_kernel(self, block, ponto_central, metrics, p=3, W=None):
+        """
+        Calcula várias métricas de distância para o mesmo bloco.
+
+        Retorno:
+        - np.ndarray: Matriz float32 (pixels x métricas).
+        """
+        return np.column_stack([self._distance_kernel(block, ponto_central, metric, p=p, W=W) for metric in metrics])
+
+    def _batch_distance_kernel(self, block, centros, metric, p=3, Ws=None):
+        """
+        Calcula a distância de cada pixel de um bloco até o ponto central de várias espécies.
+
+        A distância euclidiana usa uma única multiplicação de matrizes para todas as espécies
+        (||x - c||² = ||x||² - 2 x·c + ||c||²); as demais métricas aplicam `_distance_kernel` por espécie
+        sobre o mesmo bloco.
+
+        Parâmetros:
+        - block (np.ndarray): Matriz 2D (pixels x camadas).
+        - centros (np.ndarray): Matriz 2D (espécies x camadas) com os pontos centrais.
+        - metric (str): Métrica de distância (ver `_distance_kernel`).
+        - p (float, opcional): Parâmetro da distância de Minkowski.
+        - Ws (list, opcional): Matrizes de branqueamento por espécie, obrigatórias para 'mahalanobis'.
+
+        Retorno:
+        - np.ndarray: Matriz float32 (pixels x espécies), com NaN nos pixels sem dados.
+        """
+        if metric != 'euclidean':
+            return np.column_stack([
+                self._distance_kernel(block, centro, metric, p=p, W=Ws[idx] if Ws is not None else None)
+                for idx, centro in enumerate(centros)
+            ])
+
+        valid = ~np.isnan(block).any(axis=1)
+        distancias = np.full((block.shape[0], centros.shape[0]), np.nan, dtype=np.float32)
+
+        pontos = block[valid].astype(np.float64)
+        quadrados = (
+            np.einsum('ij,ij->i', pontos, pontos)[:, None]
+            - 2.0 * (pontos @ centros.T)
+            + np.einsum('ij,ij->i', centros, centros)[None, :]
+        )
+        distancias[valid] = np.sqrt(np.maximum(quadrados, 0.0))
+        return distancias
+
+    def _bioclim_score_kernel(self, block, ordenados, combine='min'):
+        """
+        Calcula a pontuação Bioclim contínua de cada pixel de um bloco.
+
+        A CDF empírica usa o posto médio (média de `searchsorted` à esquerda e à direita),
+        o que torna a pontuação simétrica em torno da mediana das ocorrências.
+
+        Parâmetros:
+        - block (np.ndarray): Matriz 2D (pixels x camadas).
+        - ordenados (list): Valores ordenados das ocorrências para cada camada.
+        - combine (str): 'min' ou 'mean'.
+
+        Retorno:
+        - np.ndarray: Vetor float32 com uma pontuação por pixel e NaN nos pixels sem dados.
+        """
+        valid = ~np.isnan(block).any(axis=1)
+        scores = np.full(block.shape[0], np.nan, dtype=np.float32)
+
+        pontos = block[valid]
+        por_camada = np.empty(pontos.shape, dtype=np.float64)
+        for idx, valores in enumerate(ordenados):
+            postos = np.searchsorted(valores, pontos[:, idx], side='left') + np.searchsorted(valores, pontos[:, idx], side='right')
+            cdf = postos / (2.0 * len(valores))
+            por_camada[:, idx] = 2.0 * np.minimum(cdf, 1.0 - cdf)
+
+        scores[valid] = por_camada.min(axis=1) if combine == 'min' else por_camada.mean(axis=1)
+        return scores
+
+    def _domain_kernel(self, block, tree, amplitude, k=1, similarity=False):
+        """
+        Consulta na KD-tree a distância de Gower de cada pixel de um bloco até as `k` ocorrências mais próximas.
+
+        Parâmetros:
+        - block (np.ndarray): Matriz 2D (pixels x camadas) sem NaN.
+        - tree (cKDTree): Árvore construída sobre as ocorrências divididas por `amplitude`.
+        - amplitude (np.ndarray): Amplitude de cada camada nas ocorrências.
+        - k (int, opcional): Número de vizinhos considerados.
+        - similarity (bool, opcional): Se True, retorna 1 - distância.
+
+        Retorno:
+        - np.ndarray: Vetor float32 com a distância (ou similaridade) de cada pixel.
+        """
+        # Manhattan (p=1) no espaço escalonado, dividida pelo número de camadas
+        distancias, _ = tree.query(block / amplitude, k=k, p=1)
+        if k > 1:
+            distancias = distancias.mean(axis=1)
+        distancias = distancias / block.shape[1]
+
+        if similarity:
+            distancias = 1.0 - distancias
+        return distancias.astype(np.float32)
+
+    def _mahalanobis_whitening(self, raster_values, covariance_method='empirical'):
+        """
+        Fatora a matriz de covariância das ocorrências e retorna a matriz de branqueamento `W`,
+        tal que a distância de Mahalanobis de `x` é `||(x - centro) @ W||`.
+
+        A fatoração usa Cholesky; se a matriz for singular ou quase singular (camadas colineares),
+        usa a decomposição espectral com pseudo-inversa, descartando as direções sem variância.
+
+        Parâmetros:
+        - raster_values (np.ndarray): Matriz 2D (ocorrências x camadas).
+        - covariance_method (str, opcional): 'empirical' (np.cov) ou 'robust' (MinCovDet).
+
+        Retorno:
+        - np.ndarray: Matriz de branqueamento (camadas x posto).
+
+        Exceções:
+        - ValueError: Se o método de covariância for desconhecido ou não houver ocorrências válidas suficientes.
+        """
+        valores = np.asarray(raster_values, dtype=np.float64)
+        valores = valores[~np.isnan(valores).any(axis=1)]
+        if valores.shape[0] < 2:
+            raise ValueError("São necessárias ao menos duas ocorrências válidas para estimar a covariância.")
+
+        if covariance_method == 'empirical':
+            cov_matrix = np.atleast_2d(np.cov(valores, rowvar=False))
+        elif covariance_method == 'robust':
+            cov_matrix = MinCovDet(random_state=42).fit(valores).covariance_
+            self.logger.info("Covariância robusta (MCD) estimada.")
+        else:
+            raise ValueError("Método de covariância desconhecido. Escolha entre 'empirical' ou 'robust'.")
+
+        # Tolerância relativa equivalente à usada por np.linalg.pinv
+        tol = np.finfo(np.float64).eps * cov_matrix.shape[0] * np.abs(cov_matrix).max()
+
+        try:
+            L = np.linalg.cholesky(cov_matrix)
+            if np.min(np.diag(L)) ** 2 <= tol:
+                raise np.linalg.LinAlgError("Matriz de covariância quase singular.")
+            # inv(cov) = inv(L).T @ inv(L), logo W = inv(L).T
+            return solve_triangular(L, np.eye(L.shape[0]), lower=True).T
+        except np.linalg.LinAlgError:
+            autovalores, autovetores = np.linalg.eigh(cov_matrix)
+            mantidos = autovalores > tol
+            self.logger.warning(
+                f"Matriz de covariância singular ou mal condicionada; usando pseudo-inversa com "
+                f"{mantidos.sum()} de {len(autovalores)} direções."
+            )
+            return autovetores[:, mantidos] / np.sqrt(autovalores[mantidos])
+
+    def _distance_kernel(self, block, ponto_central, metric, p=3, W=None):
+        """
+        Calcula, de forma vetorizada, a distância de cada pixel de um bloco até o ponto central.
+
+        Os cálculos são feitos em float64 e reproduzem as funções escalares de `scipy.spatial.distance`;
+        pixels com qualquer camada NaN recebem NaN.
+
+        Parâmetros:
+        - block (np.ndarray): Matriz 2D (pixels x camadas).
+        - ponto_central (np.ndarray): Vetor com o ponto central de cada camada.
+        - metric (str): 'manhattan', 'euclidean', 'canberra', 'chebyshev', 'cosine', 'minkowski' ou 'mahalanobis'.
+        - p (float, opcional): Parâmetro da distância de Minkowski.
+        - W (np.ndarray, opcional): Matriz de branqueamento (ver `_mahalanobis_whitening`), obrigatória para 'mahalanobis'.
+
+        Retorno:
+        - np.ndarray: Vetor float32 com uma distância por pixel.
+
+        Exceções:
+        - ValueError: Se a métrica for desconhecida ou se `W` não for fornecida para 'mahalanobis'.
+        """
+        valid = ~np.isnan(block).any(axis=1)
+        distancias = np.full(block.shape[0], np.nan, dtype=np.float32)
+
+        pontos = block[valid].astype(np.float64)
+        centro = np.asarray(ponto_central, dtype=np.float64)
+        diff = pontos - centro
+
+        if metric == 'manhattan':
+            dist = np.abs(diff).sum(axis=1)
+        elif metric == 'euclidean':
+            dist = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        elif metric == 'chebyshev':
+            dist = np.abs(diff).max(axis=1)
+        elif metric == 'minkowski':
+            dist = (np.abs(diff) ** p).sum(axis=1) ** (1.0 / p)
+        elif metric == 'canberra':
+            # Termos 0/0 contribuem com zero, como em scipy.spatial.distance.canberra
+            denominador = np.abs(pontos) + np.abs(centro)
+            termos = np.divide(np.abs(diff), denominador, out=np.zeros_like(diff), where=denominador != 0)
+            dist = termos.sum(axis=1)
+        elif metric == 'cosine':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                similaridade = (pontos @ centro) / np.sqrt(np.einsum('ij,ij->i', pontos, pontos) * (centro @ centro))
+            dist = np.clip(1.0 - similaridade, 0.0, 2.0)
+        elif metric == 'mahalanobis':
+            if W is None:
+                raise ValueError("A distância de Mahalanobis requer a matriz de branqueamento (W).")
+            branqueado = diff @ W
+            dist = np.sqrt(np.einsum('ij,ij->i', branqueado, branqueado))
+        else:
+            raise ValueError(f"Métrica de distância desconhecida: '{metric}'.")
+
+        distancias[valid] = dist
+        return distancias
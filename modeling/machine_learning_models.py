@@ -1,21 +1,67 @@
 # Modelos baseados em ML como SVM, RF, ANN
 import os
+import copy
+import time
 import numpy as np
 import pandas as pd
 from sklearn.svm import SVC
+from sklearn.pipeline import Pipeline
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.linear_model import SGDClassifier
+from sklearn.kernel_approximation import Nystroem, RBFSampler
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV,train_test_split
+from sklearn.metrics import get_scorer, log_loss
+from sklearn.model_selection import GridSearchCV, ParameterGrid, ParameterSampler, check_cv, train_test_split
 
 from EcoDistrib.common import msg_logger
 from EcoDistrib.outputs import MapGenerator
 from EcoDistrib.modeling import ModelDataPrepare
+from EcoDistrib.modeling.model_artifacts import ModelArtifact
+from EcoDistrib.utils import TileScheduler
+
+class _ProbabilityPredictor:
+    """
+    Preditor serializável (pickle) usado pelo `TileScheduler`: aplica a normalização, se houver,
+    e retorna a probabilidade da classe de presença.
+    """
+    def __init__(self, model, scaler=None, n_components=0):
+        self.model = model
+        self.scaler = scaler
+        self.n_components = n_components  # Dimensão do mapa de características aproximado (SVM escalável)
+
+    def __call__(self, X):
+        if self.scaler is not None:
+            # Uma única cópia do bloco (que pode ser uma vista da pilha compartilhada), normalizada no próprio lugar
+            X = self.scaler.transform(np.array(X), copy=False)
+        return self.model.predict_proba(X)[:, 1]
+
+    def bytes_per_row(self, n_layers):
+        """
+        Estimativa da memória temporária, em bytes, usada por pixel na predição de um bloco
+        (usada pelo orçamento de memória do `TileScheduler`).
+        """
+        n_bytes = 8 * n_layers  # Cópia normalizada / conversão para float64
+        n_bytes += 16 * len(getattr(self.model, 'classes_', (0, 1)))  # predict_proba e acumuladores
+
+        if hasattr(self.model, 'support_vectors_'):
+            # SVM: linha da matriz de kernel contra todos os vetores de suporte
+            n_bytes += 8 * self.model.support_vectors_.shape[0]
+        if hasattr(self.model, 'coefs_'):
+            # ANN: ativações de todas as camadas
+            n_bytes += 8 * sum(coef.shape[1] for coef in self.model.coefs_)
+        # SVM escalável: características de Nystroem / Fourier (e a cópia feita pelo escalonamento do SGD)
+        n_bytes += 16 * self.n_components
+
+        return n_bytes
+
 
 class MLModeling:
     def __init__(self):
         self.logger = msg_logger
         self.model_type = None
+        self.artifact = None
 
     def sdm_svm(
             self,
@@ -27,11 +73,17 @@ class MLModeling:
             kernel='rbf',
             C=1.0,
             gamma='scale',
+            approximation=None,
+            n_components=500,
             normalize=True,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_svm.tif',
-            pseudo_absence_ratio=0.3
+            pseudo_absence_ratio=0.3,
+            n_jobs=1,
+            memory_budget_mb=None,
+            backend='process',
+            artifact_path=None
         ):
         """
         Aplica o modelo SVM para predizer a distribuição das espécies.
@@ -39,7 +91,7 @@ class MLModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame): 
             Dados de ocorrência contendo latitude, longitude e presença/ausência.
-        - tiff_paths (str ou list): 
+        - tiff_paths (str, list, RasterStack ou PreparedDataset): 
             Caminhos para os arquivos TIFF com dados ambientais.
         - lat_col (str): 
             Nome da coluna com a latitude no DataFrame.
@@ -53,12 +105,29 @@ class MLModeling:
             Parâmetro de regularização do SVM.
         - gamma (str ou float): 
             Coeficiente do kernel. Pode ser 'scale', 'auto' ou um valor float.
+        - approximation (str, opcional):
+            Modo para grandes volumes de dados: 'nystroem' (qualquer kernel) ou 'rff' (random Fourier features, apenas 'rbf').
+            O kernel é aproximado por `n_components` características, um SVM linear é treinado com SGD e as probabilidades
+            vêm de uma única calibração (Platt) em uma parte separada do treino. Treino e predição escalam linearmente.
+            Se None (padrão), usa o `SVC` exato.
+        - n_components (int):
+            Número de características da aproximação do kernel (padrão: 500).
         - normalize (bool): 
             Se True, normaliza os dados de entrada.
         - save (bool): 
             Se True, salva o mapa resultante como um arquivo TIFF.
         - output_save (str): 
             Caminho do arquivo para salvar o mapa resultante.
+        - n_jobs (int):
+            Número de processos usados na predição do mapa, bloco a bloco (padrão: 1; -1 usa todos os núcleos).
+        - memory_budget_mb (float, opcional):
+            Memória máxima, em MB, dos blocos em andamento na predição; o tamanho dos blocos é ajustado ao orçamento.
+            Se None (padrão), usa blocos de 512 x 512 pixels.
+        - backend (str):
+            Paralelismo entre blocos: 'process' (padrão) ou 'thread'.
+        - artifact_path (str, opcional):
+            Diretório onde salvar o modelo ajustado (ver `ModelArtifact`), para projeções posteriores sem reajuste.
+            O artefato também fica disponível em `self.artifact`.
 
         Logs:
         - Informações e erros são registrados usando `self.logger`.
@@ -89,7 +158,7 @@ class MLModeling:
                 self.logger.info("Pseudoausências geradas e adicionadas aos dados de ocorrência.")
 
             # Preparar os dados de raster
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
 
             # Definir X e y
             X = raster_values
@@ -97,6 +166,7 @@ class MLModeling:
 
             # Dividir os dados em treino e teste
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+            X_train_raw = X_train  # Valores originais do treino, registrados no artefato
             self.logger.info("Dados divididos em treino e teste.")
 
             # Normalizar os dados, se necessário
@@ -108,27 +178,22 @@ class MLModeling:
             else:
                 self.logger.info("Normalização desativada.")
 
-            # Inicializar e treinar o modelo SVM
-            model = SVC(kernel=kernel, C=C, gamma=gamma, probability=True, random_state=42)
-            model.fit(X_train, y_train)
+            # Inicializar e treinar o modelo SVM (exato ou com kernel aproximado)
+            if approximation is None:
+                model = SVC(kernel=kernel, C=C, gamma=gamma, probability=True, random_state=42)
+                model.fit(X_train, y_train)
+                n_map = 0
+            else:
+                model, n_map = self._scalable_svm(X_train, y_train, kernel, C, gamma, approximation, n_components)
             self.logger.info("Modelo SVM treinado com sucesso.")
 
-            # Preparar a matriz de previsões para o mapa resultante
-            X_pred = matriz.reshape(-1, matriz.shape[2])
-            nan_rows = np.isnan(X_pred).any(axis=1)
-            X_pred_valid = X_pred[~nan_rows]
-
-            # Normalizar dados para previsões, se necessário
-            if normalize:
-                X_pred_valid = scaler.transform(X_pred_valid)
-
-            # Previsão de probabilidades
-            prediction_valid = model.predict_proba(X_pred_valid)[:, 1]
-
-            # Criar um array de previsão completo e definir NaNs onde apropriado
-            prediction_map = np.full(X_pred.shape[0], np.nan)
-            prediction_map[~nan_rows] = prediction_valid
-            prediction_map = prediction_map.reshape(matriz.shape[0], matriz.shape[1])
+            # Previsão de probabilidades bloco a bloco (NaN nos pixels sem dados)
+            predictor = _ProbabilityPredictor(model, scaler if normalize else None, n_components=n_map)
+            params = model.get_params() if approximation is None else {'kernel': kernel, 'C': C, 'gamma': gamma, 'approximation': approximation, 'n_components': n_map}
+            self.artifact = ModelArtifact.from_fit('SVM', predictor, tiff_paths, X_train_raw, y_train, params=params)
+            if artifact_path:
+                self.artifact.save(artifact_path)
+            prediction_map = TileScheduler(n_jobs=n_jobs, backend=backend, memory_budget_mb=memory_budget_mb).predict_matrix(matriz, predictor)
 
             # Salvar o resultado se solicitado
             if save:
@@ -142,13 +207,67 @@ class MLModeling:
             self.logger.error(f"Erro na execução da função `sdm_svm`: {e}")
             raise
 
+    def _scalable_svm(self, X, y, kernel, C, gamma, approximation, n_components):
+        """
+        SVM para grandes volumes de dados: aproximação do kernel (Nystroem ou random Fourier features),
+        SVM linear treinado com SGD e uma única calibração sigmoide (Platt) em 20% do treino.
+
+        Retorna (modelo calibrado, número de características da aproximação).
+        """
+        if approximation not in ('nystroem', 'rff'):
+            raise ValueError("Aproximação desconhecida. Escolha entre 'nystroem' ou 'rff'.")
+        if approximation == 'rff' and kernel != 'rbf':
+            raise ValueError("Random Fourier features aproximam apenas o kernel 'rbf'. Use approximation='nystroem'.")
+
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+
+        # gamma com a mesma convenção do SVC
+        if gamma == 'scale':
+            gamma = 1.0 / (X.shape[1] * X.var()) if X.var() > 0 else 1.0
+        elif gamma == 'auto':
+            gamma = 1.0 / X.shape[1]
+
+        X_fit, X_cal, y_fit, y_cal = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+
+        # Mapa de características (o kernel linear dispensa aproximação)
+        n_components = min(n_components, X_fit.shape[0]) if approximation == 'nystroem' else n_components
+        if kernel == 'linear':
+            feature_map, n_components = 'passthrough', 0
+        elif approximation == 'nystroem':
+            feature_map = Nystroem(kernel=kernel, gamma=gamma, n_components=n_components, random_state=42)
+        else:
+            feature_map = RBFSampler(gamma=gamma, n_components=n_components, random_state=42)
+
+        # Perda hinge com alpha = 1 / (C * n): mesmo equilíbrio entre margem e erro do SVC
+        svm = SGDClassifier(loss='hinge', alpha=1.0 / (C * X_fit.shape[0]), max_iter=1000, tol=1e-4, average=True, random_state=42)
+        pipeline = Pipeline([('kernel', feature_map), ('svm', svm)]).fit(X_fit, y_fit)
+
+        # Uma única calibração das margens em probabilidades, sobre os dados reservados
+        # (FrozenEstimator existe a partir do scikit-learn 1.6; antes disso, cv='prefit' tem o mesmo efeito)
+        try:
+            from sklearn.frozen import FrozenEstimator
+            calibrador = CalibratedClassifierCV(FrozenEstimator(pipeline), method='sigmoid')
+        except ImportError:
+            calibrador = CalibratedClassifierCV(pipeline, cv='prefit', method='sigmoid')
+        model = calibrador.fit(X_cal, y_cal)
+        self.logger.info(f"SVM escalável ({approximation}, {n_components} componentes) treinado e calibrado com {X_fit.shape[0]} + {X_cal.shape[0]} amostras.")
+
+        return model, n_components
+
     def optimize_rf_parameters(
             self,
             X,
             y,
             param_grid=None,
             cv=5,
-            scoring='accuracy'
+            scoring='accuracy',
+            search='grid',
+            n_iter=None,
+            max_fits=None,
+            time_budget=None,
+            factor=3,
+            random_state=42
         ):
         """
         Realiza a otimização de hiperparâmetros para o modelo Random Forest.
@@ -161,8 +280,9 @@ class MLModeling:
         - param_grid (dict, opcional):
             Dicionário com os parâmetros para ajustar no Random Forest.
             Padrão inclui 'n_estimators', 'max_depth', 'min_samples_split' e 'min_samples_leaf'.
-        - cv (int, opcional):
-            Número de divisões para validação cruzada (padrão: 5).
+        - cv (int, divisor de validação cruzada ou iterável, opcional):
+            Número de divisões (padrão: 5, `StratifiedKFold`) ou qualquer valor aceito pelo `GridSearchCV`.
+            As divisões são calculadas uma única vez e reutilizadas por todos os candidatos.
         - scoring (str, opcional):
             Métrica usada para avaliar a performance do modelo (padrão: 'accuracy').
                 from sklearn.metrics import SCORERS
@@ -177,6 +297,26 @@ class MLModeling:
                 - 'recall': Recall (sensitivity).
                 - 'roc_auc': Area under the ROC curve (binary classification).
                 - 'average_precision': Average precision (for imbalanced datasets).
+        - search (str, opcional):
+            Estratégia de busca:
+            - 'grid' (padrão): busca exaustiva (`GridSearchCV`) sobre todas as combinações.
+            - 'halving': successive halving em que `n_estimators` é o recurso. Todos os candidatos começam
+              com poucas árvores; a cada rodada, apenas os melhores (1/`factor`) continuam, e suas florestas crescem
+              de forma incremental (warm start) até o maior `n_estimators` do grid. Muito mais rápido que 'grid',
+              mas pode escolher outros hiperparâmetros (e, portanto, gerar outros mapas).
+            - 'random': `n_iter` candidatos sorteados do grid, avaliados diretamente com o maior `n_estimators`.
+        - n_iter (int, opcional):
+            Número máximo de candidatos em 'halving' e 'random' (padrão: todas as combinações em 'halving' e 10 em 'random').
+        - max_fits (int, opcional):
+            Orçamento em número de ajustes de floresta (cada crescimento incremental conta como um ajuste). Apenas em 'halving' e 'random'.
+            Um candidato só é avaliado se couber no orçamento em todas as divisões (o primeiro é sempre avaliado).
+        - time_budget (float, opcional):
+            Orçamento de tempo, em segundos. Ao esgotar um orçamento, a busca para e usa o melhor candidato
+            avaliado na rodada mais avançada.
+        - factor (int, opcional):
+            Fator de redução do successive halving (padrão: 3).
+        - random_state (int, opcional):
+            Semente das florestas e do sorteio de candidatos (padrão: 42).
 
         Retornos:
         - best_model (RandomForestClassifier):
@@ -190,6 +330,9 @@ class MLModeling:
         - Informações e erros são registrados usando `self.logger`.
         """
         try:
+            if search not in ('halving', 'random', 'grid'):
+                raise ValueError("Estratégia de busca desconhecida. Escolha entre 'halving', 'random' ou 'grid'.")
+
             # Grid de parâmetros padrão, se nenhum for fornecido
             if param_grid is None:
                 param_grid = {
@@ -200,30 +343,26 @@ class MLModeling:
                 }
                 self.logger.info("Nenhum param_grid fornecido. Usando o grid padrão.")
 
-            # Inicializar o modelo Random Forest
-            rf = RandomForestClassifier(random_state=42)
-            self.logger.info("Modelo Random Forest inicializado.")
-
-            # Configurar o GridSearchCV para busca de melhores parâmetros
-            grid_search = GridSearchCV(
-                estimator=rf,
-                param_grid=param_grid,
-                scoring=scoring,
-                cv=cv,
-                n_jobs=-1,
-                verbose=1
-            )
-            self.logger.info("GridSearchCV configurado com os parâmetros fornecidos.")
+            # Divisões da validação cruzada calculadas uma única vez (as mesmas que o GridSearchCV usaria com este `cv`)
+            X = np.asarray(X)
+            y = np.asarray(y)
+            folds = list(check_cv(cv, y, classifier=True).split(X, y))
 
-            # Ajustar a busca nos dados
-            grid_search.fit(X, y)
-            self.logger.info("GridSearchCV ajustado nos dados de treinamento.")
+            if search == 'grid':
+                if max_fits is not None or time_budget is not None or n_iter is not None:
+                    self.logger.warning("`n_iter`, `max_fits` e `time_budget` são ignorados em search='grid'. Use search='halving' ou 'random'.")
+                return self._grid_search_rf(X, y, param_grid, folds, scoring, random_state)
 
-            # Extrair o melhor modelo, parâmetros e pontuação
-            best_model = grid_search.best_estimator_
-            best_params = grid_search.best_params_
-            best_score = grid_search.best_score_
+            inicio = time.perf_counter()
+            best_params, best_score, n_fits = self._budgeted_search_rf(
+                X, y, param_grid, folds, scoring, search, n_iter, max_fits, time_budget, factor, random_state
+            )
+
+            # Reajustar o melhor candidato em todos os dados de treino
+            best_model = RandomForestClassifier(random_state=random_state, n_jobs=-1, **best_params)
+            best_model.fit(X, y)
 
+            self.logger.info(f"Busca '{search}' concluída: {n_fits} ajustes em {time.perf_counter() - inicio:.1f} s.")
             self.logger.info(f"Melhores parâmetros encontrados: {best_params}")
             self.logger.info(f"Melhor pontuação (CV): {best_score:.4f}")
 
@@ -237,6 +376,111 @@ class MLModeling:
             self.logger.error(f"Erro inesperado durante a otimização de parâmetros do Random Forest: {e}")
             raise
 
+    def _grid_search_rf(self, X, y, param_grid, folds, scoring, random_state):
+        """Busca exaustiva com `GridSearchCV` (todas as combinações x todas as divisões)."""
+        # Inicializar o modelo Random Forest
+        rf = RandomForestClassifier(random_state=random_state)
+        self.logger.info("Modelo Random Forest inicializado.")
+
+        # Configurar o GridSearchCV para busca de melhores parâmetros
+        grid_search = GridSearchCV(
+            estimator=rf,
+            param_grid=param_grid,
+            scoring=scoring,
+            cv=folds,
+            n_jobs=-1,
+            verbose=1
+        )
+        self.logger.info("GridSearchCV configurado com os parâmetros fornecidos.")
+
+        # Ajustar a busca nos dados
+        grid_search.fit(X, y)
+        self.logger.info("GridSearchCV ajustado nos dados de treinamento.")
+
+        # Extrair o melhor modelo, parâmetros e pontuação
+        best_model = grid_search.best_estimator_
+        best_params = grid_search.best_params_
+        best_score = grid_search.best_score_
+
+        self.logger.info(f"Melhores parâmetros encontrados: {best_params}")
+        self.logger.info(f"Melhor pontuação (CV): {best_score:.4f}")
+
+        return best_model, best_params, best_score
+
+    def _budgeted_search_rf(self, X, y, param_grid, folds, scoring, search, n_iter, max_fits, time_budget, factor, random_state):
+        """
+        Successive halving (ou busca aleatória, com uma única rodada) sobre florestas com warm start.
+
+        Retorna (melhores parâmetros, pontuação média na CV, número de ajustes).
+        """
+        scorer = get_scorer(scoring)
+        grid = dict(param_grid)
+        n_max = max(grid.pop('n_estimators', [100]))
+
+        # Candidatos: combinações dos demais parâmetros (amostradas, se excederem n_iter)
+        n_iter = n_iter if n_iter is not None else (10 if search == 'random' else None)
+        todos = ParameterGrid(grid)
+        if n_iter is not None and n_iter < len(todos):
+            candidatos = list(ParameterSampler(grid, n_iter=n_iter, random_state=random_state))
+        else:
+            candidatos = list(todos)
+
+        # Rodadas de recurso (número de árvores): n_max / factor^k, com no mínimo 10 árvores
+        n_rodadas = 1
+        if search == 'halving':
+            while factor ** n_rodadas < len(candidatos) and n_max / factor ** n_rodadas >= 10:
+                n_rodadas += 1
+        recursos = [max(1, int(round(n_max / factor ** k))) for k in reversed(range(n_rodadas))]
+
+        self.logger.info(f"Busca '{search}': {len(candidatos)} candidatos, rodadas com {recursos} árvores, {len(folds)} divisões.")
+
+        inicio = time.perf_counter()
+        n_fits = 0
+        florestas = {}
+        vivos = list(range(len(candidatos)))
+        melhor = None  # (rodada, pontuação, candidato)
+
+        def orcamento_esgotado():
+            # Sem orçamento para avaliar mais um candidato em todas as divisões
+            return (max_fits is not None and n_fits + len(folds) > max_fits) or (time_budget is not None and time.perf_counter() - inicio >= time_budget)
+
+        for rodada, n_estimators in enumerate(recursos):
+            pontuacoes = {}
+            for cand in vivos:
+                # Garante ao menos um candidato avaliado antes de respeitar o orçamento
+                if melhor is not None and orcamento_esgotado():
+                    break
+
+                notas = []
+                for fold, (train_idx, test_idx) in enumerate(folds):
+                    floresta = florestas.get((cand, fold))
+                    if floresta is None:
+                        floresta = RandomForestClassifier(warm_start=True, random_state=random_state, n_jobs=-1, **candidatos[cand])
+                        florestas[(cand, fold)] = floresta
+
+                    # Com warm start, apenas as árvores novas são treinadas
+                    floresta.set_params(n_estimators=n_estimators)
+                    floresta.fit(X[train_idx], y[train_idx])
+                    notas.append(scorer(floresta, X[test_idx], y[test_idx]))
+                    n_fits += 1
+
+                pontuacoes[cand] = float(np.mean(notas))
+                if melhor is None or (rodada, pontuacoes[cand]) > melhor[:2]:
+                    melhor = (rodada, pontuacoes[cand], cand)
+
+            # Manter apenas os melhores 1/factor candidatos (e liberar as florestas dos demais)
+            ordenados = sorted(pontuacoes, key=pontuacoes.get, reverse=True)
+            vivos = ordenados[:max(1, int(np.ceil(len(ordenados) / factor)))]
+            florestas = {chave: floresta for chave, floresta in florestas.items() if chave[0] in vivos}
+
+            if orcamento_esgotado():
+                self.logger.info(f"Orçamento da busca esgotado na rodada {rodada + 1} de {len(recursos)}.")
+                break
+
+        rodada, best_score, cand = melhor
+        best_params = dict(candidatos[cand], n_estimators=recursos[rodada])
+        return best_params, best_score, n_fits
+
     def sdm_rf(
             self,
             occurrence_data,
@@ -246,10 +490,17 @@ class MLModeling:
             presence_col='presence',
             optimize_params=True,
             param_grid=None,
+            search='grid',
+            max_fits=None,
+            time_budget=None,
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_rf.tif',
-            pseudo_absence_ratio=0.3
+            pseudo_absence_ratio=0.3,
+            n_jobs=1,
+            memory_budget_mb=None,
+            backend='process',
+            artifact_path=None
         ):
         """
         Aplica o modelo Random Forest para predizer a distribuição das espécies.
@@ -257,7 +508,7 @@ class MLModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame):
             Dados de ocorrência contendo latitude, longitude e presença/ausência.
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminhos para os arquivos TIFF com dados ambientais.
         - lat_col (str):
             Nome da coluna com a latitude no DataFrame.
@@ -269,10 +520,26 @@ class MLModeling:
             Se True, realiza otimização de hiperparâmetros do Random Forest.
         - param_grid (dict, opcional):
             Dicionário com os parâmetros para otimização, se `optimize_params=True`.
+        - search (str, opcional):
+            Estratégia da otimização: 'grid' (padrão), 'halving' ou 'random' (ver `optimize_rf_parameters`).
+        - max_fits (int, opcional):
+            Orçamento da otimização em número de ajustes de floresta.
+        - time_budget (float, opcional):
+            Orçamento da otimização em segundos.
         - save (bool, opcional):
             Se True, salva o mapa de predição como um arquivo TIFF.
         - output_save (str, opcional):
             Caminho do arquivo para salvar o mapa resultante.
+        - n_jobs (int, opcional):
+            Número de processos usados na predição do mapa, bloco a bloco (padrão: 1; -1 usa todos os núcleos).
+        - memory_budget_mb (float, opcional):
+            Memória máxima, em MB, dos blocos em andamento na predição; o tamanho dos blocos é ajustado ao orçamento.
+            Se None (padrão), usa blocos de 512 x 512 pixels.
+        - backend (str, opcional):
+            Paralelismo entre blocos: 'process' (padrão) ou 'thread'.
+        - artifact_path (str, opcional):
+            Diretório onde salvar o modelo ajustado (ver `ModelArtifact`), para projeções posteriores sem reajuste.
+            O artefato também fica disponível em `self.artifact`.
 
         Logs:
         - Informações e erros são registrados usando `self.logger`.
@@ -299,7 +566,7 @@ class MLModeling:
                 self.logger.info("Pseudoausências geradas e adicionadas aos dados de ocorrência.")
 
             # Preparar os dados de raster
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
 
             # Definir X e y
             X = raster_values
@@ -312,7 +579,9 @@ class MLModeling:
             # Otimizar parâmetros ou treinar modelo padrão
             if optimize_params:
                 self.logger.info("Iniciando otimização de parâmetros do Random Forest.")
-                rf_model, best_params, best_score = self.optimize_rf_parameters(X_train, y_train, param_grid)
+                rf_model, best_params, best_score = self.optimize_rf_parameters(
+                    X_train, y_train, param_grid, search=search, max_fits=max_fits, time_budget=time_budget
+                )
                 self.logger.info(f"Parâmetros otimizados: {best_params}")
                 self.logger.info(f"Melhor score (validação cruzada): {best_score:.4f}")
             else:
@@ -320,18 +589,13 @@ class MLModeling:
                 rf_model.fit(X_train, y_train)
                 self.logger.info("Modelo Random Forest treinado com parâmetros padrão.")
 
-            # Prever distribuição usando a matriz raster
-            X_pred = matriz.reshape(-1, matriz.shape[2])
-            nan_rows = np.isnan(X_pred).any(axis=1)
-            X_pred_valid = X_pred[~nan_rows]
-
-            # Predizer probabilidades para a classe de presença
-            prediction_valid = rf_model.predict_proba(X_pred_valid)[:, 1]
+            predictor = _ProbabilityPredictor(rf_model)
+            self.artifact = ModelArtifact.from_fit('RandomForest', predictor, tiff_paths, X_train, y_train, params=rf_model.get_params())
+            if artifact_path:
+                self.artifact.save(artifact_path)
 
-            # Criar mapa de predições com NaNs nos locais apropriados
-            prediction_map = np.full(X_pred.shape[0], np.nan)
-            prediction_map[~nan_rows] = prediction_valid
-            prediction_map = prediction_map.reshape(matriz.shape[0], matriz.shape[1])
+            # Predizer probabilidades para a classe de presença, bloco a bloco (NaN nos pixels sem dados)
+            prediction_map = TileScheduler(n_jobs=n_jobs, backend=backend, memory_budget_mb=memory_budget_mb).predict_matrix(matriz, predictor)
 
             # Salvar o resultado se solicitado
             if save:
@@ -360,7 +624,16 @@ class MLModeling:
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_ann.tif',
-            pseudo_absence_ratio=0.3
+            pseudo_absence_ratio=0.3,
+            n_jobs=1,
+            memory_budget_mb=None,
+            backend='process',
+            artifact_path=None,
+            streaming=False,
+            n_background=None,
+            batch_size=1024,
+            patience=5,
+            validation_fraction=0.2
         ):
         """
         Aplica o modelo de Rede Neural Artificial (ANN) para predizer a distribuição das espécies.
@@ -368,7 +641,7 @@ class MLModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame): 
             Dados de ocorrência contendo latitude, longitude e presença/ausência.
-        - tiff_paths (str ou list): 
+        - tiff_paths (str, list, RasterStack ou PreparedDataset): 
             Caminhos para os arquivos TIFF com dados ambientais.
         - lat_col (str): 
             Nome da coluna com a latitude no DataFrame.
@@ -390,6 +663,30 @@ class MLModeling:
             Se True, salva o mapa resultante como um arquivo TIFF.
         - output_save (str): 
             Caminho do arquivo para salvar o mapa resultante.
+        - n_jobs (int):
+            Número de processos usados na predição do mapa, bloco a bloco (padrão: 1; -1 usa todos os núcleos).
+        - memory_budget_mb (float, opcional):
+            Memória máxima, em MB, dos blocos em andamento na predição; o tamanho dos blocos é ajustado ao orçamento.
+            Se None (padrão), usa blocos de 512 x 512 pixels.
+        - backend (str):
+            Paralelismo entre blocos: 'process' (padrão) ou 'thread'.
+        - artifact_path (str, opcional):
+            Diretório onde salvar o modelo ajustado (ver `ModelArtifact`), para projeções posteriores sem reajuste.
+            O artefato também fica disponível em `self.artifact`.
+        - streaming (bool):
+            Se True, treina com mini-lotes (`partial_fit`): cada lote combina presências e pontos de fundo sorteados
+            diretamente da pilha (metade de cada lote, com presenças reamostradas), sem montar a matriz de treino
+            nem o DataFrame de pseudoausências. A memória do treino não cresce com `n_background`.
+            Cada época percorre `n_background` pontos de fundo (no máximo `max_iter` épocas), com parada antecipada
+            pela log-loss em um lote reservado. Ausências informadas em `presence_col` são ignoradas neste modo.
+        - n_background (int, opcional):
+            Número de pontos de fundo por época no modo streaming (padrão: `pseudo_absence_ratio` x número de presenças).
+        - batch_size (int):
+            Tamanho dos mini-lotes no modo streaming (padrão: 1024).
+        - patience (int):
+            Épocas sem melhora na validação antes da parada antecipada (padrão: 5).
+        - validation_fraction (float):
+            Fração das presências (e do fundo) reservada para a validação (padrão: 0.2).
 
         Logs:
         - Informações e erros são registrados usando `self.logger`.
@@ -401,6 +698,13 @@ class MLModeling:
                 occurrence_data[presence_col] = 1
                 self.logger.info(f"A coluna '{presence_col}' não foi encontrada. Criada com valores iguais a 1.")
 
+            if streaming:
+                return self._sdm_ann_streaming(
+                    occurrence_data, tiff_paths, lat_col, lon_col, presence_col, hidden_layer_sizes, activation, solver,
+                    max_iter, normalize, save, formato, output_save, pseudo_absence_ratio, n_jobs, memory_budget_mb,
+                    backend, artifact_path, n_background, batch_size, patience, validation_fraction
+                )
+
             # Gerar pseudoausências, se necessário
             if not occurrence_data[presence_col].isin([0]).any():
                 pseudo_ausencia_df = ModelDataPrepare().generate_pseudo_absence(
@@ -416,7 +720,7 @@ class MLModeling:
                 self.logger.info("Pseudoausências geradas e adicionadas aos dados de ocorrência.")
 
             # Preparar os dados de raster
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
 
             # Definir X e y
             X = raster_values
@@ -424,6 +728,7 @@ class MLModeling:
 
             # Dividir os dados em treino e teste
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+            X_train_raw = X_train  # Valores originais do treino, registrados no artefato
             self.logger.info("Dados divididos em treino e teste.")
 
             # Normalizar os dados, se necessário
@@ -446,22 +751,12 @@ class MLModeling:
             model.fit(X_train, y_train)
             self.logger.info("Modelo ANN treinado com sucesso.")
 
-            # Preparar a matriz de previsões para o mapa resultante
-            X_pred = matriz.reshape(-1, matriz.shape[2])
-            nan_rows = np.isnan(X_pred).any(axis=1)
-            X_pred_valid = X_pred[~nan_rows]
-
-            # Normalizar dados para previsões, se necessário
-            if normalize:
-                X_pred_valid = scaler.transform(X_pred_valid)
-
-            # Previsão de probabilidades
-            prediction_valid = model.predict_proba(X_pred_valid)[:, 1]
-
-            # Criar um array de previsão completo e definir NaNs onde apropriado
-            prediction_map = np.full(X_pred.shape[0], np.nan)
-            prediction_map[~nan_rows] = prediction_valid
-            prediction_map = prediction_map.reshape(matriz.shape[0], matriz.shape[1])
+            # Previsão de probabilidades bloco a bloco (NaN nos pixels sem dados)
+            predictor = _ProbabilityPredictor(model, scaler if normalize else None)
+            self.artifact = ModelArtifact.from_fit('ANN', predictor, tiff_paths, X_train_raw, y_train, params=model.get_params())
+            if artifact_path:
+                self.artifact.save(artifact_path)
+            prediction_map = TileScheduler(n_jobs=n_jobs, backend=backend, memory_budget_mb=memory_budget_mb).predict_matrix(matriz, predictor)
 
             # Salvar o resultado se solicitado
             if save:
@@ -474,3 +769,113 @@ class MLModeling:
         except Exception as e:
             self.logger.error(f"Erro na execução da função `sdm_ann`: {e}")
             raise
+
+    def _sdm_ann_streaming(
+            self, occurrence_data, tiff_paths, lat_col, lon_col, presence_col, hidden_layer_sizes, activation, solver,
+            max_iter, normalize, save, formato, output_save, pseudo_absence_ratio, n_jobs, memory_budget_mb,
+            backend, artifact_path, n_background, batch_size, patience, validation_fraction
+        ):
+        """
+        Modo streaming de `sdm_ann`: presenças e fundo em mini-lotes (`partial_fit`), com parada antecipada.
+        """
+        if solver == 'lbfgs':
+            raise ValueError("O solver 'lbfgs' não permite treino em mini-lotes. Use 'adam' ou 'sgd'.")
+        if max_iter < 1:
+            raise ValueError("`max_iter` deve ser maior ou igual a 1 no modo streaming.")
+
+        presencas = occurrence_data[occurrence_data[presence_col] == 1]
+        if len(presencas) < len(occurrence_data):
+            self.logger.warning("Modo streaming: as ausências informadas foram ignoradas; o fundo é sorteado da pilha.")
+
+        # Pilha compacta e valores das presenças (o fundo é lido da pilha a cada lote)
+        preparo = ModelDataPrepare()
+        stack, X_pres, profile = preparo.prepare_raster_data(tiff_paths, presencas, lat_col, lon_col, formato, compact=True)
+        X_pres = X_pres[~np.isnan(X_pres).any(axis=1)]
+        if len(X_pres) < 2:
+            raise ValueError("São necessárias ao menos 2 presenças com dados ambientais válidos.")
+
+        # Células com ocorrência não são usadas como fundo
+        ocupadas = np.isin(stack.index, preparo._occurrence_cells(stack, presencas, lat_col, lon_col))
+        if n_background is None:
+            n_background = max(1, int(len(presencas) * pseudo_absence_ratio))
+
+        livres = np.flatnonzero(~ocupadas)
+        if livres.size == 0:
+            raise ValueError("Todas as células válidas da pilha têm ocorrências; não há pontos de fundo disponíveis.")
+
+        rng = np.random.default_rng(42)
+
+        def fundo(n):
+            # Sorteio com reposição apenas entre as células sem ocorrência (sempre n linhas)
+            return stack.values[livres[rng.integers(0, livres.size, n)]]
+
+        # Normalização estimada em blocos sobre a pilha (sem materializar o conjunto de treino)
+        scaler = None
+        if normalize:
+            scaler = StandardScaler()
+            for inicio in range(0, stack.n_valid, 65536):
+                scaler.partial_fit(stack.values[inicio:inicio + 65536])
+            self.logger.info("Normalização estimada sobre a pilha ambiental.")
+
+        def lote(X_p, X_b):
+            X_lote = np.concatenate([X_p, X_b]).astype(np.float64)
+            y_lote = np.concatenate([np.ones(len(X_p)), np.zeros(len(X_b))]).astype(int)
+            return (scaler.transform(X_lote, copy=False) if scaler is not None else X_lote), y_lote
+
+        # Presenças reservadas e um lote fixo de fundo para a validação
+        ordem = rng.permutation(len(X_pres))
+        n_val = min(len(X_pres) - 1, max(1, int(round(len(X_pres) * validation_fraction))))
+        X_val_pres, X_train_pres = X_pres[ordem[:n_val]], X_pres[ordem[n_val:]]
+        X_val, y_val = lote(X_val_pres, fundo(min(batch_size, max(n_val, int(round(n_background * validation_fraction))))))
+        # Presenças e fundo com o mesmo peso total na validação
+        pesos_val = np.where(y_val == 1, 0.5 / (y_val == 1).sum(), 0.5 / (y_val == 0).sum())
+
+        # Lotes balanceados: presenças reamostradas na metade de cada lote (peso igual das classes)
+        n_pres_lote = max(1, batch_size // 2)
+        n_fundo_lote = max(1, batch_size - n_pres_lote)
+        lotes_por_epoca = int(np.ceil(n_background / n_fundo_lote))
+
+        model = MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, activation=activation, solver=solver, random_state=42)
+        melhor_modelo, melhor_perda, sem_melhora, perda, epoca = None, np.inf, 0, np.nan, 0
+
+        for epoca in range(max_iter):
+            for _ in range(lotes_por_epoca):
+                X_lote, y_lote = lote(X_train_pres[rng.integers(0, len(X_train_pres), n_pres_lote)], fundo(n_fundo_lote))
+                model.partial_fit(X_lote, y_lote, classes=[0, 1])
+
+            perda = log_loss(y_val, model.predict_proba(X_val), sample_weight=pesos_val, labels=[0, 1])
+            if perda < melhor_perda - 1e-4:
+                melhor_modelo, melhor_perda, sem_melhora = copy.deepcopy(model), perda, 0
+            else:
+                sem_melhora += 1
+                if sem_melhora >= patience:
+                    break
+
+        if melhor_modelo is None:
+            # Nenhuma época melhorou a validação (ex.: log-loss não finita): usa o último modelo treinado
+            self.logger.warning("A validação não melhorou em nenhuma época; usando o último modelo treinado.")
+            melhor_perda = perda
+        else:
+            model = melhor_modelo
+        self.logger.info(
+            f"Modelo ANN treinado em streaming: {epoca + 1} épocas de {lotes_por_epoca} lotes de {batch_size} pontos "
+            f"({len(X_train_pres)} presenças, {n_background} pontos de fundo por época); log-loss de validação: {melhor_perda:.4f}."
+        )
+
+        # Previsão de probabilidades bloco a bloco (NaN nos pixels sem dados)
+        predictor = _ProbabilityPredictor(model, scaler)
+        self.artifact = ModelArtifact.from_fit('ANN', predictor, tiff_paths, X_train_pres, np.ones(len(X_train_pres)), params=model.get_params())
+        self.artifact.metadata.update(
+            n_absences=int(n_background), n_samples=int(len(X_train_pres) + n_background), streaming=True, epochs=epoca + 1,
+            validation_log_loss=float(melhor_perda)
+        )
+        if artifact_path:
+            self.artifact.save(artifact_path)
+        prediction_map = TileScheduler(n_jobs=n_jobs, backend=backend, memory_budget_mb=memory_budget_mb).predict_matrix(stack, predictor)
+
+        # Salvar o resultado se solicitado
+        if save:
+            MapGenerator().save_map(prediction_map, profile, output_save=output_save)
+            self.logger.info(f"Mapa resultante salvo em '{output_save}'.")
+
+        return prediction_map
@@ -0,0 +1,220 @@
+# Artefatos de modelos ajustados: ajustar uma vez, projetar em vários cenários
+import os
+import json
+import joblib
+import numpy as np
+from datetime import datetime, timezone
+
+from EcoDistrib.common import msg_logger
+from EcoDistrib.outputs import MapGenerator
+from EcoDistrib.utils import FileManager, RasterStack, ValidPixelStack, TileScheduler
+
+# Versão do formato do artefato (incrementar ao mudar o conteúdo gravado)
+ARTIFACT_VERSION = 1
+
+
+def feature_names(tiff_paths):
+    """
+    Retorna os nomes das camadas (variáveis) na ordem usada pelos modelos (ordem alfabética dos arquivos).
+
+    Parâmetros:
+    - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Pilha de entrada.
+
+    Retorno:
+    - list: Nomes dos arquivos sem extensão (ou 'camada_1', 'camada_2', ... para uma pilha compacta sem nomes).
+    """
+    names = getattr(tiff_paths, 'names', None)
+    if names is not None:
+        return list(names)
+    compacta = ValidPixelStack.resolve(tiff_paths)
+    if compacta is not None:
+        return [f"camada_{idx + 1}" for idx in range(compacta.n_layers)]
+    return [os.path.splitext(os.path.basename(tiff))[0] for tiff in sorted(FileManager().listfile(tiff_paths))]
+
+
+class ModelArtifact:
+    def __init__(self, model_type, predictor=None, features=None, metadata=None, path=None):
+        """
+        Modelo ajustado e persistido: preditor (estimador e normalização), ordem das variáveis e metadados do treino.
+
+        O artefato é um diretório com `metadata.json` (legível) e `model.joblib` (preditor). Ao ser carregado
+        com `load`, apenas os metadados são lidos; o preditor é carregado na primeira projeção.
+
+        :param model_type: Nome do modelo ('SVM', 'RandomForest', 'ANN', 'GLM', 'GAM').
+        :param predictor: Função que recebe uma matriz (pixels x camadas) e retorna a probabilidade de presença.
+        :param features: Nomes das variáveis, na ordem das colunas esperada pelo preditor.
+        :param metadata: Metadados do treino (amostras, parâmetros, versões ...).
+        :param path: Diretório do artefato, se já gravado.
+        """
+        self.logger = msg_logger
+        self.model_type = model_type
+        self.features = list(features or [])
+        self.metadata = dict(metadata or {})
+        self.path = path
+        self._predictor = predictor
+
+    @classmethod
+    def from_fit(cls, model_type, predictor, tiff_paths, X, y, params=None):
+        """
+        Cria o artefato logo após o ajuste de um modelo `sdm_*`.
+
+        Parâmetros:
+        - model_type (str): Nome do modelo.
+        - predictor (callable): Preditor ajustado (serializável com pickle).
+        - tiff_paths (str, list, RasterStack ou PreparedDataset): Pilha usada no treino.
+        - X (np.ndarray): Matriz de treino (amostras x camadas) com os valores originais, antes da normalização.
+        - y (array-like): Rótulos de presença (1) e ausência (0) do treino.
+        - params (dict, opcional): Hiperparâmetros do modelo.
+
+        Retorno:
+        - ModelArtifact: Artefato ainda não gravado (ver `save`).
+        """
+        import sklearn
+
+        y = np.asarray(y)
+        profile = MapGenerator().output_profile(tiff_paths)
+        metadata = {
+            'version': ARTIFACT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'n_samples': int(len(y)),
+            'n_presences': int((y == 1).sum()),
+            'n_absences': int((y == 0).sum()),
+            'params': {key: value if isinstance(value, (bool, int, float, str, type(None))) else repr(value)
+                       for key, value in (params or {}).items()},
+            'feature_means': np.nanmean(np.asarray(X, dtype=np.float64), axis=0).tolist(),
+            'training_grid': {
+                'crs': profile['crs'].to_string() if profile.get('crs') is not None else None,
+                'transform': list(profile['transform'])[:6],
+                'shape': [profile['height'], profile['width']],
+            },
+            'libraries': {'numpy': np.__version__, 'scikit-learn': sklearn.__version__},
+        }
+        return cls(model_type, predictor, feature_names(tiff_paths), metadata)
+
+    @property
+    def predictor(self):
+        """Preditor ajustado, carregado do disco no primeiro acesso."""
+        if self._predictor is None:
+            if self.path is None:
+                raise ValueError("O artefato não tem preditor nem diretório de origem.")
+            self._predictor = joblib.load(os.path.join(self.path, 'model.joblib'))
+            self.logger.info(f"Preditor do modelo {self.model_type} carregado de: {self.path}")
+        return self._predictor
+
+    def save(self, path):
+        """
+        Grava o artefato em um diretório (`metadata.json` e `model.joblib`).
+
+        Parâmetros:
+        - path (str): Diretório de destino (criado se necessário).
+
+        Retorno:
+        - str: Diretório do artefato.
+        """
+        try:
+            os.makedirs(path, exist_ok=True)
+            joblib.dump(self.predictor, os.path.join(path, 'model.joblib'), compress=3)
+
+            header = {'model_type': self.model_type, 'features': self.features, **self.metadata}
+            with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as arquivo:
+                json.dump(header, arquivo, indent=2, ensure_ascii=False)
+
+            self.path = path
+            self.logger.info(f"Artefato do modelo {self.model_type} salvo em: {path}")
+            return path
+
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar o artefato em {path}: {e}")
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Abre um artefato gravado, lendo apenas os metadados (o preditor é carregado sob demanda).
+
+        Parâmetros:
+        - path (str): Diretório do artefato.
+
+        Retorno:
+        - ModelArtifact: Artefato carregado.
+
+        Exceções:
+        - ValueError: Se a versão do formato não for suportada.
+        """
+        with open(os.path.join(path, 'metadata.json'), encoding='utf-8') as arquivo:
+            header = json.load(arquivo)
+
+        if header.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Versão de artefato não suportada: {header.get('version')} (esperada: {ARTIFACT_VERSION}).")
+
+        model_type = header.pop('model_type')
+        features = header.pop('features')
+        return cls(model_type, features=features, metadata=header, path=path)
+
+    def project(self, tiff_paths, n_jobs=1, memory_budget_mb=None, backend='process', save=False, formato='GTiff', output_save=''):
+        """
+        Projeta o modelo ajustado sobre uma pilha ambiental (por exemplo, um cenário climático futuro), sem reajuste.
+
+        As camadas são associadas às variáveis do treino pelo nome; se estiverem em outra ordem, as colunas
+        são reordenadas.
+
+        Parâmetros:
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Pilha de projeção.
+        - n_jobs (int, opcional): Número de trabalhadores da predição em blocos (padrão: 1).
+        - memory_budget_mb (float, opcional): Orçamento de memória dos blocos (ver `TileScheduler`).
+        - backend (str, opcional): 'process' (padrão) ou 'thread'.
+        - save (bool, opcional): Se True, salva o mapa em `output_save`.
+        - formato (str, opcional): Driver GDAL da saída. Padrão: 'GTiff'.
+        - output_save (str, opcional): Caminho do mapa de saída.
+
+        Retorno:
+        - np.ndarray: Mapa 2D float32 com as probabilidades projetadas e NaN nos pixels sem dados.
+
+        Exceções:
+        - ValueError: Se as variáveis da pilha não corresponderem às do treino.
+        """
+        try:
+            stack = ValidPixelStack.resolve(tiff_paths)
+            if stack is not None:
+                names = feature_names(tiff_paths)
+            else:
+                with RasterStack.using(tiff_paths) as raster_stack:
+                    names = list(raster_stack.names)
+                    stack = ValidPixelStack.from_rasters(raster_stack)
+
+            if names != self.features:
+                if sorted(names) != sorted(self.features):
+                    raise ValueError(f"As camadas da pilha {names} não correspondem às variáveis do modelo {self.features}.")
+                order = [names.index(name) for name in self.features]
+                stack = ValidPixelStack(stack.values[:, order], stack.index, stack.shape, stack.profile)
+                self.logger.info("Camadas reordenadas para a ordem das variáveis do modelo.")
+
+            scheduler = TileScheduler(n_jobs=n_jobs, backend=backend, memory_budget_mb=memory_budget_mb)
+            prediction_map = scheduler.predict_matrix(stack, self.predictor)
+            self.logger.info(f"Modelo {self.model_type} projetado sobre {stack.n_valid} pixels válidos.")
+
+            if save:
+                MapGenerator().save_map(prediction_map, MapGenerator().output_profile(stack, formato=formato), output_save=output_save)
+
+            return prediction_map
+
+        except Exception as e:
+            self.logger.error(f"Erro ao projetar o modelo {self.model_type}: {e}")
+            raise
+
+
+def project(artifact, tiff_paths, **kwargs):
+    """
+    Projeta um modelo persistido sobre uma pilha ambiental, sem reajuste (ver `ModelArtifact.project`).
+
+    Parâmetros:
+    - artifact (ModelArtifact ou str): Artefato ou diretório do artefato (carregado sob demanda).
+    - tiff_paths (str, list, RasterStack ou PreparedDataset): Pilha de projeção.
+    - **kwargs: n_jobs, memory_budget_mb, backend, save, formato e output_save.
+
+    Retorno:
+    - np.ndarray: Mapa 2D float32 com as probabilidades projetadas.
+    """
+    if not isinstance(artifact, ModelArtifact):
+        artifact = ModelArtifact.load(artifact)
+    return artifact.project(tiff_paths, **kwargs)
@@ -15,7 +15,7 @@ class ModelEvaluator:
         self.model_name = self._get_model_name()  # Novo método para extrair o nome
 
         if profile is None:
-            _,self.profile = MapGenerator().create_synthetic_raster(formato=formato)
+            self.profile = MapGenerator().output_profile(tiff_paths, formato=formato)
         else:
             self.profile = profile
         self.occurrence_data = occurrence_data  # DataFrame com presenças
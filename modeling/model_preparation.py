@@ -1,13 +1,90 @@
-import random
+import rasterio
 import numpy as np
 import pandas as pd
 from scipy.stats import mode
+from scipy.signal import fftconvolve
+from scipy.ndimage import distance_transform_edt
 
 from EcoDistrib.common import msg_logger
 from EcoDistrib.outputs import MapGenerator
-from EcoDistrib.utils import FileManager, RasterOperations
+from EcoDistrib.utils import FileManager, RasterOperations, RasterStack, ValidPixelStack
 from EcoDistrib.preprocessing import RasterDataExtract
 
+class PreparedDataset:
+    def __init__(self, tiff_paths, cache_dir=None):
+        """
+        Sessão de dados preparada uma única vez e reutilizada por todos os métodos `sdm_*`.
+
+        Guarda a pilha compacta (pixels válidos x camadas, com a máscara de validade e o índice de volta à grade),
+        o perfil real da pilha, o índice (tabela hash) pixel -> linha da pilha e os valores já extraídos
+        para cada conjunto de coordenadas. Pode ser passada no lugar de `tiff_paths`.
+
+        :param tiff_paths: Caminho para um diretório, lista de arquivos TIFF ou `RasterStack`.
+        :param cache_dir: Diretório do cache de cubos (opcional, ver `CubeCache`): as camadas são lidas do cubo
+        mapeado em memória, em vez de decodificar os TIFFs a cada execução.
+        """
+        self.logger = msg_logger
+
+        with RasterStack.using(tiff_paths, cache_dir=cache_dir) as raster_stack:
+            self.tiff_files = list(raster_stack.tiff_files)
+            self.names = list(raster_stack.names)
+            self.stack = ValidPixelStack.from_rasters(raster_stack)
+
+        self.profile = self.stack.profile
+        self._pixel_index = pd.Index(self.stack.index)
+        self._samples = {}
+        self.logger.info(f"Conjunto de dados preparado: {self.stack.n_valid} pixels válidos, {self.stack.n_layers} camadas.")
+
+    def cells(self, occurrence_data, lat_col='decimalLatitude', lon_col='decimalLongitude'):
+        """
+        Converte coordenadas em índices planos (linha * n_colunas + coluna) da grade.
+
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list): Dados com coordenadas ou lista de pares (longitude, latitude).
+        - lat_col (str, opcional): Nome da coluna de latitude.
+        - lon_col (str, opcional): Nome da coluna de longitude.
+
+        Retorno:
+        - np.ndarray: Índices planos, com -1 para coordenadas fora da grade.
+        """
+        if isinstance(occurrence_data, pd.DataFrame):
+            lons = occurrence_data[lon_col].to_numpy(dtype=np.float64)
+            lats = occurrence_data[lat_col].to_numpy(dtype=np.float64)
+        else:
+            coords = np.asarray(occurrence_data, dtype=np.float64).reshape(-1, 2)
+            lons, lats = coords[:, 0], coords[:, 1]
+
+        height, width = self.stack.shape
+        rows, cols = rasterio.transform.rowcol(self.profile['transform'], lons, lats)
+        rows, cols = np.atleast_1d(rows).astype(np.int64), np.atleast_1d(cols).astype(np.int64)
+        dentro = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        return np.where(dentro, rows * width + cols, -1)
+
+    def sample(self, occurrence_data, lat_col='decimalLatitude', lon_col='decimalLongitude'):
+        """
+        Retorna os valores das camadas nas coordenadas, a partir da pilha já carregada (sem ler os rasters).
+
+        O resultado é guardado em cache por conjunto de coordenadas.
+
+        Parâmetros:
+        - occurrence_data (pd.DataFrame ou list): Dados com coordenadas ou lista de pares (longitude, latitude).
+        - lat_col (str, opcional): Nome da coluna de latitude.
+        - lon_col (str, opcional): Nome da coluna de longitude.
+
+        Retorno:
+        - np.ndarray: Matriz float64 (pontos x camadas), com NaN para coordenadas fora da grade ou em pixels sem dados.
+        """
+        cells = self.cells(occurrence_data, lat_col, lon_col)
+        key = cells.tobytes()
+        if key not in self._samples:
+            linhas = self._pixel_index.get_indexer(cells)
+            values = np.full((cells.shape[0], self.stack.n_layers), np.nan, dtype=np.float64)
+            values[linhas >= 0] = self.stack.values[linhas[linhas >= 0]]
+            self._samples[key] = values
+
+        return self._samples[key].copy()
+
+
 class ModelDataPrepare:
     def __init__(self):
         self.logger = msg_logger
@@ -18,21 +95,26 @@ class ModelDataPrepare:
             occurrence_data,
             lat_col='decimalLatitude',
             lon_col='decimalLongitude',
-            formato='GTiff'
+            formato='GTiff',
+            compact=False
         ):
         """
         Prepara os dados de raster e ocorrência para cálculo de distâncias.
 
         Parâmetros:
-        - tiff_paths (str ou list): Caminho para um diretório contendo arquivos TIFF ou uma lista de caminhos para arquivos TIFF.
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Caminho para um diretório contendo arquivos TIFF, uma lista de caminhos
+        para arquivos TIFF ou uma pilha já carregada (`ValidPixelStack` ou `PreparedDataset`), que é reutilizada.
         - occurrence_data (pd.DataFrame ou list): Dados de ocorrência contendo coordenadas (latitude e longitude).
         - lat_col (str, opcional): Nome da coluna de latitude no DataFrame de ocorrência. Padrão: 'decimalLatitude'.
         - lon_col (str, opcional): Nome da coluna de longitude no DataFrame de ocorrência. Padrão: 'decimalLongitude'.
+        - compact (bool, opcional): Se True, retorna a pilha compacta (`ValidPixelStack`, apenas pixels válidos)
+        no lugar da matriz 3D. Padrão: False.
 
         Retorna:
-        - matriz (np.ndarray): Matriz 3D com valores das camadas de raster (dimensões: camadas x linhas x colunas).
+        - matriz (np.ndarray ou ValidPixelStack): Matriz 3D com valores das camadas de raster (dimensões: linhas x colunas x camadas)
+        ou, com `compact=True`, a pilha compacta equivalente.
         - raster_values (np.ndarray): Matriz 2D com valores extraídos para cada coordenada de ocorrência (dimensões: pontos x camadas).
-        - profile (dict): Perfil do raster sintético para referência futura.
+        - profile (dict): Perfil dos mapas de saída, herdado da pilha de entrada (transformação, CRS, dimensões e nodata).
 
         Logs:
         - Registra mensagens informando o progresso e eventuais erros.
@@ -41,8 +123,12 @@ class ModelDataPrepare:
         - Registra e retorna erros relacionados ao carregamento de TIFFs ou extração de valores.
         """
         try:
-            # Criar o perfil do raster sintético
-            _, profile = MapGenerator().create_synthetic_raster(formato=formato)
+            # Pilha já carregada (ValidPixelStack ou PreparedDataset): reutiliza a pilha e o perfil, sem ler os rasters
+            compacta = ValidPixelStack.resolve(tiff_paths)
+            if compacta is not None:
+                profile = MapGenerator().output_profile(compacta, formato=formato)
+                matriz = compacta if compact else compacta.to_matrix()
+                return matriz, self.extract_occurrence_values(tiff_paths, occurrence_data, lat_col, lon_col), profile
 
             # Obter a lista de arquivos TIFF
             tiff_files = FileManager().listfile(tiff_paths)
@@ -52,28 +138,20 @@ class ModelDataPrepare:
                 self.logger.error("Nenhum arquivo TIFF encontrado nos caminhos fornecidos.")
                 raise FileNotFoundError("Nenhum arquivo TIFF foi localizado no diretório ou na lista fornecida.")
 
-            # Converter rasters para matriz 3D
-            matriz, _, __, ___ = RasterOperations().raster_to_matrix_2d(tiff_files)
-            self.logger.info(f"Matriz 3D de rasters gerada com dimensões: {matriz.shape}.")
-
-            # Validar os dados de ocorrência
-            if occurrence_data is None or len(occurrence_data) == 0:
-                self.logger.error("Os dados de ocorrência estão vazios ou inválidos.")
-                raise ValueError("Os dados de ocorrência não podem ser vazios.")
-
-            # Obter valores de raster para cada coordenada usando a função get_values
-            values_per_coordinate = RasterDataExtract().get_values(tiff_files, occurrence_data, lat_col=lat_col, lon_col=lon_col)
-            self.logger.info("Valores de raster extraídos para as coordenadas de ocorrência.")
+            # Converter rasters para matriz 3D (ou pilha compacta), na mesma ordem (alfabética) usada na extração dos pontos
+            # Uma pilha já aberta (RasterStack) é reaproveitada sem reabrir os arquivos
+            source = tiff_paths if isinstance(tiff_paths, RasterStack) else sorted(tiff_files)
+            if compact:
+                matriz = ValidPixelStack.from_rasters(source)
+            else:
+                matriz, _, __, ___ = RasterOperations().raster_to_matrix_2d(source)
+                self.logger.info(f"Matriz 3D de rasters gerada com dimensões: {matriz.shape}.")
 
-            # Extrair valores para cada coordenada e organizar em uma matriz 2D
-            raster_values = []
-            for raster_idx, _ in enumerate(tiff_files):
-                raster_value = [coord_values[raster_idx] for coord_values in values_per_coordinate]
-                raster_values.append(raster_value)
+            # Perfil de saída herdado da pilha de entrada (mesma grade, CRS e nodata)
+            profile = MapGenerator().output_profile(matriz if compact else source, formato=formato)
 
-            # Converter a lista de listas em matriz 2D
-            raster_values = np.array(raster_values).T  # Cada linha representa uma coordenada
-            self.logger.info(f"Matriz 2D de valores extraídos gerada com dimensões: {raster_values.shape}.")
+            # Obter valores de raster para cada coordenada de ocorrência
+            raster_values = self.extract_occurrence_values(source, occurrence_data, lat_col, lon_col)
 
             return matriz, raster_values, profile
 
@@ -81,10 +159,59 @@ class ModelDataPrepare:
             self.logger.error(f"Erro ao preparar os dados raster: {e}")
             raise
 
+    def extract_occurrence_values(
+            self,
+            tiff_paths,
+            occurrence_data,
+            lat_col='decimalLatitude',
+            lon_col='decimalLongitude'
+        ):
+        """
+        Extrai os valores das camadas raster nas coordenadas de ocorrência, sem carregar a pilha inteira.
+
+        Parâmetros:
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Caminho para um diretório, lista de arquivos TIFF
+        ou pilha já carregada.
+        - occurrence_data (pd.DataFrame ou list): Dados de ocorrência contendo coordenadas (latitude e longitude).
+        - lat_col (str, opcional): Nome da coluna de latitude no DataFrame. Padrão: 'decimalLatitude'.
+        - lon_col (str, opcional): Nome da coluna de longitude no DataFrame. Padrão: 'decimalLongitude'.
+
+        Retorno:
+        - raster_values (np.ndarray): Matriz 2D (pontos x camadas, camadas em ordem alfabética),
+        com NaN para coordenadas fora dos rasters.
+
+        Exceções:
+        - ValueError: Se os dados de ocorrência estiverem vazios.
+        """
+        # Validar os dados de ocorrência
+        if occurrence_data is None or len(occurrence_data) == 0:
+            self.logger.error("Os dados de ocorrência estão vazios ou inválidos.")
+            raise ValueError("Os dados de ocorrência não podem ser vazios.")
+
+        # Obter valores de raster para cada coordenada (da pilha já carregada, se houver, ou dos rasters)
+        if isinstance(tiff_paths, PreparedDataset):
+            values_per_coordinate = tiff_paths.sample(occurrence_data, lat_col, lon_col)
+        elif isinstance(tiff_paths, ValidPixelStack):
+            if isinstance(occurrence_data, pd.DataFrame):
+                occurrence_data = np.column_stack([occurrence_data[lon_col].to_numpy(), occurrence_data[lat_col].to_numpy()])
+            values_per_coordinate = tiff_paths.sample(occurrence_data)
+        else:
+            values_per_coordinate = RasterDataExtract().get_values(tiff_paths, occurrence_data, lat_col=lat_col, lon_col=lon_col)
+        self.logger.info("Valores de raster extraídos para as coordenadas de ocorrência.")
+
+        # Cada linha representa uma coordenada (NaN para coordenadas fora dos rasters)
+        raster_values = np.array(values_per_coordinate, dtype=np.float64)
+        self.logger.info(f"Matriz 2D de valores extraídos gerada com dimensões: {raster_values.shape}.")
+
+        return raster_values
+
     def calculate_central_point(self,raster_values, method='mean'):
         """
         Calcula o ponto central com base no método escolhido pelo usuário.
 
+        Linhas com NaN em alguma camada (ocorrências fora da grade ou em pixels sem dados) são descartadas,
+        para que uma única ocorrência inválida não torne o ponto central (e os mapas de distância) inteiramente NaN.
+
         Parâmetros:
         - raster_values (np.ndarray): 
             Array 2D onde cada linha representa os valores de uma coordenada em cada camada.
@@ -95,7 +222,7 @@ class ModelDataPrepare:
         - np.ndarray: O ponto central calculado com base no método escolhido.
 
         Erros:
-        - Levanta ValueError se o método for desconhecido.
+        - Levanta ValueError se o método for desconhecido ou se nenhuma ocorrência tiver dados em todas as camadas.
         - Registra logs para informar erros ou sucesso na execução.
 
         Logs:
@@ -103,6 +230,14 @@ class ModelDataPrepare:
         - Registra erro caso o método fornecido seja inválido.
         """
         try:
+            raster_values = np.asarray(raster_values, dtype=np.float64)
+            validas = ~np.isnan(raster_values).any(axis=1)
+            if not validas.any():
+                raise ValueError("Nenhuma ocorrência possui valores válidos em todas as camadas.")
+            if not validas.all():
+                self.logger.warning(f"{int((~validas).sum())} ocorrência(s) sem dados em alguma camada ignorada(s) no ponto central.")
+                raster_values = raster_values[validas]
+
             if method == 'mean':
                 result = np.mean(raster_values, axis=0)
             elif method == 'median':
@@ -132,16 +267,27 @@ class ModelDataPrepare:
             lat_col='decimalLatitude', 
             lon_col='decimalLongitude', 
             presence_col='presence',
-            save_path=None
+            save_path=None,
+            random_state=None,
+            min_distance=None,
+            max_distance=None,
+            bias=None,
+            bias_bandwidth=None
         ):
         """
-        Gera pontos de pseudo-ausência aleatoriamente dentro dos limites do raster.
+        Gera pontos de pseudo-ausência aleatoriamente entre os pixels válidos do raster.
+
+        Os pontos são sorteados de uma só vez a partir do índice de pixels válidos (sem NaN em nenhuma camada),
+        excluindo as células que contêm ocorrências. Cada ponto corresponde ao centro de um pixel distinto.
+
+        Restrições de distância usam a transformada de distância euclidiana das ocorrências rasterizadas na grade,
+        e o viés amostral é aplicado como pesos de um único sorteio ponderado.
 
         Parâmetros:
         - occurrence_data (pd.DataFrame): 
             Dados de ocorrência, contendo as colunas de latitude e longitude.
-        - tiff_paths (str ou list): 
-            Caminho para os arquivos TIFF com dados ambientais.
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): 
+            Caminho para os arquivos TIFF com dados ambientais, pilha já aberta, pilha compacta ou conjunto já preparado.
         - n_pseudo_ausencias (int, opcional): 
             Número de pontos de pseudo-ausência a ser gerado. Se não especificado, será 30% do tamanho de `occurrence_data`.
         - lat_col (str, opcional): 
@@ -152,6 +298,17 @@ class ModelDataPrepare:
             Nome da coluna indicando presença ou ausência (padrão: 'presence').
          - save_path (str, opcional):
             Caminho para salvar o DataFrame gerado. Se não fornecido, o DataFrame não será salvo.
+        - random_state (int ou np.random.Generator, opcional):
+            Semente (ou gerador) para tornar o sorteio reprodutível.
+        - min_distance (float, opcional):
+            Distância mínima até a ocorrência mais próxima, nas unidades do CRS (graus para EPSG:4326).
+        - max_distance (float, opcional):
+            Distância máxima até a ocorrência mais próxima, nas unidades do CRS.
+        - bias (str ou np.ndarray, opcional):
+            Superfície de viés amostral. 'occurrences' usa a densidade (KDE gaussiana) das ocorrências;
+            um array 2D com as dimensões da grade é usado diretamente como peso (valores não negativos).
+        - bias_bandwidth (float, opcional):
+            Largura de banda da KDE, nas unidades do CRS. Se None, usa a regra de Scott sobre as coordenadas das ocorrências.
 
         Retorno:
         - pd.DataFrame: 
@@ -162,49 +319,64 @@ class ModelDataPrepare:
         - Registra mensagens de erro em caso de falhas.
         """
         try:
-            # Obter a lista de arquivos TIFF
-            tif_files = FileManager().listfile(tiff_paths)
-            if not tif_files:
-                raise ValueError("Nenhum arquivo TIFF encontrado no caminho fornecido.")
-
             # Definir o número de pseudo-ausências
             if not n_pseudo_ausencias:
                 n_pseudo_ausencias = int(len(occurrence_data) * 0.30)
                 self.logger.info(f"Número de pseudo-ausências não especificado. Usando 30% das ocorrências: {n_pseudo_ausencias}")
 
-            # Preparar os limites do raster
-            _, _, profile = self.prepare_raster_data(tif_files, occurrence_data, lat_col, lon_col)
-            transform = profile['transform']
-
-            # Obter os limites geográficos do raster
-            min_lon, max_lat = transform * (0, 0)
-            max_lon, min_lat = transform * (profile['width'], profile['height'])
-
-            pseudo_ausencias = []
-            while len(pseudo_ausencias) < n_pseudo_ausencias:
-                # Gerar coordenadas aleatórias dentro da extensão
-                random_lon = random.uniform(min_lon, max_lon)
-                random_lat = random.uniform(min_lat, max_lat)
-
-                # Obter valores de raster para as coordenadas
-                values_per_coordinate = RasterDataExtract().get_values(
-                    coordinates=[[random_lon, random_lat]], 
-                    raster_path=tif_files
+            # Índice dos pixels válidos e perfil (grade) da pilha
+            stack = ValidPixelStack.resolve(tiff_paths)
+            if stack is None:
+                stack = ValidPixelStack.from_rasters(tiff_paths)
+            celulas_ocorrencia = self._occurrence_cells(stack, occurrence_data, lat_col, lon_col)
+            candidatos = self._free_cells(stack, celulas_ocorrencia)
+
+            # Restringir as células pela distância até a ocorrência mais próxima
+            if min_distance is not None or max_distance is not None:
+                distancias = self._occurrence_distance(stack, celulas_ocorrencia)[candidatos]
+                dentro_buffer = np.ones(candidatos.size, dtype=bool)
+                if min_distance is not None:
+                    dentro_buffer &= distancias >= min_distance
+                if max_distance is not None:
+                    dentro_buffer &= distancias <= max_distance
+                candidatos = candidatos[dentro_buffer]
+                self.logger.info(f"{candidatos.size} células candidatas após as restrições de distância.")
+
+            # Pesos do sorteio a partir da superfície de viés
+            pesos = None
+            if bias is not None:
+                if isinstance(bias, str):
+                    if bias != 'occurrences':
+                        raise ValueError("Viés desconhecido. Use 'occurrences' ou um array 2D com as dimensões da grade.")
+                    superficie = self._occurrence_density(
+                        stack, self._occurrence_cells(stack, occurrence_data, lat_col, lon_col, unique=False),
+                        occurrence_data, lat_col, lon_col, bias_bandwidth
+                    )
+                else:
+                    superficie = np.asarray(bias, dtype=np.float64)
+                    if superficie.shape != stack.shape:
+                        raise ValueError(f"A superfície de viés deve ter as dimensões da grade {stack.shape}.")
+
+                pesos = np.clip(np.nan_to_num(superficie.ravel()[candidatos]), 0, None)
+                candidatos, pesos = candidatos[pesos > 0], pesos[pesos > 0]
+                pesos = pesos / pesos.sum() if pesos.size else pesos
+
+            if n_pseudo_ausencias > candidatos.size:
+                self.logger.warning(
+                    f"Apenas {candidatos.size} pixels válidos sem ocorrência estão disponíveis; "
+                    f"gerando {candidatos.size} pseudo-ausências em vez de {n_pseudo_ausencias}."
                 )
-                values_per_coordinate = np.array(values_per_coordinate, dtype=np.float64)
+                n_pseudo_ausencias = candidatos.size
 
-                # Validar a ausência e verificar NaN
-                if not any(
-                    np.isclose(occurrence_data[lat_col], random_lat) & 
-                    np.isclose(occurrence_data[lon_col], random_lon)
-                ) and not np.any(np.isnan(values_per_coordinate)):
-                    pseudo_ausencias.append([random_lat, random_lon])
+            # Sorteio único (ponderado, se houver viés), sem reposição, entre as células candidatas
+            rng = np.random.default_rng(random_state)
+            celulas = rng.choice(candidatos, size=n_pseudo_ausencias, replace=False, p=pesos)
 
-            # Criar DataFrame com os pontos de pseudo-ausência
-            pseudo_ausencia_df = pd.DataFrame(pseudo_ausencias, columns=[lat_col, lon_col])
+            # Criar DataFrame com os pontos de pseudo-ausência (centros dos pixels sorteados)
+            pseudo_ausencia_df = self._cell_centers(stack, celulas, lat_col, lon_col)
             pseudo_ausencia_df[presence_col] = 0  # Marcar como ausência
 
-            self.logger.info(f"Pseudo-ausências geradas com sucesso: {len(pseudo_ausencias)} pontos.")
+            self.logger.info(f"Pseudo-ausências geradas com sucesso: {len(pseudo_ausencia_df)} pontos.")
 
             # Salvar o DataFrame se save_path for fornecido
             if save_path:
@@ -224,3 +396,113 @@ class ModelDataPrepare:
         except Exception as e:
             self.logger.error(f"Erro inesperado ao gerar pseudo-ausências: {e}")
             raise
+
+    def _occurrence_cells(self, stack, occurrence_data, lat_col='decimalLatitude', lon_col='decimalLongitude', unique=True):
+        """
+        Rasteriza as ocorrências na grade da pilha, retornando os índices planos das células ocupadas.
+
+        Parâmetros:
+        - stack (ValidPixelStack): Pilha compacta com o perfil da grade.
+        - occurrence_data (pd.DataFrame): Dados de ocorrência.
+        - lat_col (str, opcional): Nome da coluna de latitude.
+        - lon_col (str, opcional): Nome da coluna de longitude.
+        - unique (bool, opcional): Se True (padrão), cada célula aparece uma vez; se False, retorna uma célula
+        por ocorrência dentro da grade (com repetições), na ordem dos dados.
+
+        Retorno:
+        - np.ndarray: Índices planos (linha * n_colunas + coluna), únicos e ordenados, das células com ocorrência.
+        """
+        height, width = stack.shape
+        rows, cols = rasterio.transform.rowcol(
+            stack.profile['transform'],
+            occurrence_data[lon_col].to_numpy(dtype=np.float64),
+            occurrence_data[lat_col].to_numpy(dtype=np.float64)
+        )
+        rows, cols = np.atleast_1d(rows).astype(np.int64), np.atleast_1d(cols).astype(np.int64)
+        dentro = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        cells = rows[dentro] * width + cols[dentro]
+        return np.unique(cells) if unique else cells
+
+    def _free_cells(self, stack, occurrence_cells):
+        """
+        Retorna os índices planos dos pixels válidos que não contêm nenhuma ocorrência.
+
+        As células das ocorrências são guardadas em uma tabela hash (`pd.Index`), consultada de uma só vez
+        para todos os pixels válidos.
+
+        Parâmetros:
+        - stack (ValidPixelStack): Pilha compacta com o índice dos pixels válidos.
+        - occurrence_cells (np.ndarray): Índices planos das células com ocorrência.
+
+        Retorno:
+        - np.ndarray: Índices planos das células candidatas.
+        """
+        return stack.index[pd.Index(occurrence_cells).get_indexer(stack.index) < 0]
+
+    def _occurrence_distance(self, stack, occurrence_cells):
+        """
+        Calcula, para todas as células da grade, a distância euclidiana até a célula com ocorrência mais próxima.
+
+        Retorno:
+        - np.ndarray: Vetor (linhas * colunas) com as distâncias nas unidades do CRS (infinito se não houver ocorrências).
+        """
+        if occurrence_cells.size == 0:
+            return np.full(stack.shape[0] * stack.shape[1], np.inf)
+
+        sem_ocorrencia = np.ones(stack.shape[0] * stack.shape[1], dtype=bool)
+        sem_ocorrencia[occurrence_cells] = False
+
+        transform = stack.profile['transform']
+        return distance_transform_edt(
+            sem_ocorrencia.reshape(stack.shape), sampling=(abs(transform.e), abs(transform.a))
+        ).ravel()
+
+    def _occurrence_density(self, stack, occurrence_cells, occurrence_data, lat_col, lon_col, bandwidth=None):
+        """
+        Estima a densidade das ocorrências na grade (KDE gaussiana) por convolução via FFT.
+
+        Parâmetros:
+        - stack (ValidPixelStack): Pilha compacta com o perfil da grade.
+        - occurrence_cells (np.ndarray): Índices planos da célula de cada ocorrência, com repetições
+        (ver `_occurrence_cells` com `unique=False`); células repetidas recebem peso proporcional à contagem.
+        - occurrence_data (pd.DataFrame): Dados de ocorrência, usados para a largura de banda padrão.
+        - lat_col (str): Nome da coluna de latitude.
+        - lon_col (str): Nome da coluna de longitude.
+        - bandwidth (float, opcional): Largura de banda nas unidades do CRS. Se None, usa a regra de Scott.
+
+        Retorno:
+        - np.ndarray: Superfície 2D de densidade (não normalizada) com as dimensões da grade.
+        """
+        height, width = stack.shape
+        transform = stack.profile['transform']
+
+        # Contagem de ocorrências por célula (ocorrências repetidas na mesma célula somam)
+        contagem = np.zeros(height * width, dtype=np.float64)
+        np.add.at(contagem, occurrence_cells, 1.0)
+        contagem = contagem.reshape(height, width)
+
+        if bandwidth is None:
+            coords = occurrence_data[[lon_col, lat_col]].to_numpy(dtype=np.float64)
+            bandwidth = coords.std(axis=0, ddof=1).mean() * max(len(coords), 2) ** (-1 / 6)
+            self.logger.info(f"Largura de banda da KDE (regra de Scott): {bandwidth:.5f}")
+
+        # Núcleo gaussiano em pixels, truncado em 4 desvios
+        sigma_y, sigma_x = bandwidth / abs(transform.e), bandwidth / abs(transform.a)
+        raio_y, raio_x = min(int(np.ceil(4 * sigma_y)), height), min(int(np.ceil(4 * sigma_x)), width)
+        y = np.arange(-raio_y, raio_y + 1)[:, None]
+        x = np.arange(-raio_x, raio_x + 1)[None, :]
+        nucleo = np.exp(-0.5 * ((y / max(sigma_y, 1e-12)) ** 2 + (x / max(sigma_x, 1e-12)) ** 2))
+
+        densidade = fftconvolve(contagem, nucleo, mode='same')
+        return np.clip(densidade, 0, None)  # Remove resíduos numéricos negativos da FFT
+
+    def _cell_centers(self, stack, cells, lat_col='decimalLatitude', lon_col='decimalLongitude'):
+        """
+        Converte índices planos de células em coordenadas do centro de cada pixel.
+
+        Retorno:
+        - pd.DataFrame: DataFrame com as colunas de latitude e longitude.
+        """
+        rows, cols = np.divmod(np.asarray(cells, dtype=np.int64), stack.shape[1])
+        lons, lats = rasterio.transform.xy(stack.profile['transform'], rows, cols, offset='center')
+        return pd.DataFrame({lat_col: np.asarray(lats, dtype=np.float64), lon_col: np.asarray(lons, dtype=np.float64)})
@@ -1,6 +1,5 @@
 # Funções baseadas em GLM, GAM, etc.
 import os
-import numpy as np
 import pandas as pd
 import statsmodels.api as sm
 from pygam import GAM,terms,s
@@ -8,11 +7,14 @@ from pygam import GAM,terms,s
 from EcoDistrib.common import msg_logger
 from EcoDistrib.outputs import MapGenerator
 from EcoDistrib.modeling import ModelDataPrepare
+from EcoDistrib.modeling.model_artifacts import ModelArtifact
+from EcoDistrib.utils import TileScheduler
 
 class StatisticalModeling:
     def __init__(self):
         self.logger = msg_logger
         self.model_type = None
+        self.artifact = None
 
     def sdm_gam(
             self,
@@ -24,7 +26,9 @@ class StatisticalModeling:
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_gam.tif',
-            pseudo_absence_ratio=0.3
+            pseudo_absence_ratio=0.3,
+            n_jobs=1,
+            artifact_path=None
         ):
         """
         Aplica o modelo GAM para predizer a distribuição das espécies.
@@ -32,7 +36,7 @@ class StatisticalModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame):
             Dados de ocorrência, contendo as colunas de latitude, longitude e presença/ausência.
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para os arquivos TIFF com dados ambientais.
         - lat_col (str, opcional):
             Nome da coluna com a latitude no DataFrame.
@@ -44,6 +48,11 @@ class StatisticalModeling:
             Se True, salva o mapa resultante como um arquivo TIFF.
         - output_save (str, opcional):
             Caminho do arquivo para salvar o mapa resultante.
+        - n_jobs (int, opcional):
+            Número de processos usados na predição do mapa, bloco a bloco (padrão: 1; -1 usa todos os núcleos).
+        - artifact_path (str, opcional):
+            Diretório onde salvar o modelo ajustado (ver `ModelArtifact`), para projeções posteriores sem reajuste.
+            O artefato também fica disponível em `self.artifact`.
 
         Retorno:
         - np.ndarray:
@@ -75,7 +84,7 @@ class StatisticalModeling:
             occurrence_data = pd.concat([occurrence_data, pseudo_ausencia_df], ignore_index=True)
 
             # Preparar os dados de raster
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
 
             # Definir X (dados ambientais) e y (presença/ausência)
             X = raster_values
@@ -87,16 +96,12 @@ class StatisticalModeling:
             modelo = GAM(termos).fit(X, y)
             self.logger.info("Modelo GAM ajustado com sucesso.")
 
-            # Prever utilizando a matriz 3D do raster
-            X_pred = matriz.reshape(-1, matriz.shape[2])
-            nan_rows = np.isnan(X_pred).any(axis=1)  # Identificar linhas com NaN
-            X_pred_valid = X_pred[~nan_rows]  # Remover linhas com NaN
-            previsao_valida = modelo.predict(X_pred_valid)
+            self.artifact = ModelArtifact.from_fit('GAM', modelo.predict, tiff_paths, X, y, params={'terms': str(termos)})
+            if artifact_path:
+                self.artifact.save(artifact_path)
 
-            # Reconstruir o array de previsão completo
-            previsao_gam = np.full(X_pred.shape[0], np.nan)
-            previsao_gam[~nan_rows] = previsao_valida
-            previsao_gam = previsao_gam.reshape(matriz.shape[0], matriz.shape[1])
+            # Prever utilizando a matriz 3D do raster, bloco a bloco (NaN nos pixels sem dados)
+            previsao_gam = TileScheduler(n_jobs=n_jobs).predict_matrix(matriz, modelo.predict)
 
             # Salvar o resultado se solicitado
             if save:
@@ -124,7 +129,9 @@ class StatisticalModeling:
             save=False,
             formato='GTiff',
             output_save='mapa_resultante_glm.tif',
-            pseudo_absence_ratio=0.3
+            pseudo_absence_ratio=0.3,
+            n_jobs=1,
+            artifact_path=None
         ):
         """
         Aplica o modelo GLM para predizer a distribuição das espécies.
@@ -132,7 +139,7 @@ class StatisticalModeling:
         Parâmetros:
         - occurrence_data (pd.DataFrame):
             Dados de ocorrência, contendo as colunas de latitude, longitude e presença/ausência.
-        - tiff_paths (str ou list):
+        - tiff_paths (str, list, RasterStack ou PreparedDataset):
             Caminho para os arquivos TIFF com dados ambientais.
         - lat_col (str, opcional):
             Nome da coluna com a latitude no DataFrame.
@@ -144,6 +151,11 @@ class StatisticalModeling:
             Se True, salva o mapa resultante como um arquivo TIFF.
         - output_save (str, opcional):
             Caminho do arquivo para salvar o mapa resultante.
+        - n_jobs (int, opcional):
+            Número de processos usados na predição do mapa, bloco a bloco (padrão: 1; -1 usa todos os núcleos).
+        - artifact_path (str, opcional):
+            Diretório onde salvar o modelo ajustado (ver `ModelArtifact`), para projeções posteriores sem reajuste.
+            O artefato também fica disponível em `self.artifact`.
 
         Retorno:
         - np.ndarray:
@@ -176,7 +188,7 @@ class StatisticalModeling:
             occurrence_data = pd.concat([occurrence_data, pseudo_ausencia_df], ignore_index=True)
 
             # Preparar dados de raster e ocorrência
-            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato)
+            matriz, raster_values, profile = ModelDataPrepare().prepare_raster_data(tiff_paths, occurrence_data, lat_col, lon_col, formato, compact=True)
 
             # Definir X (variáveis ambientais) e y (presença/ausência) para o modelo GLM
             X = raster_values
@@ -186,18 +198,14 @@ class StatisticalModeling:
             modelo = sm.GLM(y, X, family=sm.families.Binomial()).fit()
             self.logger.info("Modelo GLM ajustado com sucesso.")
 
-            # Preparar dados para previsão
-            X_pred = matriz.reshape(-1, matriz.shape[2])
-            nan_rows = np.isnan(X_pred).any(axis=1)  # Identificar linhas com NaN
-            X_pred_valid = X_pred[~nan_rows]  # Remover linhas com NaN
+            # Os dados de treino não são necessários para a predição e não são gravados no artefato
+            modelo.remove_data()
+            self.artifact = ModelArtifact.from_fit('GLM', modelo.predict, tiff_paths, X, y, params={'family': 'Binomial'})
+            if artifact_path:
+                self.artifact.save(artifact_path)
 
-            # Prever a distribuição
-            previsao_valida = modelo.predict(X_pred_valid)
-
-            # Criar um array completo de previsões com NaNs nas posições corretas
-            previsao_glm = np.full(X_pred.shape[0], np.nan)
-            previsao_glm[~nan_rows] = previsao_valida
-            previsao_glm = previsao_glm.reshape(matriz.shape[0], matriz.shape[1])
+            # Prever a distribuição bloco a bloco (NaN nos pixels sem dados)
+            previsao_glm = TileScheduler(n_jobs=n_jobs).predict_matrix(matriz, modelo.predict)
 
             # Salvar o resultado se solicitado
             if save:
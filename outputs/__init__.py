@@ -1,3 +1,3 @@
-from .map_generation import MapGenerator
+from .map_generation import MapGenerator, AsyncMapWriter
 
-__all__ = ["MapGenerator"]
+__all__ = ["MapGenerator", "AsyncMapWriter"]
@@ -1,22 +1,36 @@
 # Funções para geração e salvamento de mapas
+import os
+import time
+import queue
+import threading
 import rasterio
 import numpy as np
+import pandas as pd
+from collections.abc import Mapping
 from rasterio.transform import from_origin
 
 from EcoDistrib.common import msg_logger
+from EcoDistrib.utils import RasterOperations
 
 class MapGenerator:
     def __init__(self):
         self.logger = msg_logger
 
-    def save_map(self, array, profile, output_save=''):
+    def save_map(self, array, profile, output_save='', cog=False, blocksize=512, compress='deflate', quantize=None):
         """
         Salva um array NumPy como um arquivo raster no formato .tif.
 
         Parâmetros:
         - array (numpy.ndarray): Array com os valores a serem salvos.
-        - profile (dict): Dicionário contendo as configurações do raster, como CRS, resolução, e transformações.
+        - profile (dict, str, list ou pilha): Dicionário contendo as configurações do raster, como CRS, resolução, e transformações,
+        ou a própria pilha de entrada (caminhos, `RasterStack`, `ValidPixelStack` ou `PreparedDataset`), da qual o perfil é herdado
+        (ver `output_profile`).
         - output_save (str, opcional): Caminho para salvar o arquivo raster. O padrão é 'mapa_resultante_bioclim.tif'.
+        - cog (bool, opcional): Se True, salva como GeoTIFF otimizado para nuvem (COG), com blocos, compressão com preditor
+        e overviews internas (ver `RasterOperations.write_cog`). Padrão: False (GeoTIFF em faixas, sem compressão).
+        - blocksize (int, opcional): Lado dos blocos do COG (256 ou 512). Padrão: 512.
+        - compress (str, opcional): Compressão do COG ('deflate' ou 'zstd'). Padrão: 'deflate'.
+        - quantize (str, opcional): Quantização do COG: None (float32), 'float16' ou 'uint16' (probabilidades escaladas). Padrão: None.
 
         Retorno:
         - Nenhum.
@@ -26,14 +40,157 @@ class MapGenerator:
 
         Erros Tratados:
         - Caso o arquivo não possa ser salvo, o erro será registrado com uma mensagem descritiva.
+        - Dentro de um `AsyncMapWriter` ativo, o mapa é apenas enfileirado e os erros de escrita são
+        propagados por `flush`/`close` (ver `AsyncMapWriter`).
         """
+        # Escritor assíncrono ativo nesta thread: enfileira a escrita e retorna imediatamente
+        writer = AsyncMapWriter.active()
+        if writer is not None:
+            writer.submit(array, profile, output_save, cog=cog, blocksize=blocksize, compress=compress, quantize=quantize)
+            return
+
         try:
-            with rasterio.open(output_save, 'w', **profile) as dst:
-                dst.write(array, 1)
+            self._write_map(array, profile, output_save, cog=cog, blocksize=blocksize, compress=compress, quantize=quantize)
             self.logger.info(f"Mapa salvo com sucesso em: {output_save}")
         except Exception as e:
             self.logger.error(f"Erro ao salvar o mapa em {output_save}: {e}")
 
+    def _write_map(self, array, profile, output_save, cog=False, blocksize=512, compress='deflate', quantize=None):
+        """Escreve o mapa (ver `save_map`), propagando qualquer erro."""
+        if not isinstance(profile, Mapping):
+            profile = self.output_profile(profile)
+
+        if array.shape != (profile['height'], profile['width']):
+            raise ValueError(f"Dimensões do mapa {array.shape} diferentes da grade de saída ({profile['height']}, {profile['width']}).")
+
+        if cog:
+            RasterOperations().write_cog(output_save, array, profile, blocksize=blocksize, compress=compress, quantize=quantize)
+            return
+
+        # Pixels sem dados (NaN) recebem o valor nodata herdado da entrada
+        nodata = profile.get('nodata')
+        if nodata is not None and not np.isnan(nodata) and np.issubdtype(array.dtype, np.floating):
+            array = np.where(np.isnan(array), np.asarray(nodata, dtype=array.dtype), array)
+
+        with rasterio.open(output_save, 'w', **profile) as dst:
+            dst.write(array, 1)
+
+    def output_profile(self, tiff_paths, formato='GTiff'):
+        """
+        Deriva o perfil dos mapas de saída a partir da pilha de entrada, para que as saídas fiquem alinhadas às entradas.
+
+        Transformação, CRS, dimensões e nodata são herdados da primeira camada da pilha; a saída tem uma
+        única banda float32 (nodata NaN se a entrada não definir um valor nodata).
+
+        Parâmetros:
+        - tiff_paths (str, list, RasterStack, ValidPixelStack, PreparedDataset ou dict): Pilha de entrada
+        (diretório, lista de arquivos TIFF ou pilha já aberta/preparada) ou um perfil já conhecido.
+        - formato (str, opcional): Driver GDAL da saída. Padrão: 'GTiff'.
+
+        Retorno:
+        - profile (dict): Perfil dos mapas de saída.
+
+        Logs:
+        - Registra erros caso o perfil não possa ser obtido.
+        """
+        try:
+            if isinstance(tiff_paths, Mapping):
+                profile = dict(tiff_paths)
+            elif getattr(tiff_paths, 'profile', None) is not None:
+                # Pilha já aberta ou preparada: o perfil já é conhecido, sem reabrir os arquivos
+                profile = dict(tiff_paths.profile)
+            else:
+                _, profile = RasterOperations().stack_profile(tiff_paths)
+                profile = dict(profile)
+
+            nodata = profile.get('nodata')
+            profile.update(
+                driver=formato,
+                dtype='float32',
+                count=1,
+                nodata=np.nan if nodata is None else nodata
+            )
+            return profile
+
+        except Exception as e:
+            self.logger.error(f"Erro ao obter o perfil da pilha de entrada: {e}")
+            raise
+
+    def benchmark_save_options(self, array, profile, output_dir, options=None, n_windows=50, window_size=256, random_state=None):
+        """
+        Compara opções de escrita de mapas: tempo de escrita, tamanho do arquivo, latência de leitura por janelas
+        e erro máximo de quantização.
+
+        Parâmetros:
+        - array (numpy.ndarray): Mapa 2D a ser escrito (por exemplo, probabilidades em [0, 1]).
+        - profile (dict ou pilha): Perfil de saída ou pilha de entrada (ver `save_map`).
+        - output_dir (str): Diretório onde os arquivos de teste serão escritos.
+        - options (dict, opcional): Nome -> argumentos de `save_map` (cog, blocksize, compress, quantize).
+        Padrão: GeoTIFF em faixas e COG com DEFLATE/ZSTD, blocos de 256/512 e quantizações float16/uint16.
+        - n_windows (int, opcional): Número de janelas aleatórias lidas por arquivo. Padrão: 50.
+        - window_size (int, opcional): Lado das janelas lidas, em pixels. Padrão: 256.
+        - random_state (int, opcional): Semente das posições das janelas.
+
+        Retorno:
+        - pd.DataFrame: Uma linha por opção, com `write_s`, `size_mb`, `read_ms` (média por janela) e `max_error`.
+
+        Logs:
+        - Registra a tabela de resultados.
+        """
+        if options is None:
+            options = {
+                'strip': dict(cog=False),
+                'cog_deflate_256': dict(cog=True, blocksize=256, compress='deflate'),
+                'cog_deflate_512': dict(cog=True, blocksize=512, compress='deflate'),
+                'cog_zstd_512': dict(cog=True, blocksize=512, compress='zstd'),
+                'cog_zstd_512_float16': dict(cog=True, blocksize=512, compress='zstd', quantize='float16'),
+                'cog_zstd_512_uint16': dict(cog=True, blocksize=512, compress='zstd', quantize='uint16'),
+            }
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            height, width = array.shape
+            win_h, win_w = min(window_size, height), min(window_size, width)
+            rng = np.random.default_rng(random_state)
+            offsets = np.column_stack([rng.integers(0, height - win_h + 1, n_windows), rng.integers(0, width - win_w + 1, n_windows)])
+
+            resultados = []
+            for nome, kwargs in options.items():
+                output_save = os.path.join(output_dir, f"{nome}.tif")
+
+                inicio = time.perf_counter()
+                self._write_map(array, profile, output_save, **kwargs)
+                write_s = time.perf_counter() - inicio
+
+                with rasterio.open(output_save) as src:
+                    inicio = time.perf_counter()
+                    for row, col in offsets:
+                        src.read(1, window=rasterio.windows.Window(col, row, win_w, win_h))
+                    read_ms = (time.perf_counter() - inicio) * 1000 / n_windows
+
+                    # Valores decodificados (nodata -> NaN, aplicando a escala da quantização)
+                    lido = src.read(1, masked=True).astype(np.float64)
+                    lido = (lido * src.scales[0] + src.offsets[0]).filled(np.nan)
+
+                validos = ~np.isnan(array)
+                erro = np.abs(lido[validos] - array[validos])
+                resultados.append({
+                    'option': nome,
+                    'write_s': write_s,
+                    'size_mb': os.path.getsize(output_save) / 2 ** 20,
+                    'read_ms': read_ms,
+                    'max_error': float(np.nanmax(erro)) if erro.size else 0.0,
+                    'nodata_ok': bool(np.array_equal(np.isnan(lido), ~validos)),
+                })
+
+            resultados = pd.DataFrame(resultados)
+            self.logger.info(f"Comparação das opções de escrita:\n{resultados.to_string(index=False)}")
+            return resultados
+
+        except Exception as e:
+            self.logger.error(f"Erro na comparação das opções de escrita: {e}")
+            raise
+
     def create_synthetic_raster(
             self,
             formato='GTiff',
@@ -92,3 +249,120 @@ class MapGenerator:
         except Exception as e:
             self.logger.error(f"Erro ao criar o raster sintético: {e}")
             raise
+
+
+class AsyncMapWriter:
+    # Escritor ativo por thread, usado por `MapGenerator.save_map`
+    _local = threading.local()
+
+    def __init__(self, max_pending=2):
+        """
+        Escritor de mapas em segundo plano: uma fila limitada e uma thread que faz a codificação e a compressão
+        dos GeoTIFFs enquanto o próximo modelo é calculado.
+
+        Usado como gerenciador de contexto, todas as chamadas a `MapGenerator.save_map` feitas na thread atual
+        (inclusive dentro dos métodos `sdm_*` com `save=True`) passam a ser enfileiradas. A saída do bloco
+        aguarda as escritas pendentes e propaga o primeiro erro ocorrido.
+
+        :param max_pending: Número máximo de mapas aguardando escrita; `submit` bloqueia quando a fila está cheia,
+        limitando a memória ocupada pelos mapas pendentes (padrão: 2).
+        """
+        self.logger = msg_logger
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._error = None
+        self._closed = False
+        self._previous = None
+        self._thread = threading.Thread(target=self._worker, name='AsyncMapWriter', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def active(cls):
+        """Retorna o escritor ativo na thread atual, ou None."""
+        return getattr(cls._local, 'writer', None)
+
+    def submit(self, array, profile, output_save, **kwargs):
+        """
+        Enfileira um mapa para escrita (os argumentos são os de `MapGenerator.save_map`).
+
+        O array é copiado ao ser enfileirado: o chamador pode reutilizar ou modificar o buffer em seguida.
+        O perfil é resolvido na thread de chamada, de modo que pilhas abertas (`RasterStack`) nunca são
+        acessadas pela thread de escrita.
+
+        Exceções:
+        - RuntimeError: Se o escritor já foi fechado ou se uma escrita anterior falhou.
+        """
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("O escritor de mapas já foi fechado.")
+
+        if not isinstance(profile, Mapping):
+            profile = MapGenerator().output_profile(profile)
+
+        self._queue.put((np.array(array, copy=True), profile, output_save, kwargs))
+
+    def flush(self):
+        """
+        Aguarda a escrita de todos os mapas enfileirados.
+
+        Exceções:
+        - RuntimeError: Se alguma escrita falhou (a exceção original fica em `__cause__`).
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self, raise_errors=True):
+        """
+        Escreve os mapas pendentes e encerra a thread de escrita. Chamadas repetidas não têm efeito.
+
+        Parâmetros:
+        - raise_errors (bool, opcional): Se True (padrão), propaga o primeiro erro de escrita.
+
+        Exceções:
+        - RuntimeError: Se alguma escrita falhou e `raise_errors=True`.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+        if raise_errors:
+            self._raise_error()
+
+    def _worker(self):
+        """Laço da thread de escrita: escreve os mapas na ordem em que foram enfileirados."""
+        generator = MapGenerator()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+
+                array, profile, output_save, kwargs = item
+                # Depois de uma falha, os mapas restantes são descartados (o erro é propagado ao chamador)
+                if self._error is None:
+                    inicio = time.perf_counter()
+                    generator._write_map(array, profile, output_save, **kwargs)
+                    self.logger.info(f"Mapa salvo com sucesso em: {output_save} ({time.perf_counter() - inicio:.2f} s, em segundo plano)")
+
+            except Exception as e:
+                self._error = (item[2], e)
+                self.logger.error(f"Erro ao salvar o mapa em {item[2]}: {e}")
+
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            output_save, erro = self._error
+            raise RuntimeError(f"Falha na escrita em segundo plano do mapa {output_save}: {erro}") from erro
+
+    def __enter__(self):
+        self._previous = self.active()
+        AsyncMapWriter._local.writer = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        AsyncMapWriter._local.writer = self._previous
+        # Com uma exceção já em curso, não a substitui por um erro de escrita
+        self.close(raise_errors=exc_type is None)
+        return False
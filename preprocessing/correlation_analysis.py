@@ -25,7 +25,7 @@ class CorrelationAnalyzer:
         Calcula a matriz de correlação dos arquivos TIFF, exibe um heatmap e filtra variáveis baseadas no limiar de correlação.
 
         Parâmetros:
-        - tiff_paths (str ou list): Caminho para um diretório ou lista de arquivos TIFF.
+        - tiff_paths (str, list ou RasterStack): Caminho para um diretório ou lista de arquivos TIFF.
         - method (str): Tipo de correlação. Pode ser "pearson", "spearman" ou "kendall".
         - title (str): Título do gráfico de heatmap.
         - save_as (str): Caminho para salvar o gráfico como imagem. Se None, não será salvo.
@@ -61,7 +61,7 @@ class CorrelationAnalyzer:
         Calcula a matriz de correlação entre múltiplos arquivos TIFF.
 
         Parâmetros:
-        - tiff_paths (str ou list): Caminho para um diretório ou lista de arquivos TIFF.
+        - tiff_paths (str, list ou RasterStack): Caminho para um diretório ou lista de arquivos TIFF.
         - method (str): Método de correlação. Pode ser "pearson", "spearman" ou "kendall".
 
         Retorno:
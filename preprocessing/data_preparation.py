@@ -4,7 +4,7 @@ import rasterio
 import numpy as np
 import pandas as pd
 
-from EcoDistrib.utils import LoggerManager, FileManager
+from EcoDistrib.utils import LoggerManager, FileManager, RasterOperations, RasterStack
 
 class RasterDataExtract:
     def __init__(self):
@@ -15,7 +15,7 @@ class RasterDataExtract:
         Extrai valores de um arquivo raster ou de uma matriz com base em uma lista de coordenadas ou DataFrame.
 
         Parâmetros:
-        - raster_path: Caminho do diretório contendo arquivos raster ou uma matriz de dados raster.
+        - raster_path: Caminho do diretório contendo arquivos raster, uma `RasterStack` ou uma matriz de dados raster.
         - coordinates: Lista de tuplas com coordenadas (longitude, latitude) ou DataFrame com colunas de coordenadas.
         - lat_col: Nome da coluna de latitude no DataFrame (necessário se coordinates for DataFrame).
         - lon_col: Nome da coluna de longitude no DataFrame (necessário se coordinates for DataFrame).
@@ -26,7 +26,8 @@ class RasterDataExtract:
 
         Retorno:
         - DataFrame atualizado com novas colunas para cada raster, se add_to_df=True e coordinates for DataFrame.
-        - Caso contrário, retorna uma lista de listas com valores de pixels para cada coordenada e raster.
+        - Caso contrário, retorna uma matriz (coordenadas x rasters) com valores de pixels para cada coordenada e raster,
+        com NaN para coordenadas fora da área do raster.
 
         Exceções:
         - ValueError: Se colunas de latitude e longitude não forem especificadas quando coordinates for um DataFrame.
@@ -41,10 +42,14 @@ class RasterDataExtract:
         else:
             coords_list = coordinates
 
-        # Obtém a lista de arquivos raster e seus nomes sem extensão
+        # Obtém a lista de arquivos raster e seus nomes sem extensão (ou nomes genéricos para camadas de uma matriz)
         try:
-            raster_files = sorted(FileManager().listfile(raster_path))
-            raster_names = [os.path.splitext(os.path.basename(file))[0] for file in raster_files]
+            if isinstance(raster_path, np.ndarray):
+                n_layers = raster_path.shape[2] if raster_path.ndim == 3 else 1
+                raster_files, raster_names = [], [f"layer_{i + 1}" for i in range(n_layers)]
+            else:
+                raster_files = sorted(FileManager().listfile(raster_path))
+                raster_names = [os.path.splitext(os.path.basename(file))[0] for file in raster_files]
         except Exception as e:
             self.logger.error(f"Erro ao listar os arquivos raster: {e}")
             raise
@@ -53,8 +58,11 @@ class RasterDataExtract:
         try:
             if isinstance(raster_path, np.ndarray):
                 values_per_coordinate = self.get_matrix_values(raster_path, coords_list, resolution, bounds)
+                values_per_coordinate = values_per_coordinate.reshape(values_per_coordinate.shape[0], -1)
             else:
-                values_per_coordinate = self.get_raster_values(raster_files, coords_list)
+                # Uma pilha já aberta é reaproveitada sem reabrir os arquivos
+                raster_source = raster_path if isinstance(raster_path, RasterStack) else raster_files
+                values_per_coordinate = self.get_raster_values(raster_source, coords_list)
         except Exception as e:
             self.logger.error(f"Erro ao obter valores de raster ou matriz: {e}")
             raise
@@ -71,89 +79,82 @@ class RasterDataExtract:
         """
         Extrai valores de cada arquivo raster com base em uma lista de coordenadas.
 
+        Cada raster é aberto uma única vez; todas as coordenadas são convertidas em índices de linha e coluna
+        em uma única chamada vetorizada e os valores são lidos por indexação avançada (ou por blocos, em bandas muito grandes).
+
         Parâmetros:
-        - raster_path: Caminho do diretório contendo arquivos raster.
-        - coordinates: Lista de tuplas com coordenadas (longitude, latitude).
+        - raster_path: Caminho do diretório contendo arquivos raster, lista de arquivos ou `RasterStack`.
+        - coordinates: Lista de tuplas (ou array) com coordenadas (longitude, latitude).
 
         Retorno:
-        - Lista de listas, onde cada sublista contém os valores correspondentes aos pixels nas coordenadas fornecidas,
-        para cada raster.
+        - np.ndarray: Matriz float32 (pontos x rasters, rasters em ordem alfabética), com NaN para coordenadas
+        fora da área do raster.
         """
-        values_per_coordinate = []
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        lons, lats = coords[:, 0], coords[:, 1]
+
+        # Pilha já aberta: todas as coordenadas são amostradas de uma vez, sem reabrir os arquivos
+        if isinstance(raster_path, RasterStack):
+            return raster_path.sample(coords).astype(np.float32)
 
         try:
             # Obter lista de arquivos raster no diretório
             raster_files = sorted(FileManager().listfile(raster_path))
+            values = np.full((coords.shape[0], len(raster_files)), np.nan, dtype=np.float32)
 
-            for lat, lon in coordinates:
-                values_for_current_coord = []
-
-                for raster_file in raster_files:
-                    try:
-                        with rasterio.open(raster_file) as src:
-                            # Converter coordenadas (lat, lon) para índice da linha e coluna no raster
-                            row, col = src.index(lat, lon)
+            for idx, raster_file in enumerate(raster_files):
+                with rasterio.open(raster_file) as src:
+                    # Converter todas as coordenadas (longitude, latitude) para índices de linha e coluna
+                    rows, cols = rasterio.transform.rowcol(src.transform, lons, lats)
+                    rows, cols = np.atleast_1d(rows).astype(np.int64), np.atleast_1d(cols).astype(np.int64)
 
-                            # Verificar se os índices estão dentro do intervalo do raster
-                            if 0 <= row < src.height and 0 <= col < src.width:
-                                # Ler o valor do pixel naquela linha e coluna (banda 1)
-                                value = src.read(1)[row, col]
-                                values_for_current_coord.append(value)
-                            else:
-                                values_for_current_coord.append(None)  # Coordenada fora da área do raster
-
-                    except (IndexError, ValueError) as e:
-                        # Tratamento para coordenadas fora do raster ou erros de índice
-                        self.logger.error(f"Erro ao acessar coordenada ({lat}, {lon}) no arquivo {raster_file}: {e}")
-                        values_for_current_coord.append(None)
-
-                values_per_coordinate.append(values_for_current_coord)
+                    # Apenas os pontos dentro do raster são lidos; os demais permanecem NaN
+                    inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+                    if inside.any():
+                        values[inside, idx] = RasterOperations().read_points(src, rows[inside], cols[inside])
 
         except Exception as e:
             self.logger.error(f"Erro ao processar arquivos raster no diretório '{raster_path}': {e}")
             raise
 
-        return values_per_coordinate
+        return values
 
     def get_matrix_values(self, raster_array, coordinates, resolution, bounds):
         """
         Extrai valores de uma matriz de dados raster com base em uma lista de coordenadas.
 
+        Os índices de linha e coluna de todas as coordenadas são calculados de uma vez, os pontos fora dos limites
+        são mascarados e os valores são obtidos em uma única indexação.
+
         Parâmetros:
-        - raster_array (np.ndarray): Matriz de dados raster.
-        - coordinates (list): Lista de tuplas com coordenadas (longitude, latitude).
+        - raster_array (np.ndarray): Matriz 2D (linhas x colunas) ou 3D (linhas x colunas x camadas) de dados raster.
+        - coordinates (list ou np.ndarray): Lista de tuplas com coordenadas (longitude, latitude).
         - resolution (tuple): Resolução da matriz no formato (res_x, res_y).
         - bounds (tuple): Limites da matriz no formato (min_lon, max_lon, min_lat, max_lat).
 
         Retorno:
-        - list: Lista de valores correspondentes às coordenadas fornecidas.
+        - np.ndarray: Vetor (pontos,) para matrizes 2D ou matriz (pontos x camadas) para matrizes 3D,
+        com NaN para coordenadas fora dos limites ou da matriz.
         """
-        values_per_coordinate = []
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        lons, lats = coords[:, 0], coords[:, 1]
 
         # Extrair limites e resolução
         min_lon, max_lon, min_lat, max_lat = bounds
         res_x, res_y = resolution
 
-        for lon, lat in coordinates:
-            try:
-                # Verificar se a coordenada está dentro dos limites
-                if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
-                    # Calcular os índices na matriz
-                    col = int((lon - min_lon) / res_x)  # Mapeia longitude para coluna
-                    row = int((max_lat - lat) / res_y)  # Mapeia latitude para linha
-
-                    # Verificar se os índices estão dentro do intervalo da matriz
-                    if 0 <= row < raster_array.shape[0] and 0 <= col < raster_array.shape[1]:
-                        value = raster_array[row, col]
-                    else:
-                        value = None  # Coordenada fora do intervalo da matriz
-                else:
-                    value = None  # Coordenada fora dos limites fornecidos
+        # Calcular os índices na matriz para todas as coordenadas
+        cols = np.floor((lons - min_lon) / res_x)  # Mapeia longitude para coluna
+        rows = np.floor((max_lat - lats) / res_y)  # Mapeia latitude para linha
 
-                values_per_coordinate.append(value)
+        # Mascarar coordenadas fora dos limites fornecidos ou do intervalo da matriz
+        inside = (
+            (lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)
+            & (rows >= 0) & (rows < raster_array.shape[0]) & (cols >= 0) & (cols < raster_array.shape[1])
+        )
 
-            except Exception as e:
-                self.logger.error(f"Erro ao processar coordenada ({lon}, {lat}): {e}")
-                values_per_coordinate.append(None)
+        dtype = np.result_type(raster_array.dtype, np.float32)
+        values = np.full((coords.shape[0],) + raster_array.shape[2:], np.nan, dtype=dtype)
+        values[inside] = raster_array[rows[inside].astype(np.int64), cols[inside].astype(np.int64)]
 
-        return values_per_coordinate
+        return values
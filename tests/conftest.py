@@ -0,0 +1,49 @@
+# Dados sintéticos compartilhados pelos testes
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+ORIGIN = (-50.0, 0.0)
+RES = 0.1
+SHAPE = (40, 50)
+
+
+@pytest.fixture
+def tiff_dir(tmp_path):
+    """Diretório com 3 camadas alinhadas (EPSG:4326, nodata NaN) e alguns pixels sem dados."""
+    rng = np.random.default_rng(0)
+    height, width = SHAPE
+    rows, cols = np.mgrid[0:height, 0:width]
+    profile = {
+        'driver': 'GTiff', 'dtype': 'float32', 'count': 1, 'height': height, 'width': width,
+        'crs': 'EPSG:4326', 'transform': from_origin(*ORIGIN, RES, RES), 'nodata': np.nan,
+    }
+
+    camadas = {
+        'bio_1': 20 + 0.2 * rows + rng.normal(0, 0.5, SHAPE),
+        'bio_2': 5 + 0.1 * cols + rng.normal(0, 0.5, SHAPE),
+        'bio_3': 100 + 0.05 * rows * cols + rng.normal(0, 1.0, SHAPE),
+    }
+    camadas['bio_1'][:3, :4] = np.nan
+    camadas['bio_3'][-2:, -5:] = np.nan
+
+    directory = tmp_path / 'tifs'
+    directory.mkdir()
+    for nome, valores in camadas.items():
+        with rasterio.open(directory / f'{nome}.tif', 'w', **profile) as dst:
+            dst.write(valores.astype(np.float32), 1)
+    return str(directory)
+
+
+@pytest.fixture
+def occurrences():
+    """30 ocorrências em uma faixa da grade (centros de pixels válidos)."""
+    rng = np.random.default_rng(1)
+    rows = rng.integers(10, 30, 30)
+    cols = rng.integers(10, 40, 30)
+    return pd.DataFrame({
+        'decimalLongitude': ORIGIN[0] + (cols + 0.5) * RES,
+        'decimalLatitude': ORIGIN[1] - (rows + 0.5) * RES,
+    })
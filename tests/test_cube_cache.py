@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import rasterio
+
+from EcoDistrib.utils import CubeCache, RasterStack
+
+
+def _arquivos(cache_dir):
+    return sorted(nome for nome in os.listdir(cache_dir) if nome.endswith(('.npy', '.json')))
+
+
+def test_rewritten_layer_invalidates_and_prunes_cube(tiff_dir, tmp_path):
+    cache_dir = str(tmp_path / 'cubos')
+    with RasterStack(tiff_dir, cache_dir=cache_dir) as stack:
+        antigo = stack.read()
+        camada = stack.tiff_files[0]
+        chave_antiga = CubeCache(cache_dir).key(stack.tiff_files)
+    assert _arquivos(cache_dir) == [f'{chave_antiga}.json', f'{chave_antiga}.npy']
+
+    # Reescreve a primeira camada (e garante um mtime diferente)
+    with rasterio.open(camada, 'r+') as dst:
+        novos = dst.read(1) + 1000
+        dst.write(novos, 1)
+    mtime = os.stat(camada).st_mtime_ns + 10**9
+    os.utime(camada, ns=(mtime, mtime))
+
+    with RasterStack(tiff_dir, cache_dir=cache_dir) as stack:
+        atual = stack.read()
+        chave_nova = CubeCache(cache_dir).key(stack.tiff_files)
+
+    assert chave_nova != chave_antiga
+    np.testing.assert_array_equal(atual[..., 0], novos)
+    np.testing.assert_array_equal(atual[..., 1:], antigo[..., 1:])
+    assert _arquivos(cache_dir) == [f'{chave_nova}.json', f'{chave_nova}.npy']
+
+
+def test_unchanged_layers_reuse_cube(tiff_dir, tmp_path):
+    cache_dir = str(tmp_path / 'cubos')
+    with RasterStack(tiff_dir, cache_dir=cache_dir) as stack:
+        primeiro = stack.read()
+    gravado = os.stat(os.path.join(cache_dir, _arquivos(cache_dir)[1])).st_mtime_ns
+
+    with RasterStack(tiff_dir, cache_dir=cache_dir) as stack:
+        segundo = stack.read()
+
+    np.testing.assert_array_equal(primeiro, segundo)
+    assert os.stat(os.path.join(cache_dir, _arquivos(cache_dir)[1])).st_mtime_ns == gravado
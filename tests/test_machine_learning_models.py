@@ -0,0 +1,161 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from sklearn.model_selection import KFold
+
+from EcoDistrib.modeling import MLModeling
+from EcoDistrib.modeling import machine_learning_models
+
+GRID = {'n_estimators': [5, 10], 'max_depth': [2, None]}
+
+
+@pytest.fixture
+def amostras():
+    """Duas classes separáveis por uma combinação das duas primeiras variáveis."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 3))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize('cv', [5, KFold(3, shuffle=True, random_state=0)])
+@pytest.mark.parametrize('search', ['grid', 'halving'])
+def test_optimize_rf_accepts_int_and_splitter_cv(amostras, cv, search):
+    X, y = amostras
+    modelo, params, score = MLModeling().optimize_rf_parameters(X, y, param_grid=GRID, cv=cv, search=search)
+
+    assert params['max_depth'] in GRID['max_depth']
+    assert 0.0 <= score <= 1.0
+    assert modelo.predict(X).shape == y.shape
+
+
+def test_scalable_svm_falls_back_to_prefit_calibration(amostras, monkeypatch):
+    # Sem sklearn.frozen (scikit-learn < 1.6), a calibração usa cv='prefit'
+    chamadas = []
+
+    class Calibrador:
+        def __init__(self, estimator, **kwargs):
+            chamadas.append((estimator, kwargs))
+
+        def fit(self, X, y):
+            return self
+
+    monkeypatch.setitem(sys.modules, 'sklearn.frozen', None)
+    monkeypatch.setattr(machine_learning_models, 'CalibratedClassifierCV', Calibrador)
+    MLModeling()._scalable_svm(*amostras, 'rbf', 1.0, 'scale', 'rff', 20)
+
+    (estimador, kwargs), = chamadas
+    assert kwargs == {'cv': 'prefit', 'method': 'sigmoid'}
+    assert estimador.named_steps['svm'].coef_.shape == (1, 20)
+
+
+@pytest.mark.parametrize('approximation', ['nystroem', 'rff'])
+def test_scalable_svm_returns_calibrated_probabilities(amostras, approximation):
+    X, y = amostras
+    modelo, n_components = MLModeling()._scalable_svm(X, y, 'rbf', 1.0, 'scale', approximation, 20)
+
+    proba = modelo.predict_proba(X)[:, 1]
+    assert n_components == 20
+    assert ((proba >= 0) & (proba <= 1)).all()
+    assert proba[y == 1].mean() > proba[y == 0].mean()
+
+
+BUSCA = {'n_estimators': [10, 30, 90], 'max_depth': [2, 4, None], 'min_samples_leaf': [1, 3, 5]}
+
+
+def _busca(amostras, search, **kwargs):
+    X, y = amostras
+    folds = list(KFold(3, shuffle=True, random_state=0).split(X))
+    opcoes = dict(n_iter=None, max_fits=None, time_budget=None, factor=3, random_state=42)
+    opcoes.update(kwargs)
+    return MLModeling()._budgeted_search_rf(X, y, BUSCA, folds, 'accuracy', search, **opcoes)
+
+
+def test_halving_grows_best_candidates_to_largest_forest(amostras):
+    params, score, n_fits = _busca(amostras, 'halving')
+
+    assert params['n_estimators'] == max(BUSCA['n_estimators'])
+    assert params['max_depth'] in BUSCA['max_depth'] and params['min_samples_leaf'] in BUSCA['min_samples_leaf']
+    # 9 candidatos com 30 árvores, depois os 3 melhores crescidos até 90 (3 divisões cada)
+    assert n_fits == (9 + 3) * 3
+    assert 0.0 <= score <= 1.0
+
+
+def test_max_fits_stops_search_within_budget(amostras):
+    params, _, n_fits = _busca(amostras, 'halving', max_fits=7)
+
+    assert n_fits == 6  # Um terceiro candidato ultrapassaria o orçamento
+    assert params['n_estimators'] == 30  # Melhor candidato da primeira (e única) rodada
+
+
+def test_time_budget_keeps_first_candidate(amostras):
+    params, _, n_fits = _busca(amostras, 'halving', time_budget=0)
+
+    assert n_fits == 3
+    assert params['n_estimators'] == 30
+
+
+def test_random_search_samples_n_iter_candidates(amostras):
+    params, _, n_fits = _busca(amostras, 'random', n_iter=4)
+
+    assert n_fits == 4 * 3
+    assert params['n_estimators'] == max(BUSCA['n_estimators'])
+
+
+def _grade_pequena(directory, height=2, width=3):
+    """Duas camadas de height x width pixels (origem (10, 10), resolução 1) e os centros de todos os pixels."""
+    directory.mkdir()
+    rng = np.random.default_rng(2)
+    profile = {
+        'driver': 'GTiff', 'dtype': 'float32', 'count': 1, 'height': height, 'width': width,
+        'crs': 'EPSG:4326', 'transform': from_origin(10.0, 10.0, 1.0, 1.0), 'nodata': np.nan,
+    }
+    for nome in ('bio_1', 'bio_2'):
+        with rasterio.open(directory / f'{nome}.tif', 'w', **profile) as dst:
+            dst.write(rng.normal(size=(height, width)).astype(np.float32), 1)
+
+    rows, cols = np.mgrid[0:height, 0:width]
+    return str(directory), pd.DataFrame({'decimalLongitude': 10.5 + cols.ravel(), 'decimalLatitude': 9.5 - rows.ravel()})
+
+
+def test_streaming_ann_map_is_nan_only_on_invalid_pixels(tiff_dir, occurrences):
+    modelo = MLModeling()
+    mapa = modelo.sdm_ann(
+        occurrences.copy(), tiff_dir, hidden_layer_sizes=(8,), streaming=True, n_background=200, batch_size=64, max_iter=3
+    )
+
+    with rasterio.open(f'{tiff_dir}/bio_1.tif') as bio_1, rasterio.open(f'{tiff_dir}/bio_3.tif') as bio_3:
+        invalidos = np.isnan(bio_1.read(1)) | np.isnan(bio_3.read(1))
+    np.testing.assert_array_equal(np.isnan(mapa), invalidos)
+    assert ((mapa[~invalidos] >= 0) & (mapa[~invalidos] <= 1)).all()
+    assert 1 <= modelo.artifact.metadata['epochs'] <= 3
+
+
+def test_streaming_ann_patience_and_max_iter(tiff_dir, occurrences):
+    modelo = MLModeling()
+    opcoes = dict(hidden_layer_sizes=(8,), streaming=True, n_background=200, batch_size=64)
+
+    modelo.sdm_ann(occurrences.copy(), tiff_dir, max_iter=200, patience=1, **opcoes)
+    assert modelo.artifact.metadata['epochs'] < 200  # Parada antecipada
+    assert np.isfinite(modelo.artifact.metadata['validation_log_loss'])
+
+    with pytest.raises(ValueError):
+        modelo.sdm_ann(occurrences.copy(), tiff_dir, max_iter=0, **opcoes)
+
+
+def test_streaming_ann_background_avoids_occupied_cells(tmp_path):
+    directory, pontos = _grade_pequena(tmp_path / 'pequena')
+    opcoes = dict(hidden_layer_sizes=(4,), streaming=True, n_background=20, batch_size=8, max_iter=2)
+
+    # Uma única célula livre: a validação ainda tem fundo e a log-loss é finita
+    modelo = MLModeling()
+    modelo.sdm_ann(pontos.iloc[:-1].copy(), directory, **opcoes)
+    assert np.isfinite(modelo.artifact.metadata['validation_log_loss'])
+
+    # Nenhuma célula livre
+    with pytest.raises(ValueError):
+        MLModeling().sdm_ann(pontos.copy(), directory, **opcoes)
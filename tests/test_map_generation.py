@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+import rasterio
+
+from EcoDistrib.outputs import AsyncMapWriter, MapGenerator
+
+
+@pytest.fixture
+def mapa(tiff_dir):
+    with rasterio.open(f'{tiff_dir}/bio_1.tif') as src:
+        return src.read(1), src.profile
+
+
+def test_failed_write_raises_from_flush_and_exit(mapa, tmp_path):
+    array, profile = mapa
+
+    writer = AsyncMapWriter()
+    writer.submit(array[:-1], profile, str(tmp_path / 'errado.tif'))  # Dimensões incompatíveis com o perfil
+    with pytest.raises(RuntimeError) as erro:
+        writer.flush()
+    assert isinstance(erro.value.__cause__, ValueError)
+    writer.close(raise_errors=False)
+
+    with pytest.raises(RuntimeError) as erro:
+        with AsyncMapWriter():
+            MapGenerator().save_map(array[:-1], profile, output_save=str(tmp_path / 'errado.tif'))
+    assert isinstance(erro.value.__cause__, ValueError)
+    assert AsyncMapWriter.active() is None
+
+
+def test_exit_keeps_exception_in_flight(mapa, tmp_path):
+    array, profile = mapa
+    with pytest.raises(KeyError):
+        with AsyncMapWriter() as writer:
+            writer.submit(array[:-1], profile, str(tmp_path / 'errado.tif'))
+            writer._queue.join()
+            raise KeyError('modelo')
+
+
+def test_submit_copies_buffer(mapa, tmp_path, monkeypatch):
+    array, profile = mapa
+    liberar = threading.Event()
+    original = MapGenerator._write_map
+
+    def write_bloqueado(self, *args, **kwargs):
+        liberar.wait(5)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(MapGenerator, '_write_map', write_bloqueado)
+    buffer = array.copy()
+    with AsyncMapWriter() as writer:
+        writer.submit(buffer, profile, str(tmp_path / 'copia.tif'))
+        buffer[:] = -1  # O chamador reutiliza o buffer antes da escrita
+        liberar.set()
+
+    with rasterio.open(tmp_path / 'copia.tif') as src:
+        np.testing.assert_array_equal(src.read(1), array)
+
+
+def test_writes_follow_submission_order(mapa, tmp_path):
+    array, profile = mapa
+    with AsyncMapWriter(max_pending=1) as writer:
+        for deslocamento in range(4):
+            writer.submit(array + deslocamento, profile, str(tmp_path / 'ordem.tif'))
+
+    with rasterio.open(tmp_path / 'ordem.tif') as src:
+        np.testing.assert_array_equal(src.read(1), array + 3)
+
+
+def test_save_map_inside_writer_matches_direct_write(mapa, tmp_path):
+    array, profile = mapa
+    MapGenerator().save_map(array, profile, output_save=str(tmp_path / 'direto.tif'))
+    with AsyncMapWriter():
+        MapGenerator().save_map(array, profile, output_save=str(tmp_path / 'assincrono.tif'))
+
+    with rasterio.open(tmp_path / 'direto.tif') as direto, rasterio.open(tmp_path / 'assincrono.tif') as assincrono:
+        perfil_direto, perfil_assincrono = dict(direto.profile), dict(assincrono.profile)
+        np.testing.assert_array_equal(perfil_direto.pop('nodata'), perfil_assincrono.pop('nodata'))  # NaN == NaN
+        assert perfil_direto == perfil_assincrono
+        np.testing.assert_array_equal(direto.read(), assincrono.read())
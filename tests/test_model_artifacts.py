@@ -0,0 +1,19 @@
+import numpy as np
+
+from EcoDistrib.modeling import MLModeling, ModelArtifact
+from EcoDistrib.utils import ValidPixelStack
+
+
+def test_feature_means_use_raw_values(tiff_dir, occurrences, tmp_path):
+    ml = MLModeling()
+    # Ausências explícitas: as duas execuções usam as mesmas amostras de treino
+    dados = occurrences.assign(presence=(np.arange(len(occurrences)) % 2).astype(int))
+    ml.sdm_svm(dados.copy(), tiff_dir, normalize=True, artifact_path=str(tmp_path / 'svm'))
+    normalizado = ModelArtifact.load(str(tmp_path / 'svm')).metadata['feature_means']
+    ml.sdm_svm(dados.copy(), tiff_dir, normalize=False)
+    bruto = ml.artifact.metadata['feature_means']
+
+    # As médias independem da normalização e ficam próximas das médias da pilha original (não de zero)
+    np.testing.assert_allclose(normalizado, bruto)
+    media_pilha = np.nanmean(ValidPixelStack.from_rasters(tiff_dir).values, axis=0)
+    np.testing.assert_allclose(normalizado, media_pilha, rtol=0.25)
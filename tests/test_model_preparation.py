@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from EcoDistrib.modeling import ModelDataPrepare
+from EcoDistrib.utils import ValidPixelStack
+
+
+def test_occurrence_density_weights_duplicated_cells(tiff_dir):
+    stack = ValidPixelStack.from_rasters(tiff_dir)
+    preparo = ModelDataPrepare()
+    pontos = pd.DataFrame({'decimalLongitude': [-48.95, -47.05], 'decimalLatitude': [-1.05, -2.95]})
+    repetidos = pd.concat([pontos.iloc[[0]], pontos], ignore_index=True)
+
+    def densidade(dados):
+        celulas = preparo._occurrence_cells(stack, dados, unique=False)
+        return preparo._occurrence_density(stack, celulas, dados, 'decimalLatitude', 'decimalLongitude', bandwidth=0.2).ravel()
+
+    celula_repetida, celula_unica = preparo._occurrence_cells(stack, pontos)
+    simples, duplicada = densidade(pontos), densidade(repetidos)
+
+    assert len(preparo._occurrence_cells(stack, repetidos, unique=False)) == 3
+    np.testing.assert_allclose(duplicada[celula_repetida], 2 * simples[celula_repetida])
+    np.testing.assert_allclose(duplicada[celula_unica], simples[celula_unica])
+    assert duplicada[celula_repetida] > duplicada[celula_unica]
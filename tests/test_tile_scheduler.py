@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import rasterio
+
+from EcoDistrib.utils import RasterStack, TileScheduler
+
+
+def _soma(block):
+    return block.sum(axis=1)
+
+
+@pytest.fixture
+def contador_open(monkeypatch):
+    """Conta as aberturas de rasters para leitura."""
+    chamadas = []
+    original = rasterio.open
+
+    def open_contado(path, mode='r', *args, **kwargs):
+        if mode == 'r':
+            chamadas.append(path)
+        return original(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(rasterio, 'open', open_contado)
+    return chamadas
+
+
+def test_predict_rasters_opens_each_file_once(tiff_dir, contador_open):
+    scheduler = TileScheduler(block_size=16)  # 3 x 4 = 12 janelas
+    mapa = scheduler.predict_rasters(tiff_dir, _soma)
+
+    assert len(contador_open) == 3
+    with RasterStack(tiff_dir) as stack:
+        esperado = stack.read().sum(axis=-1)
+    np.testing.assert_allclose(mapa, esperado, rtol=1e-6)
+
+
+def test_predict_rasters_reuses_open_stack(tiff_dir, contador_open, tmp_path):
+    with RasterStack(tiff_dir) as stack:
+        esperado = TileScheduler(block_size=512).predict_rasters(stack, _soma)
+    with RasterStack(tiff_dir, cache_dir=str(tmp_path / 'cubos')) as stack:
+        contador_open.clear()
+        mapa = TileScheduler(block_size=16).predict_rasters(stack, _soma)
+        escrito = TileScheduler(block_size=16).write_rasters(stack, _soma, str(tmp_path / 'saida.tif'))
+
+    assert contador_open == []
+    np.testing.assert_allclose(mapa, esperado, rtol=1e-6)
+    assert escrito['height'] == mapa.shape[0]
+
+
+def test_parallel_windows_open_files_once_per_worker(tiff_dir, contador_open):
+    mapa = TileScheduler(n_jobs=2, block_size=16, backend='thread').predict_rasters(tiff_dir, _soma)
+    serie = TileScheduler(block_size=16).predict_rasters(tiff_dir, _soma)
+
+    # Pilha principal + uma pilha por thread (e não uma abertura por janela)
+    assert len(contador_open) <= 3 * (1 + 2) + 3
+    np.testing.assert_array_equal(mapa, serie)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from EcoDistrib.modeling import DistanceModeling, MLModeling, ModelDataPrepare
+from EcoDistrib.utils import FileManager, ValidPixelStack
+
+
+@pytest.fixture
+def stack(tiff_dir):
+    return ValidPixelStack.from_rasters(tiff_dir)
+
+
+def test_sample_matches_raster_extraction(tiff_dir, stack, occurrences):
+    fora = occurrences.copy()
+    fora.loc[0, 'decimalLongitude'] = 10.0  # Fora da grade
+    fora.loc[1, ['decimalLongitude', 'decimalLatitude']] = (-49.95, -0.05)  # Pixel sem dados em bio_1
+
+    esperado = ModelDataPrepare().extract_occurrence_values(tiff_dir, fora)
+    amostrado = ModelDataPrepare().extract_occurrence_values(stack, fora)
+
+    assert np.isnan(amostrado[:2]).all()
+    np.testing.assert_allclose(amostrado[2:], esperado[2:], rtol=1e-6)
+
+
+def test_listfile_uses_source_files(tiff_dir, stack):
+    assert sorted(FileManager().listfile(stack)) == sorted(FileManager().listfile(tiff_dir))
+    with pytest.raises(ValueError):
+        FileManager().listfile(ValidPixelStack.from_matrix(stack.to_matrix(), stack.profile))
+
+
+def test_distance_model_accepts_stack(tiff_dir, stack, occurrences):
+    modelo = DistanceModeling()
+    np.testing.assert_allclose(
+        modelo.sdm_euclidean(occurrences, stack), modelo.sdm_euclidean(occurrences, tiff_dir), rtol=1e-5
+    )
+
+
+def test_ml_model_accepts_stack(tiff_dir, stack, occurrences):
+    dados = occurrences.assign(presence=(np.arange(len(occurrences)) % 2).astype(int))
+    modelo = MLModeling()
+
+    mapa = modelo.sdm_rf(dados.copy(), stack, optimize_params=False)
+    referencia = modelo.sdm_rf(dados.copy(), tiff_dir, optimize_params=False)
+
+    np.testing.assert_array_equal(np.isnan(mapa), np.isnan(referencia))
+    np.testing.assert_allclose(mapa, referencia, rtol=1e-6)
+    assert modelo.artifact.features == stack.names
@@ -1,6 +1,8 @@
 from .file_operations import FileManager
-from .raster_operations import RasterHandler, RasterConverter, RasterOperations
+from .raster_operations import RasterHandler, RasterConverter, RasterOperations, RasterStack, ValidPixelStack
+from .tile_scheduler import TileScheduler
+from .cube_cache import CubeCache
 from .data_download import DataDownloader
 from .logger import LoggerManager
 
-__all__ = ["FileManager", "RasterHandler", "RasterConverter", "RasterOperations", "DataDownloader", "LoggerManager"]
+__all__ = ["FileManager", "RasterHandler", "RasterConverter", "RasterOperations", "RasterStack", "ValidPixelStack", "TileScheduler", "CubeCache", "DataDownloader", "LoggerManager"]
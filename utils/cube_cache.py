@@ -0,0 +1,124 @@
+# Cache em disco da pilha ambiental (cubo float32 mapeado em memória)
+import os
+import json
+import hashlib
+import numpy as np
+
+from EcoDistrib.utils.logger import LoggerManager
+
+
+class CubeCache:
+    def __init__(self, cache_dir=None):
+        """
+        Cache em disco de pilhas ambientais alinhadas, gravadas uma única vez como cubo float32
+        intercalado por banda (camadas x linhas x colunas) em um arquivo `.npy`.
+
+        A chave de cada cubo é calculada a partir dos caminhos, tamanhos e datas de modificação (mtime)
+        dos arquivos de entrada: qualquer alteração em uma camada gera uma nova chave, e o cubo antigo
+        é descartado automaticamente. Execuções seguintes abrem o cubo com `np.memmap` (carga quase
+        instantânea e cache de páginas compartilhado entre processos).
+
+        :param cache_dir: Diretório do cache (padrão: ~/.cache/EcoDistrib/cubes).
+        """
+        self.logger = LoggerManager().get_logger()
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.cache', 'EcoDistrib', 'cubes')
+
+    def key(self, tiff_files):
+        """
+        Calcula a chave do cubo para uma lista de arquivos.
+
+        Parâmetros:
+        - tiff_files (list): Caminhos dos arquivos TIFF, na ordem das camadas.
+
+        Retorno:
+        - str: Chave hexadecimal (SHA-256 dos caminhos absolutos, tamanhos e mtimes).
+        """
+        assinatura = []
+        for tiff in tiff_files:
+            stat = os.stat(tiff)
+            assinatura.append([os.path.abspath(tiff), stat.st_size, stat.st_mtime_ns])
+        return hashlib.sha256(json.dumps(assinatura).encode('utf-8')).hexdigest()[:32]
+
+    def load(self, raster_stack):
+        """
+        Retorna o cubo da pilha mapeado em memória, criando-o na primeira chamada.
+
+        Parâmetros:
+        - raster_stack (RasterStack): Pilha aberta (as camadas são lidas apenas se o cubo não existir).
+
+        Retorno:
+        - np.memmap: Cubo float32 somente leitura (camadas x linhas x colunas).
+        """
+        key = self.key(raster_stack.tiff_files)
+        cube_path = os.path.join(self.cache_dir, f"{key}.npy")
+
+        if not os.path.exists(cube_path):
+            self._build(raster_stack, key, cube_path)
+        else:
+            self.logger.info(f"Cubo ambiental carregado do cache: {cube_path}")
+
+        cube = np.load(cube_path, mmap_mode='r')
+        if cube.shape != (raster_stack.count, raster_stack.height, raster_stack.width):
+            raise ValueError(f"O cubo em cache {cube_path} não corresponde à pilha de entrada.")
+        return cube
+
+    def clear(self):
+        """Remove todos os cubos do diretório de cache."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for nome in os.listdir(self.cache_dir):
+            if nome.endswith(('.npy', '.json')):
+                os.remove(os.path.join(self.cache_dir, nome))
+        self.logger.info(f"Cache de cubos limpo: {self.cache_dir}")
+
+    def _build(self, raster_stack, key, cube_path):
+        """Grava o cubo camada a camada em um arquivo temporário e o publica com uma renomeação atômica."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        shape = (raster_stack.count, raster_stack.height, raster_stack.width)
+
+        # Nome temporário por processo: execuções concorrentes não veem um cubo incompleto
+        tmp_path = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.tmp.npy")
+        try:
+            cube = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+            for idx, src in enumerate(raster_stack.datasets):
+                cube[idx] = src.read(1)
+            cube.flush()
+            del cube
+            os.replace(tmp_path, cube_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        header = {
+            'files': [os.path.abspath(tiff) for tiff in raster_stack.tiff_files],
+            'names': list(raster_stack.names),
+            'shape': list(shape),
+            'dtype': 'float32',
+            'layout': 'band',
+        }
+        with open(os.path.join(self.cache_dir, f"{key}.json"), 'w', encoding='utf-8') as arquivo:
+            json.dump(header, arquivo, indent=2)
+
+        self._prune(key, header['files'])
+        self.logger.info(f"Cubo ambiental gravado no cache: {cube_path} ({shape[0]} camadas de {shape[1]} x {shape[2]} pixels).")
+
+    def _prune(self, key, files):
+        """Remove cubos antigos das mesmas camadas (invalidados por alteração de tamanho ou mtime)."""
+        for nome in os.listdir(self.cache_dir):
+            if not nome.endswith('.json') or nome == f"{key}.json":
+                continue
+
+            header_path = os.path.join(self.cache_dir, nome)
+            try:
+                with open(header_path, encoding='utf-8') as arquivo:
+                    antigos = json.load(arquivo).get('files')
+            except (OSError, ValueError):
+                continue
+
+            if antigos == files:
+                antigo = nome[:-len('.json')]
+                for caminho in (os.path.join(self.cache_dir, f"{antigo}.npy"), header_path):
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                self.logger.info(f"Cubo em cache invalidado e removido: {antigo}")
@@ -192,7 +192,8 @@ class FileManager:
         Verifica se o caminho fornecido é um diretório ou arquivo e retorna uma lista de caminhos para arquivos TIFF.
 
         Parâmetros:
-        - tiff_paths (str ou list): Caminho para um diretório, um arquivo TIFF, ou uma lista de arquivos.
+        - tiff_paths (str, list, RasterStack ou ValidPixelStack): Caminho para um diretório, um arquivo TIFF, uma lista de arquivos,
+        uma pilha de rasters já aberta ou uma pilha compacta lida de arquivos (`ValidPixelStack.from_rasters`).
 
         Retorno:
         - list: Lista de caminhos para arquivos TIFF válidos.
@@ -215,6 +216,12 @@ class FileManager:
                 else:
                     raise ValueError(f"O caminho fornecido '{tiff_paths}' não é um diretório nem um arquivo TIFF válido.")
 
+            # Se `tiff_paths` for uma pilha (RasterStack, ValidPixelStack ou conjunto preparado), usa os arquivos já validados
+            elif hasattr(tiff_paths, 'tiff_files'):
+                if tiff_paths.tiff_files is None:
+                    raise ValueError("A pilha compacta não foi lida de arquivos TIFF (ver `ValidPixelStack.from_rasters`).")
+                tiff_paths = list(tiff_paths.tiff_files)
+
             # Se `tiff_paths` for uma lista, valida os caminhos
             elif isinstance(tiff_paths, list):
                 if not all(isinstance(f, str) and os.path.isfile(f) and f.lower().endswith(('.tif', '.tiff')) for f in tiff_paths):
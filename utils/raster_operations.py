@@ -2,14 +2,18 @@
 
 import os
 import rasterio
+from contextlib import contextmanager
+from collections.abc import Mapping
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 from rasterio.mask import mask
+from rasterio.windows import Window
 from rasterio.transform import from_origin
 
 from EcoDistrib.utils.logger import LoggerManager
 from EcoDistrib.utils.file_operations import FileManager
+from EcoDistrib.utils.cube_cache import CubeCache
 
 class RasterHandler:
     def __init__(self):
@@ -205,7 +209,8 @@ class RasterHandler:
             self.logger.error(f"Ocorreu um erro ao salvar o mapa inteiro: {e}")
             raise
 
-    def save_raster(self, output_path: str, data: np.ndarray, profile: dict) -> None:
+    def save_raster(self, output_path: str, data: np.ndarray, profile: dict, cog: bool = False, blocksize: int = 512,
+                    compress: str = 'deflate', quantize: str = None) -> None:
         """
         Salva um novo arquivo raster no caminho especificado.
 
@@ -213,10 +218,15 @@ class RasterHandler:
         - output_path (str): Caminho onde o novo arquivo raster será salvo.
         - data (np.ndarray): Array com os dados do raster a serem salvos.
         - profile (dict): Perfil/metadata do arquivo raster, incluindo informações de georreferenciamento, formato e dimensões.
+        - cog (bool, opcional): Se True, salva como GeoTIFF otimizado para nuvem (blocos, compressão e overviews).
+        Ver `RasterOperations.write_cog`. Padrão: False.
+        - blocksize (int, opcional): Lado dos blocos do COG (256 ou 512). Padrão: 512.
+        - compress (str, opcional): Compressão do COG ('deflate' ou 'zstd'). Padrão: 'deflate'.
+        - quantize (str, opcional): Quantização do COG: None, 'float16' ou 'uint16'. Padrão: None.
 
         Comportamento:
         - Valida os parâmetros de entrada.
-        - Salva o raster no formato GeoTIFF.
+        - Salva o raster no formato GeoTIFF (ou COG).
 
         Exceções:
         - ValueError: Se os dados forem vazios ou o perfil não for válido.
@@ -227,9 +237,13 @@ class RasterHandler:
             if data is None or data.size == 0:
                 raise ValueError("Os dados fornecidos para o raster estão vazios.")
 
-            if not isinstance(profile, dict):
+            if not isinstance(profile, Mapping):
                 raise ValueError("O perfil fornecido deve ser um dicionário com os metadados do raster.")
 
+            if cog:
+                RasterOperations().write_cog(output_path, data, profile, blocksize=blocksize, compress=compress, quantize=quantize)
+                return
+
             # Atualiza o perfil para o driver GeoTIFF
             profile.update(driver='GTiff')
 
@@ -342,12 +356,15 @@ class RasterOperations:
 
         return matriz, nomes_variaveis
 
-    def raster_to_matrix_2d(self,tiff_paths):
+    def raster_to_matrix_2d(self,tiff_paths,cache_dir=None):
         """
         Converte os dados de vários arquivos TIFF em uma matriz 3D.
 
         Parâmetros:
-        - tiff_paths (str ou list): Caminho para um diretório contendo arquivos TIFF ou uma lista de caminhos para arquivos TIFF a serem lidos.
+        - tiff_paths (str, list ou RasterStack): Caminho para um diretório contendo arquivos TIFF, uma lista de caminhos para arquivos TIFF a serem lidos
+        ou uma pilha já aberta.
+        - cache_dir (str, opcional): Diretório do cache de cubos (ver `CubeCache`). Se informado, as camadas são lidas
+        (em ordem alfabética) do cubo float32 mapeado em memória, gravado na primeira chamada.
 
         Retorno:
         - matriz (np.ndarray): Matriz 3D onde cada camada corresponde a um raster.
@@ -358,6 +375,16 @@ class RasterOperations:
         Exceções:
         - ValueError: Se nenhum raster válido for encontrado.
         """
+        # Pilha já aberta: lê todas as camadas sem reabrir os arquivos
+        if isinstance(tiff_paths, RasterStack):
+            bounds = tiff_paths.bounds
+            return tiff_paths.read(), list(tiff_paths.names), tiff_paths.res, (bounds.left, bounds.right, bounds.bottom, bounds.top)
+
+        # Cache de cubos: abre a pilha sobre o cubo mapeado em memória
+        if cache_dir is not None:
+            with RasterStack(tiff_paths, cache_dir=cache_dir) as stack:
+                return self.raster_to_matrix_2d(stack)
+
         # Lista os arquivos TIFF no caminho fornecido
         tiff_paths = FileManager().listfile(tiff_paths)
 
@@ -408,6 +435,190 @@ class RasterOperations:
 
         return matriz, nomes_variaveis, resolution_tuple, bounds_tuple
 
+    def block_windows(self, height, width, block_size=512):
+        """
+        Gera as janelas (blocos) que cobrem uma grade raster, linha por linha.
+
+        Parâmetros:
+        - height (int): Número de linhas da grade.
+        - width (int): Número de colunas da grade.
+        - block_size (int): Tamanho do lado de cada bloco, em pixels. Padrão: 512.
+
+        Retorno:
+        - Gerador de `rasterio.windows.Window`.
+        """
+        for row_off in range(0, height, block_size):
+            for col_off in range(0, width, block_size):
+                yield Window(col_off, row_off, min(block_size, width - col_off), min(block_size, height - row_off))
+
+    def read_points(self, src, rows, cols, max_window_pixels=2 ** 24):
+        """
+        Lê os valores da primeira banda de um raster aberto nos índices (linha, coluna) fornecidos.
+
+        Se a janela que envolve todos os pontos tiver até `max_window_pixels` pixels, ela é lida de uma vez
+        e os valores são obtidos por indexação avançada; caso contrário (bandas muito grandes com pontos
+        espalhados), apenas os blocos de 512 x 512 pixels que contêm pontos são lidos.
+
+        Parâmetros:
+        - src (rasterio.DatasetReader): Raster aberto.
+        - rows (np.ndarray): Índices de linha (dentro da grade).
+        - cols (np.ndarray): Índices de coluna (dentro da grade).
+        - max_window_pixels (int, opcional): Tamanho máximo da janela lida de uma só vez. Padrão: 2**24.
+
+        Retorno:
+        - np.ndarray: Vetor com os valores de cada ponto, no tipo do raster.
+        """
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        if rows.size == 0:
+            return np.empty(0, dtype=src.dtypes[0])
+
+        row_off, col_off = int(rows.min()), int(cols.min())
+        n_rows, n_cols = int(rows.max()) - row_off + 1, int(cols.max()) - col_off + 1
+
+        if n_rows * n_cols <= max_window_pixels:
+            band = src.read(1, window=Window(col_off, row_off, n_cols, n_rows))
+            return band[rows - row_off, cols - col_off]
+
+        # Agrupar os pontos pelo bloco que os contém e ler cada bloco uma única vez
+        block_size = 512
+        values = np.empty(rows.shape[0], dtype=src.dtypes[0])
+        block_ids = (rows // block_size) * ((src.width + block_size - 1) // block_size) + cols // block_size
+        order = np.argsort(block_ids, kind='stable')
+        _, starts = np.unique(block_ids[order], return_index=True)
+
+        for selected in np.split(order, starts[1:]):
+            block_row = int(rows[selected[0]] // block_size) * block_size
+            block_col = int(cols[selected[0]] // block_size) * block_size
+            window = Window(block_col, block_row, min(block_size, src.width - block_col), min(block_size, src.height - block_row))
+            band = src.read(1, window=window)
+            values[selected] = band[rows[selected] - block_row, cols[selected] - block_col]
+
+        return values
+
+    def stack_profile(self, tiff_paths):
+        """
+        Verifica se as camadas de uma pilha de rasters compartilham a mesma grade e retorna o perfil de referência.
+
+        Parâmetros:
+        - tiff_paths (str, list ou RasterStack): Caminho para um diretório, lista de arquivos TIFF ou pilha já aberta.
+
+        Retorno:
+        - tiff_files (list): Lista dos arquivos TIFF em ordem alfabética.
+        - profile (dict): Perfil (profile) da primeira camada.
+
+        Exceções:
+        - ValueError: Se nenhum raster for encontrado ou se as camadas não tiverem a mesma grade.
+        """
+        if isinstance(tiff_paths, RasterStack):
+            return list(tiff_paths.tiff_files), tiff_paths.profile
+
+        tiff_files = sorted(FileManager().listfile(tiff_paths))
+        if not tiff_files:
+            raise ValueError("Nenhum raster válido foi encontrado.")
+
+        with rasterio.open(tiff_files[0]) as reference:
+            profile = reference.profile.copy()
+
+        for tiff in tiff_files[1:]:
+            with rasterio.open(tiff) as src:
+                if (src.height, src.width) != (profile['height'], profile['width']) or src.transform != profile['transform']:
+                    raise ValueError(f"O raster {tiff} não está alinhado com {tiff_files[0]}.")
+
+        return tiff_files, profile
+
+    def cog_profile(self, profile, count=1, blocksize=512, compress='deflate', quantize=None, overview_resampling='average'):
+        """
+        Monta o perfil de escrita de um GeoTIFF otimizado para nuvem (COG): blocos (tiles) quadrados,
+        compressão com preditor e overviews internas.
+
+        Parâmetros:
+        - profile (dict): Perfil de referência (transformação, CRS, dimensões e nodata são preservados).
+        - count (int, opcional): Número de bandas. Padrão: 1.
+        - blocksize (int, opcional): Lado dos blocos, em pixels (256 ou 512, ou outro múltiplo de 16). Padrão: 512.
+        - compress (str, opcional): Compressão ('deflate', 'zstd', 'lzw' ...). Padrão: 'deflate'.
+        - quantize (str, opcional): None (float32), 'float16' (meia precisão) ou 'uint16' (probabilidades em [0, 1]
+        escaladas para 0-65534, com 65535 como nodata). Padrão: None.
+        - overview_resampling (str, opcional): Reamostragem das overviews. Padrão: 'average'.
+
+        Retorno:
+        - dict: Perfil para `rasterio.open(..., 'w', **profile)` com o driver COG.
+
+        Exceções:
+        - ValueError: Se `blocksize` não for múltiplo de 16 ou `quantize` for desconhecido.
+        """
+        if blocksize % 16 != 0:
+            raise ValueError("O tamanho dos blocos deve ser múltiplo de 16 (por exemplo, 256 ou 512).")
+        if quantize not in (None, 'float16', 'uint16'):
+            raise ValueError("Quantização desconhecida. Escolha entre None, 'float16' ou 'uint16'.")
+
+        # Opções de layout do perfil de origem (faixas, blocos, compressão) são substituídas pelas do COG
+        cog = {key: value for key, value in dict(profile).items()
+               if key.lower() not in ('blockxsize', 'blockysize', 'tiled', 'interleave', 'compress', 'predictor', 'nbits')}
+        cog.update(
+            driver='COG',
+            count=count,
+            blocksize=blocksize,
+            compress=compress,
+            overview_resampling=overview_resampling,
+            bigtiff='IF_SAFER'
+        )
+
+        if quantize == 'uint16':
+            cog.update(dtype='uint16', nodata=65535, predictor=2)
+        else:
+            # NBITS=16 armazena o float32 em meia precisão; o nodata NaN é o único representável com segurança
+            cog.update(dtype='float32', predictor=3)
+            if quantize == 'float16':
+                cog.update(nbits=16, nodata=np.nan)
+            elif cog.get('nodata') is None:
+                cog.update(nodata=np.nan)
+
+        return cog
+
+    def write_cog(self, output_path, data, profile, blocksize=512, compress='deflate', quantize=None, overview_resampling='average'):
+        """
+        Escreve um array como GeoTIFF otimizado para nuvem (COG), com blocos, compressão e overviews internas.
+
+        Pixels NaN são gravados como o nodata do perfil de saída. Com `quantize='uint16'`, os valores
+        (probabilidades em [0, 1]) são escalados para 0-65534 e a escala (1/65534) é gravada nos metadados da banda.
+
+        Parâmetros:
+        - output_path (str): Caminho do arquivo de saída.
+        - data (np.ndarray): Array 2D (linhas x colunas) ou 3D (bandas x linhas x colunas).
+        - profile (dict): Perfil de referência (ver `cog_profile`).
+        - blocksize, compress, quantize, overview_resampling: Ver `cog_profile`.
+
+        Retorno:
+        - dict: Perfil usado na escrita.
+
+        Exceções:
+        - ValueError: Se os dados estiverem vazios ou as opções forem inválidas.
+        """
+        if data is None or data.size == 0:
+            raise ValueError("Os dados fornecidos para o raster estão vazios.")
+
+        bands = data[np.newaxis] if data.ndim == 2 else data
+        cog = self.cog_profile(profile, bands.shape[0], blocksize, compress, quantize, overview_resampling)
+        sem_dados = np.isnan(bands) if np.issubdtype(bands.dtype, np.floating) else np.zeros(bands.shape, dtype=bool)
+
+        if quantize == 'uint16':
+            escala = 65534
+            bands = np.rint(np.clip(np.nan_to_num(bands, nan=0.0), 0.0, 1.0) * escala).astype(np.uint16)
+            bands[sem_dados] = cog['nodata']
+        else:
+            bands = bands.astype(np.float32)
+            if not np.isnan(cog['nodata']):
+                bands[sem_dados] = cog['nodata']
+
+        with rasterio.open(output_path, 'w', **cog) as dst:
+            dst.write(bands)
+            if quantize == 'uint16':
+                dst.scales = (1.0 / escala,) * bands.shape[0]
+                dst.offsets = (0.0,) * bands.shape[0]
+
+        self.logger.info(f"COG salvo em: {output_path} (blocos {blocksize}, {compress}, quantização: {quantize}).")
+        return cog
+
     def remove_pixels_nan(self,matriz):
         """
         Remove as colunas que possuem apenas valores NaN em todos os mapas (linhas) da matriz.
@@ -433,6 +644,398 @@ class RasterOperations:
 
         return matriz_filtrada
 
+class RasterStack:
+    def __init__(self, tiff_paths, cache_dir=None):
+        """
+        Pilha de camadas ambientais aberta uma única vez e lida sob demanda.
+
+        Todos os arquivos são abertos na criação (em ordem alfabética) e validados: as camadas devem ter
+        as mesmas dimensões, transformação e CRS. A pilha pode ser usada no lugar de `tiff_paths`
+        pelas classes de modelagem e pré-processamento.
+
+        Com `cache_dir`, as camadas são lidas de um cubo float32 mapeado em memória (ver `CubeCache`),
+        gravado na primeira execução e reaproveitado enquanto nenhum arquivo for alterado.
+
+        :param tiff_paths: Caminho para um diretório ou lista de arquivos TIFF.
+        :param cache_dir: Diretório do cache de cubos (opcional). Se None, lê os TIFFs diretamente.
+        :raises ValueError: Se nenhum raster for encontrado ou se as camadas não estiverem alinhadas.
+        """
+        self.logger = LoggerManager().get_logger()
+        self.tiff_files = sorted(FileManager().listfile(tiff_paths))
+        if not self.tiff_files:
+            raise ValueError("Nenhum raster válido foi encontrado.")
+
+        self.names = [os.path.splitext(os.path.basename(tiff))[0] for tiff in self.tiff_files]
+        self.datasets = []
+        try:
+            for tiff in self.tiff_files:
+                self.datasets.append(rasterio.open(tiff))
+            self._validate()
+
+            self.cache_dir = cache_dir
+            self.cube = CubeCache(cache_dir).load(self) if cache_dir is not None else None
+        except Exception:
+            self.close()
+            raise
+
+        self.logger.info(f"Pilha de rasters aberta: {self.count} camadas de {self.height} x {self.width} pixels.")
+
+    def _validate(self):
+        """Verifica se todas as camadas compartilham dimensões, transformação e CRS."""
+        reference = self.datasets[0]
+        for src in self.datasets[1:]:
+            if (src.height, src.width) != (reference.height, reference.width):
+                raise ValueError(f"O raster {src.name} tem dimensões diferentes de {reference.name}.")
+            if src.transform != reference.transform:
+                raise ValueError(f"O raster {src.name} tem transformação diferente de {reference.name}.")
+            if src.crs != reference.crs:
+                raise ValueError(f"O raster {src.name} tem CRS diferente de {reference.name}.")
+
+    @classmethod
+    @contextmanager
+    def using(cls, tiff_paths, cache_dir=None):
+        """
+        Contexto que reutiliza uma `RasterStack` já aberta ou abre (e fecha ao final) uma nova.
+
+        Parâmetros:
+        - tiff_paths (RasterStack, str ou list): `RasterStack`, diretório ou lista de arquivos TIFF.
+        - cache_dir (str, opcional): Diretório do cache de cubos usado ao abrir uma nova pilha.
+        """
+        if isinstance(tiff_paths, cls):
+            yield tiff_paths
+            return
+
+        stack = cls(tiff_paths, cache_dir=cache_dir)
+        try:
+            yield stack
+        finally:
+            stack.close()
+
+    @property
+    def count(self):
+        """Número de camadas."""
+        return len(self.datasets)
+
+    @property
+    def height(self):
+        return self.datasets[0].height
+
+    @property
+    def width(self):
+        return self.datasets[0].width
+
+    @property
+    def transform(self):
+        return self.datasets[0].transform
+
+    @property
+    def crs(self):
+        return self.datasets[0].crs
+
+    @property
+    def res(self):
+        return self.datasets[0].res
+
+    @property
+    def bounds(self):
+        return self.datasets[0].bounds
+
+    @property
+    def profile(self):
+        """Perfil (profile) geoespacial real da pilha (o da primeira camada)."""
+        return self.datasets[0].profile.copy()
+
+    def read_layer(self, idx, window=None):
+        """
+        Lê uma camada inteira ou uma janela dela.
+
+        Parâmetros:
+        - idx (int): Índice da camada (ordem alfabética dos arquivos).
+        - window (Window, opcional): Janela de leitura; se None, lê a grade inteira.
+
+        Retorno:
+        - Array 2D com os valores da camada (float32, somente leitura, se a pilha usa o cache de cubos).
+        """
+        if self.cube is not None:
+            layer = self.cube[idx] if window is None else self.cube[idx][window.toslices()]
+            return np.asarray(layer)
+
+        return self.datasets[idx].read(1, window=window)
+
+    def read(self, window=None):
+        """
+        Lê todas as camadas (ou uma janela delas) como matriz 3D (linhas x colunas x camadas).
+
+        Com o cache de cubos, a janela é recortada do cubo mapeado em memória de uma só vez, sem ler os TIFFs.
+
+        Parâmetros:
+        - window (Window, opcional): Janela de leitura; se None, lê a grade inteira.
+
+        Retorno:
+        - Matriz 3D com as camadas empilhadas no último eixo.
+        """
+        if self.cube is not None:
+            block = self.cube if window is None else self.cube[(slice(None),) + window.toslices()]
+            return np.ascontiguousarray(np.moveaxis(block, 0, -1))
+
+        return np.stack([self.read_layer(idx, window) for idx in range(self.count)], axis=-1)
+
+    def iter_blocks(self, block_size=512):
+        """
+        Gera os blocos da pilha, linha por linha.
+
+        Parâmetros:
+        - block_size (int, opcional): Tamanho do lado de cada bloco, em pixels (padrão: 512).
+
+        Retorno:
+        - Gerador de tuplas (window, bloco 3D).
+        """
+        for window in RasterOperations().block_windows(self.height, self.width, block_size):
+            yield window, self.read(window)
+
+    def index(self, coordinates):
+        """
+        Converte coordenadas (longitude, latitude) em índices de linha e coluna da grade.
+
+        Parâmetros:
+        - coordinates (list ou np.ndarray): Lista ou array de pares (longitude, latitude).
+
+        Retorno:
+        - Tupla (rows, cols, inside) de arrays, onde `inside` indica as coordenadas dentro da grade.
+        """
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        rows, cols = rasterio.transform.rowcol(self.transform, coords[:, 0], coords[:, 1])
+        rows, cols = np.atleast_1d(rows).astype(np.int64), np.atleast_1d(cols).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        return rows, cols, inside
+
+    def sample(self, coordinates):
+        """
+        Amostra todas as camadas nas coordenadas fornecidas.
+
+        Cada camada é lida apenas na janela (ou nos blocos) que contém os pontos dentro da grade.
+
+        Parâmetros:
+        - coordinates (list ou np.ndarray): Lista ou array de pares (longitude, latitude).
+
+        Retorno:
+        - Matriz float64 (pontos x camadas) com NaN para coordenadas fora da grade.
+        """
+        rows, cols, inside = self.index(coordinates)
+        values = np.full((rows.shape[0], self.count), np.nan, dtype=np.float64)
+        if not inside.any():
+            return values
+
+        rows, cols = rows[inside], cols[inside]
+        if self.cube is not None:
+            values[inside] = self.cube[:, rows, cols].T
+            return values
+
+        operations = RasterOperations()
+        for idx, src in enumerate(self.datasets):
+            values[inside, idx] = operations.read_points(src, rows, cols)
+
+        return values
+
+    def close(self):
+        """Fecha todos os arquivos da pilha."""
+        for src in self.datasets:
+            src.close()
+        self.datasets = []
+        self.cube = None
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # Os arquivos abertos não são serializáveis: apenas os caminhos são enviados (ex.: a processos de trabalho)
+        # O cubo em cache é reaberto (memmap) pelo processo que recebe a pilha
+        return {'tiff_files': self.tiff_files, 'cache_dir': self.cache_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state['tiff_files'], cache_dir=state.get('cache_dir'))
+
+
+class ValidPixelStack:
+    def __init__(self, values, index, shape, profile=None, names=None, tiff_files=None):
+        """
+        Pilha ambiental compacta: guarda apenas os pixels válidos (sem NaN em nenhuma camada).
+
+        A máscara de validade é calculada uma única vez; as predições são feitas sobre `values`
+        e devolvidas à grade apenas na escrita, com `scatter`.
+
+        :param values: Matriz contígua float32 (pixels válidos x camadas).
+        :param index: Índices planos (linha * n_colunas + coluna), em ordem crescente, de cada pixel válido na grade.
+        :param shape: Dimensões da grade (linhas, colunas).
+        :param profile: Perfil (profile) raster de referência, se conhecido.
+        :param names: Nomes das camadas, na ordem das colunas de `values`, se conhecidos.
+        :param tiff_files: Arquivos TIFF de origem, se a pilha foi lida de arquivos.
+        """
+        self.logger = LoggerManager().get_logger()
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.index = np.asarray(index, dtype=np.int64)
+        self.shape = tuple(shape)
+        self.profile = profile
+        self.names = list(names) if names is not None else None
+        self.tiff_files = list(tiff_files) if tiff_files is not None else None
+
+        if self.values.ndim != 2 or self.values.shape[0] != self.index.shape[0]:
+            raise ValueError("`values` deve ser uma matriz 2D com uma linha por índice válido.")
+
+    @property
+    def n_valid(self):
+        """Número de pixels válidos."""
+        return self.values.shape[0]
+
+    @property
+    def n_layers(self):
+        """Número de camadas ambientais."""
+        return self.values.shape[1]
+
+    @classmethod
+    def resolve(cls, source):
+        """
+        Retorna a pilha compacta já carregada em `source`, sem ler os rasters.
+
+        Parâmetros:
+        - source: `ValidPixelStack`, conjunto preparado com o atributo `stack` (ex.: `PreparedDataset`)
+        ou qualquer outra entrada (caminhos, `RasterStack`).
+
+        Retorno:
+        - ValidPixelStack ou None: A pilha compacta, ou None se `source` precisar ser lida dos arquivos.
+        """
+        if isinstance(source, cls):
+            return source
+        stack = getattr(source, 'stack', None)
+        return stack if isinstance(stack, cls) else None
+
+    @classmethod
+    def from_matrix(cls, matriz, profile=None):
+        """
+        Cria a pilha compacta a partir de uma matriz 3D (linhas x colunas x camadas).
+
+        Parâmetros:
+        - matriz (np.ndarray): Matriz 3D com as camadas ambientais.
+        - profile (dict, opcional): Perfil raster de referência.
+
+        Retorno:
+        - ValidPixelStack: Pilha com os pixels sem NaN em nenhuma camada.
+        """
+        n_lat, n_lon, n_layers = matriz.shape
+        flat = matriz.reshape(-1, n_layers)
+        index = np.flatnonzero(~np.isnan(flat).any(axis=1))
+        return cls(flat[index], index, (n_lat, n_lon), profile)
+
+    @classmethod
+    def from_rasters(cls, tiff_paths, cache_dir=None):
+        """
+        Cria a pilha compacta lendo as camadas uma a uma, sem montar a matriz 3D completa.
+
+        O índice dos pixels válidos é reduzido a cada camada lida, de modo que a memória usada
+        é proporcional aos pixels válidos, e não ao tamanho da grade.
+
+        Parâmetros:
+        - tiff_paths (str, list ou RasterStack): Caminho para um diretório, lista de arquivos TIFF (lidos em ordem alfabética)
+        ou pilha já aberta.
+        - cache_dir (str, opcional): Diretório do cache de cubos (ver `CubeCache`), usado ao abrir uma nova pilha.
+
+        Retorno:
+        - ValidPixelStack: Pilha com os pixels sem NaN em nenhuma camada e o perfil da primeira camada.
+
+        Exceções:
+        - ValueError: Se nenhum raster for encontrado ou se as camadas não tiverem a mesma grade.
+        """
+        with RasterStack.using(tiff_paths, cache_dir=cache_dir) as raster_stack:
+            profile = raster_stack.profile
+            names, tiff_files = raster_stack.names, raster_stack.tiff_files
+
+            index = None
+            columns = []
+            for idx in range(raster_stack.count):
+                layer = raster_stack.read_layer(idx).astype(np.float32, copy=False).ravel()
+
+                if index is None:
+                    index = np.flatnonzero(~np.isnan(layer))
+                    column = layer[index]
+                else:
+                    column = layer[index]
+                    keep = ~np.isnan(column)
+                    if not keep.all():
+                        index = index[keep]
+                        columns = [c[keep] for c in columns]
+                        column = column[keep]
+                columns.append(column)
+
+        stack = cls(np.column_stack(columns), index, (profile['height'], profile['width']), profile, names, tiff_files)
+        stack.logger.info(f"Pilha compacta criada: {stack.n_valid} pixels válidos de {profile['height'] * profile['width']} ({len(columns)} camadas).")
+        return stack
+
+    def sample(self, coordinates):
+        """
+        Amostra a pilha nas coordenadas fornecidas, sem ler os rasters.
+
+        Parâmetros:
+        - coordinates (list ou np.ndarray): Lista ou array de pares (longitude, latitude).
+
+        Retorno:
+        - Matriz float64 (pontos x camadas) com NaN para coordenadas fora da grade ou em pixels sem dados.
+
+        Exceções:
+        - ValueError: Se a pilha não tiver perfil (transformação) para localizar as coordenadas.
+        """
+        if self.profile is None:
+            raise ValueError("A pilha compacta não tem perfil (transformação) para localizar as coordenadas.")
+
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        height, width = self.shape
+        rows, cols = rasterio.transform.rowcol(self.profile['transform'], coords[:, 0], coords[:, 1])
+        rows, cols = np.atleast_1d(rows).astype(np.int64), np.atleast_1d(cols).astype(np.int64)
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+
+        # Linha da pilha de cada célula (o índice dos pixels válidos está em ordem crescente)
+        cells = rows * width + cols
+        linhas = np.minimum(np.searchsorted(self.index, cells), max(self.n_valid - 1, 0))
+        encontrados = inside & (self.index[linhas] == cells) if self.n_valid else np.zeros_like(inside)
+
+        values = np.full((coords.shape[0], self.n_layers), np.nan, dtype=np.float64)
+        values[encontrados] = self.values[linhas[encontrados]]
+        return values
+
+    def scatter(self, predictions, fill_value=np.nan, dtype=np.float32):
+        """
+        Devolve à grade valores calculados para os pixels válidos.
+
+        Parâmetros:
+        - predictions (np.ndarray): Vetor (pixels válidos,) ou matriz (pixels válidos x saídas).
+        - fill_value (float, opcional): Valor dos pixels sem dados (padrão: NaN).
+        - dtype (np.dtype, opcional): Tipo do array de saída (padrão: float32).
+
+        Retorno:
+        - np.ndarray: Array 2D (linhas x colunas) ou 3D (linhas x colunas x saídas).
+        """
+        predictions = np.asarray(predictions)
+        n_outputs = predictions.shape[1:] if predictions.ndim > 1 else ()
+
+        grid = np.full((self.shape[0] * self.shape[1],) + n_outputs, fill_value, dtype=dtype)
+        grid[self.index] = predictions
+        return grid.reshape(self.shape + n_outputs)
+
+    def to_matrix(self):
+        """
+        Reconstrói a matriz 3D (linhas x colunas x camadas) com NaN nos pixels sem dados.
+
+        Retorno:
+        - np.ndarray: Matriz 3D float32.
+        """
+        return self.scatter(self.values)
+
+
 # Verificar um jeito melhor de fazer isso de forma que possa converter qualquer arquivo para outro
 class RasterConverter:
     def __init__(self):
@@ -0,0 +1,323 @@
+# Agendador de blocos (tiles) para predição paralela sobre rasters
+import os
+import time
+import threading
+import rasterio
+import numpy as np
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from EcoDistrib.utils.logger import LoggerManager
+from EcoDistrib.utils.raster_operations import RasterOperations, RasterStack, ValidPixelStack
+
+# Preditor enviado uma única vez a cada processo de trabalho (ver `_init_worker`)
+_worker_predictor = None
+
+# Pilha de rasters aberta uma única vez em cada trabalhador (processo ou thread)
+_worker_local = threading.local()
+
+
+def _init_worker(predictor, source=None):
+    """
+    Guarda o preditor no processo de trabalho, evitando serializá-lo a cada bloco, e abre a pilha de rasters
+    do trabalhador, se informada como (arquivos, cache_dir). Os arquivos são abertos uma única vez por trabalhador,
+    e não a cada janela.
+    """
+    global _worker_predictor
+    if predictor is not None:
+        _worker_predictor = predictor
+    if source is not None:
+        tiff_files, cache_dir = source
+        _worker_local.stack = RasterStack(tiff_files, cache_dir=cache_dir)
+
+
+def _predict_block(block, predictor=None):
+    """
+    Aplica o preditor às linhas válidas (sem NaN) de um bloco 2D (pixels x camadas).
+
+    Retorna uma matriz float32 (pixels x saídas) com NaN nos pixels sem dados.
+    """
+    predictor = predictor if predictor is not None else _worker_predictor
+    valid = ~np.isnan(block).any(axis=1)
+
+    if not valid.any():
+        return np.full((block.shape[0], 1), np.nan, dtype=np.float32)
+
+    predicted = np.asarray(predictor(block[valid]), dtype=np.float32).reshape(int(valid.sum()), -1)
+    result = np.full((block.shape[0], predicted.shape[1]), np.nan, dtype=np.float32)
+    result[valid] = predicted
+    return result
+
+
+def _predict_window(raster_stack, window, predictor=None):
+    """
+    Lê uma janela de todas as camadas de uma pilha já aberta (a do trabalhador, se `raster_stack` for None)
+    e aplica o preditor, retornando (linhas x colunas x saídas).
+    """
+    raster_stack = raster_stack if raster_stack is not None else _worker_local.stack
+    block = raster_stack.read(window)
+
+    n_rows, n_cols, n_layers = block.shape
+    return _predict_block(block.reshape(-1, n_layers), predictor).reshape(n_rows, n_cols, -1)
+
+
+class TileScheduler:
+    def __init__(self, n_jobs=1, block_size=512, backend='process', memory_budget_mb=None):
+        """
+        Divide a grade de saída em blocos e executa um preditor já ajustado sobre eles,
+        em série ou em paralelo (processos ou threads), entregando os resultados na ordem dos blocos.
+
+        :param n_jobs: Número de trabalhadores. 1 executa em série; -1 usa todos os núcleos.
+        :param block_size: Tamanho do lado de cada bloco, em pixels (padrão: 512).
+        :param backend: 'process' (ProcessPoolExecutor) ou 'thread' (ThreadPoolExecutor).
+        :param memory_budget_mb: Memória máxima, em MB, dos blocos em andamento nas predições em memória
+        (`predict_matrix`/`predict_stack`). Se informado, substitui `block_size` pelo número de pixels por bloco
+        que cabe no orçamento, usando a estimativa `bytes_per_row` do preditor, quando disponível.
+        """
+        if backend not in ('process', 'thread'):
+            raise ValueError("Backend desconhecido. Escolha entre 'process' ou 'thread'.")
+
+        self.logger = LoggerManager().get_logger()
+        self.n_jobs = os.cpu_count() if n_jobs in (None, -1) else max(1, int(n_jobs))
+        self.block_size = block_size
+        self.backend = backend
+        self.memory_budget_mb = memory_budget_mb
+
+    def _batch_rows(self, n_layers, predictor):
+        """
+        Número de pixels por bloco: `block_size` ** 2 ou, com `memory_budget_mb`, o que cabe no orçamento
+        considerando os 2 * n_jobs blocos que podem estar em andamento.
+        """
+        if self.memory_budget_mb is None:
+            return self.block_size * self.block_size
+
+        bytes_per_row = predictor.bytes_per_row(n_layers) if hasattr(predictor, 'bytes_per_row') else 8 * (n_layers + 1)
+        in_flight = 1 if self.n_jobs == 1 else 2 * self.n_jobs
+        return max(1, int(self.memory_budget_mb * 2 ** 20 // (bytes_per_row * in_flight)))
+
+    def _run(self, func, tasks, predictor, source=None):
+        """
+        Executa `func(*task, predictor)` para cada tarefa e gera (task, resultado) na ordem de submissão.
+
+        No máximo 2 * n_jobs blocos ficam em andamento, o que limita a memória dos resultados pendentes.
+        Com `source` (arquivos, cache_dir), cada trabalhador abre a pilha de rasters uma única vez (ver `_init_worker`).
+        """
+        if self.n_jobs == 1:
+            for task in tasks:
+                yield task, func(*task, predictor)
+            return
+
+        if self.backend == 'process':
+            executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker, initargs=(predictor, source))
+            predictor = None  # O preditor já está em cada processo
+        else:
+            # Os arquivos abertos não são compartilhados entre threads: cada thread abre a sua pilha
+            executor = ThreadPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker, initargs=(None, source))
+
+        with executor:
+            pending = deque()
+            for task in tasks:
+                pending.append((task, executor.submit(func, *task, predictor)))
+                if len(pending) >= 2 * self.n_jobs:
+                    task_done, future = pending.popleft()
+                    yield task_done, future.result()
+
+            while pending:
+                task_done, future = pending.popleft()
+                yield task_done, future.result()
+
+    def predict_matrix(self, matriz, predictor):
+        """
+        Aplica o preditor a uma matriz 3D em memória (linhas x colunas x camadas), bloco a bloco.
+
+        Parâmetros:
+        - matriz (np.ndarray ou ValidPixelStack): Matriz 3D com as camadas ambientais ou pilha compacta
+        (ver `predict_stack`).
+        - predictor (callable): Função que recebe uma matriz 2D (pixels válidos x camadas) e retorna um vetor
+        de predições. Com o backend 'process', deve ser serializável (pickle).
+
+        Retorno:
+        - np.ndarray: Mapa 2D float32 com as predições e NaN nos pixels sem dados.
+        """
+        if isinstance(matriz, ValidPixelStack):
+            return self.predict_stack(matriz, predictor)
+
+        inicio = time.perf_counter()
+        n_lat, n_lon, n_layers = matriz.shape
+        prediction_map = np.full((n_lat, n_lon), np.nan, dtype=np.float32)
+
+        block_size = max(1, int(np.sqrt(self._batch_rows(n_layers, predictor))))
+        windows = RasterOperations().block_windows(n_lat, n_lon, block_size)
+        tasks = ((matriz[window.toslices()].reshape(-1, n_layers), window) for window in windows)
+
+        for (_, window), result in self._run(_predict_block_task, tasks, predictor):
+            rows, cols = window.toslices()
+            prediction_map[rows, cols] = result[:, 0].reshape(window.height, window.width)
+
+        self._log_throughput(n_lat * n_lon, inicio, f"em blocos de {block_size} pixels")
+        return prediction_map
+
+    def predict_stack(self, stack, predictor):
+        """
+        Aplica o preditor a uma pilha compacta, em lotes de `block_size` x `block_size` pixels válidos.
+
+        Como a pilha contém apenas pixels válidos, nenhuma máscara de NaN é recalculada; as predições
+        são devolvidas à grade uma única vez, ao final.
+
+        Parâmetros:
+        - stack (ValidPixelStack): Pilha compacta com os pixels válidos.
+        - predictor (callable): Função que recebe uma matriz 2D (pixels x camadas) e retorna um vetor de predições.
+
+        Retorno:
+        - np.ndarray: Mapa 2D float32 com as predições e NaN nos pixels sem dados.
+        """
+        return stack.scatter(self._predict_valid(stack, predictor)[:, 0])
+
+    def _predict_valid(self, stack, predictor):
+        """Aplica o preditor aos pixels válidos em lotes, retornando a matriz float32 (pixels válidos x saídas)."""
+        inicio = time.perf_counter()
+        predictions = None
+
+        batch = self._batch_rows(stack.n_layers, predictor)
+        tasks = ((stack.values[start:start + batch], start) for start in range(0, stack.n_valid, batch))
+
+        for (block, start), result in self._run(_predict_rows_task, tasks, predictor):
+            if predictions is None:
+                predictions = np.empty((stack.n_valid, result.shape[1]), dtype=np.float32)
+            predictions[start:start + block.shape[0]] = result
+
+        self._log_throughput(stack.n_valid, inicio, f"para pixels válidos, em lotes de {batch} pixels")
+        return predictions if predictions is not None else np.empty((0, 1), dtype=np.float32)
+
+    def _log_throughput(self, n_pixels, inicio, detalhe):
+        """Registra a conclusão da predição e a taxa de pixels por segundo."""
+        elapsed = time.perf_counter() - inicio
+        taxa = n_pixels / elapsed if elapsed > 0 else float('inf')
+        self.logger.info(f"Predição concluída {detalhe} com {self.n_jobs} trabalhador(es): "
+                         f"{n_pixels} pixels em {elapsed:.2f} s ({taxa:,.0f} pixels/s).")
+
+    def predict_rasters(self, tiff_paths, predictor):
+        """
+        Aplica o preditor a uma pilha de rasters lida por janelas e monta o mapa resultante em memória.
+
+        Os arquivos são abertos uma única vez (ou a `RasterStack` recebida é reaproveitada) e as janelas são
+        lidas com `RasterStack.read`, que recorta o cubo mapeado em memória quando há cache de cubos.
+        Em paralelo, cada trabalhador abre a pilha uma única vez. Uma pilha compacta já carregada
+        (`ValidPixelStack` ou `PreparedDataset`) é usada diretamente (ver `predict_stack`), sem ler os rasters.
+
+        Parâmetros:
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Caminho para um diretório ou lista
+        de arquivos TIFF (lidos em ordem alfabética) ou pilha já aberta ou carregada.
+        - predictor (callable): Função que recebe uma matriz 2D (pixels válidos x camadas) e retorna um vetor.
+
+        Retorno:
+        - np.ndarray: Mapa 2D float32 com as predições e NaN nos pixels sem dados.
+        """
+        compacta = ValidPixelStack.resolve(tiff_paths)
+        if compacta is not None:
+            return self.predict_stack(compacta, predictor)
+
+        inicio = time.perf_counter()
+        with RasterStack.using(tiff_paths) as raster_stack:
+            prediction_map = np.full((raster_stack.height, raster_stack.width), np.nan, dtype=np.float32)
+
+            for window, result in self._iter_windows(raster_stack, predictor):
+                prediction_map[window.toslices()] = result[:, :, 0]
+
+        self._log_throughput(prediction_map.size, inicio, f"em blocos de {self.block_size} pixels")
+        return prediction_map
+
+    def write_rasters(self, tiff_paths, predictor, output_paths):
+        """
+        Aplica o preditor a uma pilha de rasters lida por janelas e escreve cada bloco, na ordem,
+        diretamente nos GeoTIFFs de saída. O pico de memória é definido por `block_size` e `n_jobs`.
+
+        Uma pilha compacta já carregada (`ValidPixelStack` ou `PreparedDataset`) é processada em memória, sem ler
+        os rasters, e cada saída é devolvida à grade e escrita de uma vez.
+
+        Parâmetros:
+        - tiff_paths (str, list, RasterStack, ValidPixelStack ou PreparedDataset): Caminho para um diretório ou lista
+        de arquivos TIFF (lidos em ordem alfabética) ou pilha já aberta ou carregada.
+        - predictor (callable): Função que recebe uma matriz 2D (pixels válidos x camadas) e retorna um vetor
+        (pixels,) ou, para várias saídas, uma matriz (pixels x saídas).
+        - output_paths (str ou list): Caminho do GeoTIFF de saída ou lista de caminhos, um por saída do preditor.
+
+        Retorno:
+        - dict: Perfil (profile) dos rasters de saída, derivado da pilha de entrada (ver `MapGenerator.output_profile`).
+        Pixels sem dados recebem o nodata herdado da entrada (NaN, se a entrada não definir um valor).
+        """
+        if isinstance(output_paths, str):
+            output_paths = [output_paths]
+
+        # Importação local: o módulo de saídas depende de `EcoDistrib.utils`
+        from EcoDistrib.outputs import MapGenerator
+
+        compacta = ValidPixelStack.resolve(tiff_paths)
+        if compacta is not None:
+            return self._write_stack(compacta, predictor, output_paths, MapGenerator().output_profile(compacta))
+
+        with RasterStack.using(tiff_paths) as raster_stack, ExitStack() as stack:
+            # Mesmo perfil dos mapas salvos em memória (`MapGenerator.save_map`), inclusive o nodata herdado
+            profile = self._tiled(MapGenerator().output_profile(raster_stack))
+
+            nodata = profile['nodata']
+            fill_nodata = not np.isnan(nodata)
+
+            destinations = [stack.enter_context(rasterio.open(path, 'w', **profile)) for path in output_paths]
+
+            for window, result in self._iter_windows(raster_stack, predictor):
+                if fill_nodata:
+                    result = np.where(np.isnan(result), np.float32(nodata), result)
+                for idx, dst in enumerate(destinations):
+                    # Blocos sem pixels válidos têm uma única saída (NaN)
+                    dst.write(result[:, :, min(idx, result.shape[2] - 1)], 1, window=window)
+
+        self.logger.info(f"Processamento em blocos de {self.block_size} pixels concluído: {output_paths}")
+        return profile
+
+    def _tiled(self, profile):
+        """Perfil de saída com blocos internos de `block_size` pixels (quando múltiplo de 16)."""
+        if self.block_size % 16 == 0:
+            profile.update(tiled=True, blockxsize=self.block_size, blockysize=self.block_size)
+        return profile
+
+    def _write_stack(self, stack, predictor, output_paths, profile):
+        """Aplica o preditor a uma pilha compacta e escreve cada saída, devolvida à grade, nos GeoTIFFs."""
+        profile = self._tiled(profile)
+        predictions = self._predict_valid(stack, predictor)
+        nodata = profile['nodata']
+
+        for idx, path in enumerate(output_paths):
+            grid = stack.scatter(predictions[:, min(idx, predictions.shape[1] - 1)], fill_value=nodata)
+            with rasterio.open(path, 'w', **profile) as dst:
+                dst.write(grid, 1)
+
+        self.logger.info(f"Processamento da pilha compacta concluído: {output_paths}")
+        return profile
+
+    def _iter_windows(self, raster_stack, predictor):
+        """
+        Gera (window, resultado) para todos os blocos da grade, na ordem.
+
+        Em série, as janelas são lidas da pilha já aberta; em paralelo, da pilha aberta por cada trabalhador.
+        """
+        windows = RasterOperations().block_windows(raster_stack.height, raster_stack.width, self.block_size)
+        if self.n_jobs == 1:
+            tasks, source = ((raster_stack, window) for window in windows), None
+        else:
+            tasks, source = ((None, window) for window in windows), (list(raster_stack.tiff_files), raster_stack.cache_dir)
+
+        for (_, window), result in self._run(_predict_window, tasks, predictor, source):
+            yield window, result
+
+
+def _predict_block_task(block, window, predictor=None):
+    """Tarefa serializável usada por `TileScheduler.predict_matrix` nos trabalhadores."""
+    return _predict_block(block, predictor)
+
+
+def _predict_rows_task(block, start, predictor=None):
+    """Tarefa serializável usada por `TileScheduler.predict_stack`: o bloco contém apenas pixels válidos (pixels x saídas)."""
+    predictor = predictor if predictor is not None else _worker_predictor
+    return np.asarray(predictor(block), dtype=np.float32).reshape(block.shape[0], -1)